@@ -0,0 +1,92 @@
+"""
+Compares the feature selection methods at several vocabulary widths: columns of a CountVectorizer fitted
+on the train split are ranked by chi2, mutual information or L1 logistic regression coefficients, a logistic
+regression is trained on the top columns, and test accuracy is reported with the median latency of scoring
+a batch of normalized reviews, the reduced vectorizer transform followed by predict.
+
+usage: python -m IMDB.benchmark.feature_selection --file "IMDB Dataset.csv" [--rows 20000]
+                                                  [--methods chi2 mutual_info l1] [--widths 25000 5000 1000]
+                                                  [--batch-size 100]
+"""
+from IMDB.util.feature_selection import FEATURE_SELECTIONS, get_feature_scores, get_top_columns, reduce_vocabulary
+from IMDB.constant import SENTIMENT_LABELS
+from IMDB.util.util import porter, get_label_codes
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+import pandas as pd
+import numpy as np
+import argparse
+import time
+
+DEFAULT_WIDTHS = [25000, 10000, 5000, 2000, 1000]
+MAX_FEATURES = 25000
+SCORING_REPEATS = 5
+
+
+def get_scoring_seconds(vectorizer, model, reviews: list, batch_size: int) -> float:
+    """
+    Returns the median seconds to featurize and predict one batch of reviews
+    """
+    seconds = []
+    for _ in range(SCORING_REPEATS):
+        for start in range(0, len(reviews), batch_size):
+            batch = reviews[start:start + batch_size]
+            batch_start = time.perf_counter()
+            model.predict(vectorizer.transform(batch))
+            seconds.append(time.perf_counter() - batch_start)
+    return float(np.median(seconds))
+
+
+def run_benchmark(reviews: pd.DataFrame, methods=FEATURE_SELECTIONS, widths=DEFAULT_WIDTHS, batch_size: int = 100,
+                  nltk_data_dir: str = None, random_state: int = 42) -> dict:
+    normalized_reviews = porter(reviews[["review"]], nltk_data_dir=nltk_data_dir)
+    target = get_label_codes(reviews["sentiment"], SENTIMENT_LABELS)
+    train_reviews, test_reviews, train_target, test_target = train_test_split(
+        normalized_reviews, target, test_size=0.2, random_state=random_state)
+
+    vectorizer = CountVectorizer(max_features=MAX_FEATURES, ngram_range=(1, 2))
+    train_feature = vectorizer.fit_transform(train_reviews)
+    report = {"rows": len(reviews), "features": train_feature.shape[1], "methods": {}}
+
+    for method in methods:
+        start = time.perf_counter()
+        scores = get_feature_scores(method, train_feature, train_target, random_state=random_state)
+        report["methods"][method] = {"scoring_seconds": time.perf_counter() - start, "widths": {}}
+        for width in widths:
+            columns = get_top_columns(scores, width)
+            reduced_vectorizer = reduce_vocabulary(vectorizer, columns)
+            model = LogisticRegression(solver="liblinear", random_state=random_state)
+            model.fit(train_feature.tocsc()[:, columns].tocsr(), train_target)
+            accuracy = float((model.predict(reduced_vectorizer.transform(test_reviews)) == test_target).mean())
+            report["methods"][method]["widths"][width] = {
+                "features": len(columns),
+                "accuracy": accuracy,
+                "batch_seconds": get_scoring_seconds(reduced_vectorizer, model, test_reviews, batch_size),
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", required=True, help="csv file with review and sentiment columns")
+    parser.add_argument("--rows", type=int, default=None)
+    parser.add_argument("--methods", nargs="+", default=list(FEATURE_SELECTIONS), choices=FEATURE_SELECTIONS)
+    parser.add_argument("--widths", nargs="+", type=int, default=DEFAULT_WIDTHS)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--nltk-data-dir", default=None)
+    args = parser.parse_args()
+
+    reviews = pd.read_csv(args.file, usecols=["review", "sentiment"], nrows=args.rows)
+    report = run_benchmark(reviews, methods=args.methods, widths=args.widths, batch_size=args.batch_size,
+                           nltk_data_dir=args.nltk_data_dir)
+    print(f"rows: {report['rows']} vocabulary: {report['features']}")
+    for method, method_report in report["methods"].items():
+        print(f"{method}: scored columns in {method_report['scoring_seconds']:.2f}s")
+        for width, result in method_report["widths"].items():
+            print(f"  {width}: {result['features']} features, accuracy {result['accuracy']:.4f}, "
+                  f"{result['batch_seconds'] * 1000:.2f}ms per batch")
+
+
+if __name__ == "__main__":
+    main()
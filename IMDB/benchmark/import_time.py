@@ -0,0 +1,75 @@
+"""
+Measures the cold import time of IMDB modules, each in a fresh interpreter started in an empty directory,
+and checks that importing them loads no heavy dependency and writes no file.
+
+usage: python -m IMDB.benchmark.import_time [--modules IMDB.config.configuration ...] [--repeat 3]
+                                            [--max-seconds 0.5]
+exits with status 1 when a module is slower than max-seconds, loads a heavy dependency or writes a file
+"""
+import subprocess
+import argparse
+import tempfile
+import json
+import sys
+import os
+
+DEFAULT_MODULES = ["IMDB.constant", "IMDB.logger", "IMDB.util.util", "IMDB.config.configuration",
+                   "IMDB.util.imdb_predictor", "IMDB.serving.scoring_service",
+                   "IMDB.component.data_ingestion", "IMDB.component.data_validation",
+                   "IMDB.component.data_transformation", "IMDB.component.model_trainer",
+                   "IMDB.component.batch_prediction", "IMDB.pipeline.pipline"]
+HEAVY_MODULES = ["numpy", "pandas", "scipy", "sklearn", "nltk", "dill", "joblib", "pyarrow"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+from types import ModuleType
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+loaded = [name for name in {heavy_modules!r}
+          if name in sys.modules and type(sys.modules[name]) is ModuleType]
+print(json.dumps({{"seconds": seconds, "loaded": loaded}}))
+"""
+
+
+def time_import(module: str, repeat: int = 3) -> dict:
+    """
+    Returns the fastest of repeat cold imports, the heavy modules it loaded and the files and directories it wrote
+    module: str
+    """
+    package_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_dir, os.environ.get("PYTHONPATH")])))
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(module=module,
+                                                                               heavy_modules=HEAVY_MODULES)],
+                                    cwd=work_dir, env=env, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+        written_files = sorted(os.path.relpath(os.path.join(root, name), work_dir)
+                               for root, dir_names, file_names in os.walk(work_dir)
+                               for name in dir_names + file_names)
+    return {"seconds": min(result["seconds"] for result in results),
+            "loaded": results[0]["loaded"],
+            "written_files": written_files}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        report = time_import(module, repeat=args.repeat)
+        too_slow = args.max_seconds is not None and report["seconds"] > args.max_seconds
+        failed = failed or too_slow or bool(report["loaded"]) or bool(report["written_files"])
+        print(f"{module}: {report['seconds'] * 1000:.1f} ms, heavy modules loaded: {report['loaded']}, "
+              f"files written: {report['written_files']}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Times the pipeline stages on synthetic corpora of increasing size and saves the results as JSON,
+so runs can be compared across commits and dependency upgrades.
+
+Every size is timed stage by stage (split_data_as_train_test, validate_dataset_schema, load_data, porter,
+initiate_data_transformation), then end to end from ingestion to transformation in fresh directories.
+Settings come from config/config.yaml, only the artifact locations are moved under --work-dir.
+
+usage: python -m IMDB.benchmark.pipeline_stages [--rows 10000 100000 1000000] [--work-dir benchmark_data]
+                                                [--output results.json] [--compare previous.json]
+"""
+from IMDB.benchmark.synthetic_corpus import write_corpus
+from IMDB.component.data_ingestion import DataIngestion
+from IMDB.component.data_validation import DataValidation
+from IMDB.component.data_transformation import DataTransformation
+from IMDB.config.configuration import Configuration
+from IMDB.util.util import load_data, porter, read_yaml_file
+from IMDB.util.performance_recorder import get_peak_rss_mb
+from IMDB.constant import *
+import subprocess
+import platform
+import argparse
+import shutil
+import json
+import time
+import sys
+
+DEFAULT_ROWS = [10000, 100000, 1000000]
+RAW_FILE_NAME = "IMDB Dataset.csv"
+PACKAGES = ["numpy", "pandas", "scipy", "sklearn", "nltk", "pyarrow"]
+
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def get_environment() -> dict:
+    try:
+        git_commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        git_commit = None
+    packages = {}
+    for package in PACKAGES:
+        try:
+            packages[package] = __import__(package).__version__
+        except ImportError:
+            packages[package] = None
+    return {"git_commit": git_commit,
+            "time_stamp": get_current_time_stamp(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "packages": packages}
+
+
+def get_corpus_file_path(work_dir: str, n_rows: int, random_state: int) -> str:
+    """
+    Returns the synthetic corpus of n_rows, generated on first use and reused by later runs
+    """
+    corpus_file_path = os.path.join(work_dir, "corpus", f"synthetic_{n_rows}_{random_state}.csv")
+    if not os.path.exists(corpus_file_path):
+        partial_file_path = corpus_file_path + ".partial"
+        write_corpus(file_path=partial_file_path, n_rows=n_rows, random_state=random_state)
+        os.replace(partial_file_path, corpus_file_path)
+    return corpus_file_path
+
+
+def get_stage_configs(config: Configuration, run_dir: str, corpus_file_path: str):
+    """
+    Returns the ingestion, validation and transformation configs of config.yaml writing under run_dir,
+    with the corpus linked into a fresh raw data directory
+    """
+    shutil.rmtree(run_dir, ignore_errors=True)
+    raw_data_dir = os.path.join(run_dir, "raw_data")
+    os.makedirs(raw_data_dir)
+    raw_file_path = os.path.join(raw_data_dir, RAW_FILE_NAME)
+    try:
+        os.link(corpus_file_path, raw_file_path)
+    except OSError:
+        shutil.copy(corpus_file_path, raw_file_path)
+
+    data_ingestion_config = config.get_data_ingestion_config()._replace(
+        raw_data_dir=raw_data_dir,
+        ingested_train_dir=os.path.join(run_dir, "ingested", "train"),
+        ingested_test_dir=os.path.join(run_dir, "ingested", "test"))
+    data_validation_config = config.get_data_validation_config()
+    data_transformation_config = config.get_data_transformation_config()._replace(
+        transformed_train_dir=os.path.join(run_dir, "transformed", "train"),
+        transformed_test_dir=os.path.join(run_dir, "transformed", "test"),
+        preprocessed_object_file_path=os.path.join(run_dir, "preprocessed", "preprocessed.pkl"))
+    return data_ingestion_config, data_validation_config, data_transformation_config
+
+
+def run_stages(config: Configuration, work_dir: str, corpus_file_path: str) -> dict:
+    data_ingestion_config, data_validation_config, data_transformation_config = get_stage_configs(
+        config, os.path.join(work_dir, "stages"), corpus_file_path)
+    seconds = {}
+
+    data_ingestion_artifact, seconds["split_data_as_train_test"] = time_call(
+        DataIngestion(data_ingestion_config=data_ingestion_config).split_data_as_train_test)
+
+    data_validation = DataValidation(data_validation_config=data_validation_config,
+                                     data_ingestion_artifact=data_ingestion_artifact)
+    _, seconds["validate_dataset_schema"] = time_call(data_validation.validate_dataset_schema)
+    data_validation_artifact = data_validation.initiate_data_validation()
+
+    schema_file_path = data_validation_artifact.schema_file_path
+    train_df, seconds["load_data"] = time_call(load_data, file_path=data_ingestion_artifact.train_file_path,
+                                               schema_file_path=schema_file_path,
+                                               file_format=data_ingestion_artifact.file_format)
+
+    input_train_df = train_df.drop(columns=[read_yaml_file(schema_file_path)[TARGET_COLUMNS_KEY]])
+    _, seconds["porter"] = time_call(porter, input_train_df, n_jobs=data_transformation_config.n_jobs,
+                                     chunk_size=data_transformation_config.chunk_size,
+                                     nltk_data_dir=data_transformation_config.nltk_data_dir)
+    del train_df, input_train_df
+
+    data_transformation = DataTransformation(data_transformation_config=data_transformation_config,
+                                             data_ingestion_artifact=data_ingestion_artifact,
+                                             data_validation_artifact=data_validation_artifact)
+    _, seconds["initiate_data_transformation"] = time_call(data_transformation.initiate_data_transformation)
+    return seconds
+
+
+def run_end_to_end(config: Configuration, work_dir: str, corpus_file_path: str) -> float:
+    data_ingestion_config, data_validation_config, data_transformation_config = get_stage_configs(
+        config, os.path.join(work_dir, "end_to_end"), corpus_file_path)
+
+    start = time.perf_counter()
+    data_ingestion_artifact = DataIngestion(data_ingestion_config=data_ingestion_config).split_data_as_train_test()
+    data_validation_artifact = DataValidation(data_validation_config=data_validation_config,
+                                              data_ingestion_artifact=data_ingestion_artifact
+                                              ).initiate_data_validation()
+    DataTransformation(data_transformation_config=data_transformation_config,
+                       data_ingestion_artifact=data_ingestion_artifact,
+                       data_validation_artifact=data_validation_artifact).initiate_data_transformation()
+    return time.perf_counter() - start
+
+
+def run_benchmark(rows_list=DEFAULT_ROWS, work_dir: str = "benchmark_data", random_state: int = 42,
+                  config: Configuration = None) -> dict:
+    """
+    Returns the environment, relevant settings and, per corpus size, the seconds and rows/sec of every stage
+    rows_list: corpus sizes, in increasing order so process_peak_rss_mb is the peak of the largest size so far
+    work_dir: str corpora are cached here across runs, stage outputs are overwritten
+    """
+    config = config if config is not None else Configuration()
+    results = []
+    for n_rows in rows_list:
+        corpus_file_path = get_corpus_file_path(work_dir, n_rows, random_state)
+        seconds = run_stages(config, os.path.join(work_dir, str(n_rows)), corpus_file_path)
+        seconds["end_to_end"] = run_end_to_end(config, os.path.join(work_dir, str(n_rows)), corpus_file_path)
+        results.append({"rows": n_rows,
+                        "seconds": seconds,
+                        "rows_per_second": {stage: n_rows / stage_seconds
+                                            for stage, stage_seconds in seconds.items() if stage_seconds > 0},
+                        "process_peak_rss_mb": get_peak_rss_mb()})
+        print(json.dumps(results[-1]), flush=True)
+    return {"environment": get_environment(),
+            "config": {key: config.config_info.get(key) for key in (DATA_INGESTION_CONFIG_KEY,
+                                                                    DATA_TRANSFORMATION_CONFIG_KEY)},
+            "results": results}
+
+
+def compare_results(previous: dict, current: dict):
+    """
+    Prints the speedup of every stage and size found in both results, above 1 meaning current is faster
+    """
+    previous_seconds = {result["rows"]: result["seconds"] for result in previous["results"]}
+    print(f"compared with commit [{previous['environment'].get('git_commit')}]")
+    for result in current["results"]:
+        for stage, seconds in result["seconds"].items():
+            baseline = previous_seconds.get(result["rows"], {}).get(stage)
+            if baseline:
+                print(f"rows: {result['rows']} {stage}: {baseline:.3f}s -> {seconds:.3f}s "
+                      f"speedup: {baseline / seconds:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--work-dir", default="benchmark_data")
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--output", default=None,
+                        help="json file to write, benchmark_results/pipeline_stages_<time stamp>.json by default")
+    parser.add_argument("--compare", default=None, help="earlier json result to compare with")
+    args = parser.parse_args()
+
+    report = run_benchmark(rows_list=sorted(args.rows), work_dir=args.work_dir, random_state=args.random_state)
+    output_file_path = args.output or os.path.join("benchmark_results",
+                                                   f"pipeline_stages_{report['environment']['time_stamp']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_file_path)), exist_ok=True)
+    with open(output_file_path, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Saved results: [{output_file_path}]")
+
+    if args.compare:
+        with open(args.compare) as previous_file:
+            compare_results(previous=json.load(previous_file), current=report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Times featurizing a corpus with several CountVectorizer settings, from the raw reviews as before
+(porter then fit_transform on text) against a token corpus normalized and saved once, then reloaded
+memory mapped for every setting. Checks that both give the same vocabulary and matrix.
+
+usage: python -m IMDB.benchmark.refeaturization --file "IMDB Dataset.csv" [--rows 20000]
+                                                [--settings 25000:1:2 5000:1:1 2000:1:3] [--n-jobs 1]
+"""
+from IMDB.util.token_corpus import TokenCorpus, fit_transform_count_vectorizer
+from IMDB.util.util import porter
+from sklearn.feature_extraction.text import CountVectorizer
+import pandas as pd
+import argparse
+import tempfile
+import time
+import os
+
+DEFAULT_SETTINGS = ["25000:1:2", "5000:1:1", "2000:1:3"]
+
+
+def parse_setting(setting: str):
+    max_features, min_n, max_n = setting.split(":")
+    return int(max_features), (int(min_n), int(max_n))
+
+
+def run_benchmark(reviews: pd.DataFrame, settings=DEFAULT_SETTINGS, n_jobs: int = 1,
+                  nltk_data_dir: str = None) -> dict:
+    report = {"rows": len(reviews), "settings": {}}
+    start = time.perf_counter()
+    normalized_reviews = porter(reviews, n_jobs=n_jobs, nltk_data_dir=nltk_data_dir)
+    report["porter_seconds"] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        corpus_dir = os.path.join(corpus_dir, "corpus")
+        start = time.perf_counter()
+        TokenCorpus.from_texts(normalized_reviews).save(corpus_dir)
+        report["build_token_corpus_seconds"] = time.perf_counter() - start
+
+        for setting in settings:
+            max_features, ngram_range = parse_setting(setting)
+            vectorizer = CountVectorizer(max_features=max_features, ngram_range=ngram_range)
+            start = time.perf_counter()
+            text_matrix = vectorizer.fit_transform(normalized_reviews)
+            text_seconds = time.perf_counter() - start
+
+            token_vectorizer = CountVectorizer(max_features=max_features, ngram_range=ngram_range)
+            start = time.perf_counter()
+            token_matrix = fit_transform_count_vectorizer(token_vectorizer, TokenCorpus.load(corpus_dir))
+            token_seconds = time.perf_counter() - start
+
+            report["settings"][setting] = {
+                # re-featurizing from raw reviews stems them again
+                "text_seconds": report["porter_seconds"] + text_seconds,
+                "token_corpus_seconds": token_seconds,
+                "same_output": vectorizer.vocabulary_ == token_vectorizer.vocabulary_
+                               and (text_matrix != token_matrix).nnz == 0,
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", required=True, help="csv file with a review column")
+    parser.add_argument("--rows", type=int, default=None)
+    parser.add_argument("--settings", nargs="+", default=DEFAULT_SETTINGS, help="max_features:min_n:max_n")
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--nltk-data-dir", default=None)
+    args = parser.parse_args()
+
+    reviews = pd.read_csv(args.file, usecols=["review"], nrows=args.rows)
+    report = run_benchmark(reviews, settings=args.settings, n_jobs=args.n_jobs, nltk_data_dir=args.nltk_data_dir)
+    print(f"rows: {report['rows']} porter: {report['porter_seconds']:.2f}s "
+          f"token corpus built once: {report['build_token_corpus_seconds']:.2f}s")
+    for setting, result in report["settings"].items():
+        print(f"{setting}: from text {result['text_seconds']:.2f}s, from token corpus "
+              f"{result['token_corpus_seconds']:.2f}s, speedup "
+              f"{result['text_seconds'] / result['token_corpus_seconds']:.1f}x, same output: {result['same_output']}")
+
+
+if __name__ == "__main__":
+    main()
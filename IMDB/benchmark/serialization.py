@@ -0,0 +1,58 @@
+"""
+Compares size and load time of the preprocessing object and model saved with the dill save_object
+against save_fitted_object, uncompressed and memory mapped or compressed.
+
+usage: python -m IMDB.benchmark.serialization --preprocessed-object preprocessed.pkl --model model.pkl
+                                              [--repeat 5] [--compress 3]
+"""
+from IMDB.util.util import save_object, load_object, save_fitted_object, load_fitted_object
+import argparse
+import tempfile
+import time
+import os
+
+
+def time_load(load, file_path: str, repeat: int) -> float:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(file_path)
+        seconds.append(time.perf_counter() - start)
+    return sorted(seconds)[len(seconds) // 2]
+
+
+def run_benchmark(file_path: str, repeat: int = 5, compress: int = 3) -> dict:
+    obj = load_fitted_object(file_path, mmap_mode=None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        layouts = {
+            "dill": (os.path.join(tmp_dir, "dill.pkl"), save_object, load_object),
+            "joblib_mmap": (os.path.join(tmp_dir, "joblib.pkl"), save_fitted_object, load_fitted_object),
+            f"joblib_compress_{compress}": (os.path.join(tmp_dir, "joblib_compressed.pkl"),
+                                            lambda path, obj: save_fitted_object(path, obj, compress=compress),
+                                            load_fitted_object),
+        }
+        report = {}
+        for name, (layout_file_path, save, load) in layouts.items():
+            save(layout_file_path, obj)
+            report[name] = {
+                "bytes": os.path.getsize(layout_file_path),
+                "load_ms": time_load(load, layout_file_path, repeat) * 1000,
+            }
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preprocessed-object", required=True, help="preprocessed.pkl written by the pipeline")
+    parser.add_argument("--model", required=True, help="model.pkl written by the model trainer")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compress", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, file_path in (("preprocessed_object", args.preprocessed_object), ("model", args.model)):
+        for layout, result in run_benchmark(file_path, repeat=args.repeat, compress=args.compress).items():
+            print(f"{name} {layout}: {result['bytes']} bytes, load {result['load_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Generates a synthetic IMDB-like review corpus, so benchmarks run at any size without Kaggle access.
+
+Reviews follow the shape of the IMDB 50k dataset: log-normal lengths around 230 words, a Zipf distributed
+vocabulary headed by English stopwords, inflected words for the stemmer, sentences, <br /> tags and
+polarity words that make the balanced positive/negative sentiment learnable.
+
+usage: python -m IMDB.benchmark.synthetic_corpus --rows 100000 --file "synthetic/IMDB Dataset.csv"
+"""
+from IMDB.util.util import DataChunkWriter
+import pandas as pd
+import numpy as np
+import argparse
+import itertools
+
+HEAD_WORDS = ["the", "a", "and", "of", "to", "is", "in", "it", "this", "i", "that", "was", "as", "with", "for",
+              "but", "movie", "film", "on", "not", "you", "are", "his", "have", "he", "be", "one", "all", "at",
+              "by", "they", "an", "who", "so", "from", "like", "her", "or", "just", "about", "has", "if", "out",
+              "what", "some", "there", "more", "when", "very", "story", "good", "time", "really", "even", "see"]
+POSITIVE_WORDS = ["great", "excellent", "wonderful", "best", "love", "loved", "beautiful", "brilliant", "amazing",
+                  "perfect", "enjoyed", "favorite", "superb", "touching", "masterpiece", "fun", "recommend"]
+NEGATIVE_WORDS = ["bad", "worst", "awful", "terrible", "boring", "waste", "poor", "horrible", "stupid", "dull",
+                  "worse", "disappointing", "mess", "annoying", "ridiculous", "pointless", "lame"]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "vor", "sel", "an", "bri", "dus", "mon", "pel", "tra", "ve", "zin",
+             "cor", "dal", "fen", "gri", "hol", "jas", "kem", "lun", "mar", "nor", "pas", "qui", "ros", "sta", "tur"]
+SUFFIXES = ["", "", "", "s", "ing", "ed", "ly", "er", "ness", "ation"]
+
+DEFAULT_VOCABULARY_SIZE = 50000
+ZIPF_EXPONENT = 1.07
+# log-normal review length in words: median 174, mean about 230, as in the IMDB 50k dataset
+LENGTH_MEDIAN = 174
+LENGTH_SIGMA = 0.75
+MIN_LENGTH, MAX_LENGTH = 10, 2500
+POLARITY_WORD_RATE = 0.02
+POLARITY_NOISE = 0.2
+SENTENCE_END_RATE = 1 / 15
+LINE_BREAK_RATE = 1 / 150
+
+
+def build_vocabulary(vocabulary_size: int = DEFAULT_VOCABULARY_SIZE) -> np.ndarray:
+    """
+    Returns vocabulary_size words in Zipf rank order: stopwords and common words first,
+    then pseudo words made of two or three syllables and an inflection suffix
+    """
+    words = list(HEAD_WORDS)
+    seen = set(words) | set(POSITIVE_WORDS) | set(NEGATIVE_WORDS)
+    for n_syllables in (2, 3):
+        for syllables in itertools.product(SYLLABLES, repeat=n_syllables):
+            for suffix in SUFFIXES:
+                word = "".join(syllables) + suffix
+                if word not in seen:
+                    seen.add(word)
+                    words.append(word)
+                if len(words) >= vocabulary_size:
+                    return np.array(words, dtype=object)
+    return np.array(words, dtype=object)
+
+
+def generate_reviews(n_rows: int, rng: np.random.Generator, vocabulary: np.ndarray) -> pd.DataFrame:
+    """
+    Returns a dataframe of n_rows synthetic reviews with review and sentiment columns
+    """
+    ranks = np.arange(1, len(vocabulary) + 1)
+    word_probabilities = 1 / ranks ** ZIPF_EXPONENT
+    word_probabilities /= word_probabilities.sum()
+
+    lengths = np.clip(rng.lognormal(np.log(LENGTH_MEDIAN), LENGTH_SIGMA, n_rows), MIN_LENGTH, MAX_LENGTH).astype(int)
+    is_positive = rng.random(n_rows) < 0.5
+    n_words = int(lengths.sum())
+
+    words = vocabulary[rng.choice(len(vocabulary), size=n_words, p=word_probabilities)]
+
+    # polarity words follow the review sentiment, except for a noisy share
+    review_is_positive = np.repeat(is_positive, lengths)
+    polarity_positions = np.flatnonzero(rng.random(n_words) < POLARITY_WORD_RATE)
+    use_positive = review_is_positive[polarity_positions] ^ (rng.random(len(polarity_positions)) < POLARITY_NOISE)
+    positive_words = np.array(POSITIVE_WORDS, dtype=object)
+    negative_words = np.array(NEGATIVE_WORDS, dtype=object)
+    words[polarity_positions] = np.where(use_positive,
+                                         positive_words[rng.integers(len(positive_words), size=len(use_positive))],
+                                         negative_words[rng.integers(len(negative_words), size=len(use_positive))])
+
+    sentence_ends = rng.random(n_words) < SENTENCE_END_RATE
+    words[sentence_ends] = words[sentence_ends] + "."
+    line_breaks = rng.random(n_words) < LINE_BREAK_RATE
+    words[line_breaks] = words[line_breaks] + " <br /><br />"
+
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    reviews = [" ".join(words[start:end]).capitalize() + "."
+               for start, end in zip(offsets[:-1], offsets[1:])]
+    return pd.DataFrame({"review": reviews,
+                         "sentiment": np.where(is_positive, "positive", "negative")})
+
+
+def write_corpus(file_path: str, n_rows: int, random_state: int = 42, chunk_size: int = 10000,
+                 vocabulary_size: int = DEFAULT_VOCABULARY_SIZE) -> str:
+    """
+    Writes n_rows synthetic reviews as a csv with the columns of the IMDB dataset, chunk by chunk
+    so memory stays bounded at a million rows. The same random_state gives the same file.
+    file_path: str
+    n_rows: int
+    random_state: int
+    chunk_size: int rows generated at once
+    """
+    rng = np.random.default_rng(random_state)
+    vocabulary = build_vocabulary(vocabulary_size)
+    with DataChunkWriter(file_path=file_path) as writer:
+        for start in range(0, n_rows, chunk_size):
+            writer.write(generate_reviews(min(chunk_size, n_rows - start), rng, vocabulary))
+    return file_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--file", required=True, help="csv file to write")
+    parser.add_argument("--random-state", type=int, default=42)
+    args = parser.parse_args()
+    write_corpus(file_path=args.file, n_rows=args.rows, random_state=args.random_state)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compares reviews/sec of the original porter loop with TextNormalizer.
+
+usage: python -m IMDB.benchmark.text_normalization --file "IMDB Dataset.csv" [--rows 50000] [--n-jobs 1 4 8]
+"""
+from IMDB.util.text_normalizer import TextNormalizer, load_stopword_list
+from nltk.stem.porter import PorterStemmer
+import pandas as pd
+import argparse
+import time
+import re
+
+
+def legacy_porter(data):
+    """
+    Row by row implementation that util.porter used before TextNormalizer, kept as the baseline
+    data: pd.DataFrame with a review column
+    """
+    ps = PorterStemmer()
+    stopword_list = list(load_stopword_list('english'))
+    corpus = []
+    for i in range(0, len(data)):
+        review = re.sub('[^a-zA-Z0-9]', ' ', data['review'][i])
+        review = review.lower()
+        review = review.split()
+        review = [ps.stem(word) for word in review if not word in stopword_list]
+        review = ' '.join(review)
+        corpus.append(review)
+
+    return corpus
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(file_path: str, rows: int = None, n_jobs_list=(1,)) -> dict:
+    data = pd.read_csv(file_path, nrows=rows)
+
+    legacy_corpus, legacy_seconds = time_call(legacy_porter, data)
+
+    normalizer = TextNormalizer(stopword_list=list(load_stopword_list('english')))
+    corpus, seconds = time_call(normalizer.normalize_many, data['review'])
+
+    if corpus != legacy_corpus:
+        raise Exception("TextNormalizer output differs from the legacy porter output")
+
+    report = {
+        "rows": len(data),
+        "legacy_reviews_per_second": len(data) / legacy_seconds,
+        "normalizer_reviews_per_second": len(data) / seconds,
+        "speedup": legacy_seconds / seconds,
+        "stem_cache": normalizer.cache_info()._asdict(),
+    }
+
+    for n_jobs in n_jobs_list:
+        if n_jobs == 1:
+            continue
+        parallel_normalizer = TextNormalizer(stopword_list=list(load_stopword_list('english')))
+        parallel_corpus, parallel_seconds = time_call(parallel_normalizer.normalize_many, data['review'], n_jobs)
+        if parallel_corpus != corpus:
+            raise Exception(f"Output with n_jobs: [{n_jobs}] differs from the serial output")
+        report[f"n_jobs_{n_jobs}_reviews_per_second"] = len(data) / parallel_seconds
+        report[f"n_jobs_{n_jobs}_scaling"] = seconds / parallel_seconds
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--file", required=True, help="csv file with a review column")
+    parser.add_argument("--rows", type=int, default=None, help="number of rows to read, all by default")
+    parser.add_argument("--n-jobs", type=int, nargs="+", default=[1], help="worker counts to compare")
+    args = parser.parse_args()
+
+    for key, value in run_benchmark(file_path=args.file, rows=args.rows, n_jobs_list=args.n_jobs).items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Scores a csv or parquet file of reviews with the preprocessing object and model written by the training pipeline,
+in batches on a process pool, and reports the throughput of the run.
+
+usage: python -m IMDB.component.batch_prediction --input reviews.csv --preprocessed-object preprocessed.pkl
+                                                 --model model.pkl
+"""
+from IMDB.entity.artifact_entity import BatchPredictionArtifact
+from IMDB.entity.config_entity import BatchPredictionConfig
+from IMDB.util.imdb_predictor import IMDBPredictor
+from IMDB.util.util import iter_data_chunks, DataChunkWriter
+from IMDB.util.text_normalizer import get_worker_count
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from IMDB.exception import IMDBException
+from IMDB.logger import logging
+from IMDB.constant import *
+import argparse
+import time
+import sys
+
+# predictor owned by a process pool worker, loaded once by _init_worker
+_worker_predictor = None
+
+
+def _init_worker(preprocessed_object_file_path: str, trained_model_file_path: str, nltk_data_dir: str):
+    global _worker_predictor
+    _worker_predictor = IMDBPredictor(preprocessed_object_file_path=preprocessed_object_file_path,
+                                      trained_model_file_path=trained_model_file_path,
+                                      nltk_data_dir=nltk_data_dir)
+
+
+def _predict_batch(reviews):
+    return _worker_predictor.predict_sentiment(reviews)
+
+
+class BatchPrediction:
+
+    def __init__(self, batch_prediction_config: BatchPredictionConfig):
+        try:
+            logging.info(f"{'>>' * 20}Batch prediction log started.{'<<' * 20} ")
+            self.batch_prediction_config = batch_prediction_config
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def iter_predicted_batches(self):
+        """
+        Yields (batch dataframe, predicted sentiment) in input order. With more than one worker
+        batches are scored by a process pool, at most two batches per worker are in flight
+        so memory stays bounded by the batch size.
+        """
+        try:
+            config = self.batch_prediction_config
+            batches = iter_data_chunks(file_path=config.input_file_path,
+                                       file_format=config.input_file_format,
+                                       chunk_size=config.batch_size)
+            n_workers = get_worker_count(config.n_jobs)
+
+            if n_workers == 1:
+                predictor = IMDBPredictor(preprocessed_object_file_path=config.preprocessed_object_file_path,
+                                          trained_model_file_path=config.trained_model_file_path,
+                                          nltk_data_dir=config.nltk_data_dir)
+                for batch in batches:
+                    yield batch, predictor.predict_sentiment(batch[REVIEW_COLUMN_NAME])
+                return
+
+            with ProcessPoolExecutor(max_workers=n_workers,
+                                     initializer=_init_worker,
+                                     initargs=(config.preprocessed_object_file_path,
+                                               config.trained_model_file_path,
+                                               config.nltk_data_dir)) as executor:
+                in_flight = deque()
+                for batch in batches:
+                    in_flight.append((batch, executor.submit(_predict_batch, batch[REVIEW_COLUMN_NAME].tolist())))
+                    if len(in_flight) >= 2 * n_workers:
+                        batch, future = in_flight.popleft()
+                        yield batch, future.result()
+                while in_flight:
+                    batch, future = in_flight.popleft()
+                    yield batch, future.result()
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def initiate_batch_prediction(self) -> BatchPredictionArtifact:
+        try:
+            config = self.batch_prediction_config
+            logging.info(f"Scoring: [{config.input_file_path}] in batches of [{config.batch_size}] "
+                         f"with n_jobs: [{config.n_jobs}]")
+
+            start_time = time.perf_counter()
+            with DataChunkWriter(file_path=config.prediction_file_path,
+                                 file_format=config.prediction_file_format) as writer:
+                for batch, predicted_sentiment in self.iter_predicted_batches():
+                    batch = batch.copy(deep=False)
+                    batch[PREDICTION_COLUMN_NAME] = predicted_sentiment
+                    writer.write(batch)
+            elapsed_seconds = time.perf_counter() - start_time
+
+            n_reviews = writer.rows_written
+            reviews_per_second = n_reviews / elapsed_seconds if elapsed_seconds > 0 else 0.0
+            logging.info(f"Scored [{n_reviews}] reviews in [{elapsed_seconds:.2f}] seconds: "
+                         f"[{reviews_per_second:.1f}] reviews/sec")
+
+            batch_prediction_artifact = BatchPredictionArtifact(is_predicted=True,
+                                                                message="Batch prediction completed successfully.",
+                                                                prediction_file_path=config.prediction_file_path,
+                                                                n_reviews=n_reviews,
+                                                                elapsed_seconds=elapsed_seconds,
+                                                                reviews_per_second=reviews_per_second)
+            logging.info(f"Batch prediction artifact: {batch_prediction_artifact}")
+            return batch_prediction_artifact
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def __del__(self):
+        logging.info(f"{'>>' * 20}Batch prediction log completed.{'<<' * 20} \n\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="csv or parquet file with a review column")
+    parser.add_argument("--preprocessed-object", required=True, help="preprocessed.pkl written by the pipeline")
+    parser.add_argument("--model", required=True, help="model.pkl written by the model trainer")
+    args = parser.parse_args()
+
+    # imported here, the pipeline imports this module
+    from IMDB.pipeline.pipline import Pipeline
+
+    batch_prediction_artifact = Pipeline().run_batch_prediction(
+        input_file_path=args.input,
+        preprocessed_object_file_path=args.preprocessed_object,
+        trained_model_file_path=args.model)
+    print(f"scored {batch_prediction_artifact.n_reviews} reviews in "
+          f"{batch_prediction_artifact.elapsed_seconds:.2f}s: "
+          f"{batch_prediction_artifact.reviews_per_second:.1f} reviews/sec, "
+          f"predictions: {batch_prediction_artifact.prediction_file_path}")
+
+
+if __name__ == "__main__":
+    main()
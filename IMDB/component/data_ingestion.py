@@ -1,37 +1,231 @@
+from __future__ import annotations
+
 from IMDB.entity.artifact_entity import DataIngestionArtifact
 from IMDB.entity.config_entity import DataIngestionConfig
-from sklearn.model_selection import train_test_split
-from kaggle.api.kaggle_api_extended import KaggleApi
+from IMDB.util.util import get_hash_split_mask, get_file_path_with_format, save_data, DataChunkWriter, \
+    read_yaml_file, write_yaml_file, get_file_hash, get_dataset_dtypes, save_numpy_array_data, \
+    load_numpy_array_data
+from IMDB.util.near_duplicates import MinHasher, find_near_duplicate_groups, find_earlier_near_duplicates
+from IMDB.util.performance_recorder import performance_recorder
+from urllib.request import url2pathname
+from urllib.parse import urlparse
 from IMDB.exception import IMDBException
 from IMDB.logger import logging
-import pandas as pd
+from IMDB.util.lazy_import import lazy_import
+from IMDB.constant import *
+import itertools
+import zipfile
+import shutil
 import sys, os
 
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
 
 class DataIngestion:
 
-    def __init__(self, data_ingestion_config: DataIngestionConfig):
+    def __init__(self, data_ingestion_config: DataIngestionConfig, kaggle_api=None):
+        """
+        data_ingestion_config: DataIngestionConfig
+        kaggle_api: optional object with the KaggleApi dataset_download_files method,
+                    an authenticated KaggleApi is created on first download when not given
+        """
         try:
             logging.info(f"{'>>' * 20}Data Ingestion log started.{'<<' * 20} ")
             self.data_ingestion_config = data_ingestion_config
+            self.kaggle_api = kaggle_api
 
         except Exception as e:
             raise IMDBException(e, sys)
 
-    def download_imdb_data(self, ) -> str:
+    def get_kaggle_api(self):
+        try:
+            if self.kaggle_api is None:
+                # the kaggle package authenticates when imported, so it is only imported for a real download
+                from kaggle.api.kaggle_api_extended import KaggleApi
+                api = KaggleApi()
+                api.authenticate()
+                self.kaggle_api = api
+            return self.kaggle_api
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def get_download_cache_dir(self) -> str:
+        username = self.data_ingestion_config.author_username
+        dataset_name = self.data_ingestion_config.kaggel_dataset_name
+        dataset_version = self.data_ingestion_config.dataset_version
+        version = f"version_{dataset_version}" if dataset_version is not None else "latest"
+        return os.path.join(self.data_ingestion_config.download_cache_dir, username, dataset_name, version)
+
+    def is_download_cache_valid(self, cache_dir: str) -> bool:
+        """
+        Checks that every file recorded in the checksum file of cache_dir is present with the same sha256
+        """
+        try:
+            checksum_file_path = os.path.join(cache_dir, DOWNLOAD_CHECKSUM_FILE_NAME)
+            if not os.path.exists(checksum_file_path):
+                return False
+
+            checksums = read_yaml_file(file_path=checksum_file_path)
+            if not checksums:
+                return False
+
+            for file_name, checksum in checksums.items():
+                file_path = os.path.join(cache_dir, file_name)
+                if not os.path.exists(file_path) or get_file_hash(file_path) != checksum:
+                    logging.info(f"Checksum mismatch for cached file: [{file_path}]")
+                    return False
+            return True
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def get_mirror_path(self, mirror: str) -> str:
+        """
+        Returns the local path of a mirror given as a path or a file:// url
+        """
+        parsed_mirror = urlparse(mirror)
+        if parsed_mirror.scheme == "file":
+            return url2pathname(parsed_mirror.path)
+        if parsed_mirror.scheme not in ("", ) and not os.path.exists(mirror):
+            raise Exception(f"Mirror: [{mirror}] is neither a local path nor a file:// url")
+        return mirror
+
+    def fetch_from_mirror(self, mirror: str, download_path: str):
+        """
+        Copies the dataset from a local mirror: a directory, a zip file or a file:// url to one of them.
+        Zip files are extracted.
+        """
+        try:
+            mirror = self.get_mirror_path(mirror)
+
+            if os.path.isdir(mirror):
+                source_file_paths = [os.path.join(mirror, file_name) for file_name in sorted(os.listdir(mirror))]
+            elif os.path.isfile(mirror):
+                source_file_paths = [mirror]
+            else:
+                raise Exception(f"Mirror: [{mirror}] does not exist")
+
+            for source_file_path in source_file_paths:
+                if not os.path.isfile(source_file_path):
+                    continue
+                if zipfile.is_zipfile(source_file_path):
+                    with zipfile.ZipFile(source_file_path) as zip_file:
+                        zip_file.extractall(download_path)
+                else:
+                    shutil.copy2(source_file_path, download_path)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def fill_download_cache(self, cache_dir: str):
+        """
+        Downloads the dataset into cache_dir, from the configured mirror or else from Kaggle,
+        and records the sha256 of every file. Files land in a partial directory that is only
+        moved into place once complete, so an interrupted download is simply started over.
+        """
         try:
-            # extraction remote url to download dataset
             username = self.data_ingestion_config.author_username
             dataset_name = self.data_ingestion_config.kaggel_dataset_name
+            dataset_version = self.data_ingestion_config.dataset_version
+            mirror = self.data_ingestion_config.mirror
+
+            partial_cache_dir = f"{cache_dir}.partial"
+            shutil.rmtree(partial_cache_dir, ignore_errors=True)
+            os.makedirs(partial_cache_dir, exist_ok=True)
 
-            api = KaggleApi()
-            api.authenticate()
+            if mirror:
+                logging.info(f"Copying dataset from mirror :[{mirror}] into :[{partial_cache_dir}]")
+                self.fetch_from_mirror(mirror=mirror, download_path=partial_cache_dir)
+            else:
+                dataset = f"{username}/{dataset_name}"
+                if dataset_version is not None:
+                    dataset = f"{dataset}/{dataset_version}"
+                logging.info(f"Downloading file from :[https://www.kaggle.com/datasets/{username}/{dataset_name}] "
+                             f"into :[{partial_cache_dir}]")
+                self.get_kaggle_api().dataset_download_files(dataset, path=partial_cache_dir, unzip=True)
 
+            checksums = {file_name: get_file_hash(os.path.join(partial_cache_dir, file_name))
+                         for file_name in sorted(os.listdir(partial_cache_dir))
+                         if os.path.isfile(os.path.join(partial_cache_dir, file_name))}
+            if not checksums:
+                raise Exception(f"No dataset file was fetched into :[{partial_cache_dir}]")
+            write_yaml_file(file_path=os.path.join(partial_cache_dir, DOWNLOAD_CHECKSUM_FILE_NAME), data=checksums)
+
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            os.replace(partial_cache_dir, cache_dir)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def update_download_cache(self, cache_dir: str):
+        """
+        Adds the raw files published since the last run to cache_dir, for incremental ingestion.
+        Files of a mirror directory are compared with the cached ones by size and modification time,
+        only new or changed files are copied and hashed, so a run costs in proportion to the new files.
+        A Kaggle dataset or a zip file can only be fetched whole: a cached pinned dataset_version
+        is kept as it never changes, the latest version is fetched again.
+        """
+        try:
+            checksum_file_path = os.path.join(cache_dir, DOWNLOAD_CHECKSUM_FILE_NAME)
+            checksums = read_yaml_file(file_path=checksum_file_path) if os.path.exists(checksum_file_path) else None
+            mirror = self.data_ingestion_config.mirror
+            mirror_dir = self.get_mirror_path(mirror) if mirror else None
+            if not checksums or mirror_dir is None or not os.path.isdir(mirror_dir) or any(
+                    zipfile.is_zipfile(os.path.join(mirror_dir, file_name)) for file_name in os.listdir(mirror_dir)):
+                if mirror is None and self.data_ingestion_config.dataset_version is not None \
+                        and self.is_download_cache_valid(cache_dir):
+                    logging.info(f"Using cached dataset :[{cache_dir}]")
+                else:
+                    self.fill_download_cache(cache_dir)
+                return
+
+            new_checksums = {}
+            for file_name in sorted(os.listdir(mirror_dir)):
+                source_file_path = os.path.join(mirror_dir, file_name)
+                cached_file_path = os.path.join(cache_dir, file_name)
+                if not os.path.isfile(source_file_path):
+                    continue
+                if file_name in checksums and os.path.exists(cached_file_path):
+                    source_stat, cached_stat = os.stat(source_file_path), os.stat(cached_file_path)
+                    if (source_stat.st_size, source_stat.st_mtime_ns) == (cached_stat.st_size,
+                                                                          cached_stat.st_mtime_ns):
+                        continue
+                # replaced rather than written to, raw data directories of earlier runs hold links to cached files
+                shutil.copy2(source_file_path, f"{cached_file_path}.partial")
+                os.replace(f"{cached_file_path}.partial", cached_file_path)
+                new_checksums[file_name] = get_file_hash(cached_file_path)
+            logging.info(f"Copied [{len(new_checksums)}] new or changed files from mirror :[{mirror_dir}] "
+                         f"into :[{cache_dir}]: {list(new_checksums)}")
+            if new_checksums:
+                checksums.update(new_checksums)
+                write_yaml_file(file_path=f"{checksum_file_path}.partial", data=checksums)
+                os.replace(f"{checksum_file_path}.partial", checksum_file_path)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def download_imdb_data(self, ) -> str:
+        try:
             download_path = self.data_ingestion_config.raw_data_dir
+            cache_dir = self.get_download_cache_dir()
 
-            logging.info(f"Downloading file from :[https://www.kaggle.com/datasets/{username}/{dataset_name}] "
-                         f"into :[{download_path}]")
-            api.dataset_download_files(f'{username}/{dataset_name}', path=download_path, unzip=True)
+            if self.data_ingestion_config.incremental:
+                self.update_download_cache(cache_dir)
+            elif self.is_download_cache_valid(cache_dir):
+                logging.info(f"Using cached dataset :[{cache_dir}]")
+            else:
+                self.fill_download_cache(cache_dir)
+
+            os.makedirs(download_path, exist_ok=True)
+            for file_name in os.listdir(cache_dir):
+                if file_name == DOWNLOAD_CHECKSUM_FILE_NAME:
+                    continue
+                source_file_path = os.path.join(cache_dir, file_name)
+                target_file_path = os.path.join(download_path, file_name)
+                # a rerun under the same timestamp finds the link of its previous run
+                if os.path.lexists(target_file_path):
+                    os.remove(target_file_path)
+                try:
+                    os.link(source_file_path, target_file_path)
+                except OSError:
+                    shutil.copy2(source_file_path, target_file_path)
 
             logging.info(f"File :[{download_path}] has been downloaded successfully.")
             return download_path
@@ -41,39 +235,55 @@ class DataIngestion:
 
     def split_data_as_train_test(self) -> DataIngestionArtifact:
         try:
+            from sklearn.model_selection import train_test_split
+
             raw_data_dir = self.data_ingestion_config.raw_data_dir
 
             file_name = os.listdir(raw_data_dir)[0]
 
             imdb_file_path = os.path.join(raw_data_dir, file_name)
 
-            logging.info(f"Reading csv file: [{imdb_file_path}]")
-            imdb_data_frame = pd.read_csv(imdb_file_path)
+            file_format = self.data_ingestion_config.file_format
+
+            train_file_path = get_file_path_with_format(
+                os.path.join(self.data_ingestion_config.ingested_train_dir, file_name), file_format)
 
-            logging.info(f"Splitting data into train and test")
+            test_file_path = get_file_path_with_format(
+                os.path.join(self.data_ingestion_config.ingested_test_dir, file_name), file_format)
 
-            strat_train_set, strat_test_set = train_test_split(imdb_data_frame, test_size=0.2, random_state=42)
+            if self.data_ingestion_config.streaming:
+                self.stream_split_data_as_train_test(imdb_file_paths=[imdb_file_path],
+                                                     train_file_path=train_file_path,
+                                                     test_file_path=test_file_path)
+            else:
+                logging.info(f"Reading csv file: [{imdb_file_path}]")
+                dtype = self.get_raw_data_dtypes()
+                imdb_data_frame = pd.read_csv(imdb_file_path, dtype=dtype)
 
-            train_file_path = os.path.join(self.data_ingestion_config.ingested_train_dir,
-                                           file_name)
+                logging.info(f"Splitting data into train and test")
 
-            test_file_path = os.path.join(self.data_ingestion_config.ingested_test_dir,
-                                          file_name)
+                if self.data_ingestion_config.deduplicate:
+                    strat_train_set, strat_test_set = self.group_split_data_as_train_test(imdb_data_frame)
+                else:
+                    strat_train_set, strat_test_set = train_test_split(
+                        imdb_data_frame,
+                        test_size=self.data_ingestion_config.test_size,
+                        random_state=self.data_ingestion_config.random_state)
 
-            if strat_train_set is not None:
-                os.makedirs(self.data_ingestion_config.ingested_train_dir, exist_ok=True)
                 logging.info(f"Exporting training dataset to file: [{train_file_path}]")
-                strat_train_set.to_csv(train_file_path, index=False)
+                save_data(file_path=train_file_path, dataframe=strat_train_set, file_format=file_format,
+                          dtypes=dtype)
 
-            if strat_test_set is not None:
-                os.makedirs(self.data_ingestion_config.ingested_test_dir, exist_ok=True)
                 logging.info(f"Exporting testing dataset to file: [{test_file_path}]")
-                strat_test_set.to_csv(test_file_path, index=False)
+                save_data(file_path=test_file_path, dataframe=strat_test_set, file_format=file_format,
+                          dtypes=dtype)
 
             data_ingestion_artifact = DataIngestionArtifact(train_file_path=train_file_path,
                                                             test_file_path=test_file_path,
                                                             is_ingested=True,
-                                                            message=f"Data ingestion completed successfully."
+                                                            message=f"Data ingestion completed successfully.",
+                                                            file_format=file_format,
+                                                            is_incremental=False
                                                             )
             logging.info(f"Data Ingestion artifact:[{data_ingestion_artifact}]")
             return data_ingestion_artifact
@@ -81,9 +291,296 @@ class DataIngestion:
         except Exception as e:
             raise IMDBException(e, sys) from e
 
+    def get_raw_data_dtypes(self) -> dict:
+        """
+        Returns the schema dtypes the raw file is read with, None without schema_file_path.
+        Categories are the values read, values outside of the schema domain are left for the data validation.
+        """
+        try:
+            schema_file_path = self.data_ingestion_config.schema_file_path
+            if not schema_file_path:
+                return None
+            return get_dataset_dtypes(read_yaml_file(schema_file_path), use_domain_value=False)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def get_minhash_settings(self) -> dict:
+        """
+        Returns the settings signatures depend on, only signatures of equal settings can be compared
+        """
+        return {"num_perm": self.data_ingestion_config.minhash_num_perm,
+                "bands": self.data_ingestion_config.minhash_bands,
+                "shingle_size": self.data_ingestion_config.shingle_size,
+                "random_state": self.data_ingestion_config.random_state}
+
+    def get_minhash_signatures(self, reviews) -> np.ndarray:
+        """
+        Returns the MinHash signatures of the reviews, in file order
+        reviews: iterable of review text in file order, consumed lazily
+        """
+        try:
+            data_ingestion_config = self.data_ingestion_config
+            with performance_recorder.measure("minhash"):
+                hasher = MinHasher(num_perm=data_ingestion_config.minhash_num_perm,
+                                   shingle_size=data_ingestion_config.shingle_size,
+                                   random_state=data_ingestion_config.random_state)
+                return hasher.get_signatures_many(reviews, n_jobs=data_ingestion_config.n_jobs)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def get_near_duplicate_groups(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        Returns the near duplicate group of every review: the position of the first review
+        it is a near duplicate of, its own position if none
+        signatures: np.ndarray returned by get_minhash_signatures
+        """
+        try:
+            data_ingestion_config = self.data_ingestion_config
+            with performance_recorder.measure("near_duplicates") as measurement:
+                groups = find_near_duplicate_groups(signatures, bands=data_ingestion_config.minhash_bands,
+                                                    threshold=data_ingestion_config.near_duplicate_threshold)
+                is_copy = groups != np.arange(len(groups))
+                measurement.rows = len(groups)
+                measurement.extra.update(near_duplicate_rows=int(is_copy.sum()),
+                                         near_duplicate_groups=int(len(np.unique(groups[is_copy]))))
+
+            logging.info(f"Found [{measurement.extra['near_duplicate_rows']}] near duplicates of "
+                         f"[{measurement.extra['near_duplicate_groups']}] reviews out of [{len(groups)}] rows")
+            return groups
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def group_split_data_as_train_test(self, imdb_data_frame: pd.DataFrame):
+        """
+        Splits the first review of every near duplicate group with train_test_split,
+        its near duplicates follow it so no review leaks from the train to the test split.
+        Near duplicates are dropped instead when drop_near_duplicates is set.
+        """
+        try:
+            from sklearn.model_selection import train_test_split
+
+            reviews = imdb_data_frame[REVIEW_COLUMN_NAME].fillna("").astype(str)
+            groups = self.get_near_duplicate_groups(self.get_minhash_signatures(reviews))
+            is_first = groups == np.arange(len(groups))
+
+            _, test_rows = train_test_split(np.flatnonzero(is_first),
+                                            test_size=self.data_ingestion_config.test_size,
+                                            random_state=self.data_ingestion_config.random_state)
+            is_test_group = np.zeros(len(groups), dtype=bool)
+            is_test_group[test_rows] = True
+            is_test = is_test_group[groups]
+
+            keep = is_first if self.data_ingestion_config.drop_near_duplicates else np.ones(len(groups), dtype=bool)
+            return imdb_data_frame[keep & ~is_test], imdb_data_frame[keep & is_test]
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def get_earlier_split(self, signatures: np.ndarray, groups: np.ndarray, earlier_parts: list) -> np.ndarray:
+        """
+        Returns for every near duplicate group of the new rows the split of a near duplicate ingested
+        by an earlier incremental run: 1 for test, 0 for train, -1 if none.
+        Only the signatures of earlier parts hashed with the same minhash settings are searched.
+        signatures: np.ndarray of the new rows
+        groups: np.ndarray near duplicate group of every new row
+        earlier_parts: list of part dicts of the incremental state
+        """
+        try:
+            earlier_split = np.full(len(groups), -1, dtype=np.int8)
+            minhash_settings = self.get_minhash_settings()
+            comparable_parts = [earlier_part for earlier_part in earlier_parts
+                                if earlier_part.get("minhash_settings") == minhash_settings]
+            if len(comparable_parts) < len(earlier_parts):
+                logging.warning(f"[{len(earlier_parts) - len(comparable_parts)}] earlier parts have no signatures "
+                                f"of minhash settings {minhash_settings}, new rows are not matched against them")
+            with performance_recorder.measure("earlier_near_duplicates", rows=len(groups)):
+                for earlier_part in comparable_parts:
+                    rows = np.flatnonzero(earlier_split[groups] < 0)
+                    matches = find_earlier_near_duplicates(
+                        signatures[rows],
+                        load_numpy_array_data(file_path=earlier_part["signatures_file_path"], mmap_mode="r"),
+                        bands=self.data_ingestion_config.minhash_bands,
+                        threshold=self.data_ingestion_config.near_duplicate_threshold)
+                    is_matched = matches >= 0
+                    earlier_is_test = load_numpy_array_data(file_path=earlier_part["is_test_file_path"])
+                    np.maximum.at(earlier_split, groups[rows[is_matched]],
+                                  earlier_is_test[matches[is_matched]].astype(np.int8))
+            logging.info(f"Found [{int((earlier_split >= 0).sum())}] groups of new rows near duplicating rows "
+                         f"of [{len(comparable_parts)}] earlier parts")
+            return earlier_split
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def stream_split_data_as_train_test(self, imdb_file_paths: list, train_file_path: str, test_file_path: str,
+                                        earlier_parts: list = (), part: dict = None):
+        """
+        Reads the raw files chunk by chunk, one after the other, and appends every chunk to the train and test files.
+        Rows are assigned with get_hash_split_mask so memory stays bounded by chunk_size.
+        With deduplicate a first pass finds near duplicate groups, then near duplicates follow the first review
+        of their group, which always comes before them. Memory is then no longer bounded by chunk_size:
+        the signatures, minhash_num_perm uint32 per row, and the group of every row are held for all the files.
+        earlier_parts: list of part dicts of earlier incremental runs, a group near duplicating one of their rows
+                       follows its split and is dropped with drop_near_duplicates
+        part: dict of this incremental run, with deduplicate the signatures and split of the written rows
+              are saved to its signatures_file_path and is_test_file_path for the next runs
+        return: tuple of the number of rows written to the train and test files
+        """
+        try:
+            chunk_size = self.data_ingestion_config.chunk_size
+            test_size = self.data_ingestion_config.test_size
+            random_state = self.data_ingestion_config.random_state
+            file_format = self.data_ingestion_config.file_format
+
+            dtype = self.get_raw_data_dtypes()
+
+            groups = None
+            if self.data_ingestion_config.deduplicate:
+                review_chunks = itertools.chain.from_iterable(
+                    pd.read_csv(imdb_file_path, usecols=[REVIEW_COLUMN_NAME], chunksize=chunk_size, dtype=dtype)
+                    for imdb_file_path in imdb_file_paths)
+                signatures = self.get_minhash_signatures(itertools.chain.from_iterable(
+                    chunk[REVIEW_COLUMN_NAME].fillna("").astype(str) for chunk in review_chunks))
+                groups = self.get_near_duplicate_groups(signatures)
+                is_test_row = np.zeros(len(groups), dtype=bool)
+                earlier_split = self.get_earlier_split(signatures, groups, earlier_parts)
+                written_rows, written_is_test = [], []
+
+            logging.info(f"Streaming csv files: {imdb_file_paths} in chunks of [{chunk_size}] rows "
+                         f"into [{train_file_path}] and [{test_file_path}]")
+            with DataChunkWriter(file_path=train_file_path, file_format=file_format, dtypes=dtype) as train_writer, \
+                    DataChunkWriter(file_path=test_file_path, file_format=file_format, dtypes=dtype) as test_writer:
+                start = 0
+                chunks = itertools.chain.from_iterable(pd.read_csv(imdb_file_path, chunksize=chunk_size, dtype=dtype)
+                                                       for imdb_file_path in imdb_file_paths)
+                for chunk in chunks:
+                    is_test = get_hash_split_mask(chunk, test_size=test_size, random_state=random_state)
+                    if groups is not None:
+                        rows = np.arange(start, start + len(chunk))
+                        start += len(rows)
+                        chunk_groups = groups[rows]
+                        is_test_row[rows] = is_test
+                        chunk_earlier_split = earlier_split[chunk_groups]
+                        is_test = np.where(chunk_earlier_split >= 0, chunk_earlier_split == 1,
+                                           is_test_row[chunk_groups])
+                        if self.data_ingestion_config.drop_near_duplicates:
+                            keep = (chunk_groups == rows) & (chunk_earlier_split < 0)
+                            chunk, is_test, rows = chunk[keep], is_test[keep], rows[keep]
+                        written_rows.append(rows)
+                        written_is_test.append(is_test)
+                    train_writer.write(chunk[~is_test])
+                    test_writer.write(chunk[is_test])
+
+            if part is not None and groups is not None:
+                written_rows = np.concatenate(written_rows) if written_rows else np.zeros(0, dtype=np.int64)
+                save_numpy_array_data(file_path=part["signatures_file_path"], array=signatures[written_rows])
+                save_numpy_array_data(file_path=part["is_test_file_path"],
+                                      array=np.concatenate(written_is_test) if written_is_test
+                                      else np.zeros(0, dtype=bool))
+
+            logging.info(f"Exported [{train_writer.rows_written}] training rows "
+                         f"and [{test_writer.rows_written}] testing rows")
+            return train_writer.rows_written, test_writer.rows_written
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def split_new_data_as_train_test(self) -> DataIngestionArtifact:
+        """
+        Incremental ingestion: only the raw files no earlier run ingested, recognized by their sha256,
+        are split into train and test files holding the new rows. Rows are assigned with get_hash_split_mask,
+        which only depends on the content of a row, so a review goes to the same split whatever the run
+        ingesting it. The state file of incremental_dir records the ingested raw files and the split files
+        of every run, which together make up the append only train and test splits.
+        The new state is written next to it and only replaces it in commit_incremental_state, once the new rows
+        are transformed, so the raw files of a run failing before that are new again to the next run.
+        With deduplicate every part keeps the MinHash signatures of its rows, new rows near duplicating
+        a row of an earlier part follow its split.
+        """
+        try:
+            raw_data_dir = self.data_ingestion_config.raw_data_dir
+            file_format = self.data_ingestion_config.file_format
+            state_file_path = os.path.join(self.data_ingestion_config.incremental_dir, INCREMENTAL_STATE_FILE_NAME)
+            state = read_yaml_file(file_path=state_file_path) if os.path.exists(state_file_path) else None
+            state = state or {"raw_files": {}, "parts": []}
+
+            # raw files are links of the cached ones, whose sha256 the download cache already recorded
+            checksum_file_path = os.path.join(self.get_download_cache_dir(), DOWNLOAD_CHECKSUM_FILE_NAME)
+            checksums = read_yaml_file(file_path=checksum_file_path) if os.path.exists(checksum_file_path) else None
+            checksums = checksums or {}
+            new_raw_files = {}
+            for file_name in sorted(os.listdir(raw_data_dir)):
+                file_hash = checksums.get(file_name) or get_file_hash(os.path.join(raw_data_dir, file_name))
+                if file_hash not in state["raw_files"] and file_hash not in new_raw_files:
+                    new_raw_files[file_hash] = file_name
+            logging.info(f"Found [{len(new_raw_files)}] new raw files out of [{len(os.listdir(raw_data_dir))}]: "
+                         f"{list(new_raw_files.values())}")
+            if not new_raw_files:
+                return DataIngestionArtifact(train_file_path=None,
+                                             test_file_path=None,
+                                             is_ingested=False,
+                                             message=f"No new raw file in [{raw_data_dir}] since the last run.",
+                                             file_format=file_format,
+                                             is_incremental=True)
+
+            file_name = next(iter(new_raw_files.values()))
+            train_file_path = get_file_path_with_format(
+                os.path.join(self.data_ingestion_config.ingested_train_dir, file_name), file_format)
+            test_file_path = get_file_path_with_format(
+                os.path.join(self.data_ingestion_config.ingested_test_dir, file_name), file_format)
+
+            # new files are named after the number of parts, those of a run never committed are overwritten
+            incremental_dir = self.data_ingestion_config.incremental_dir
+            part_number = len(state["parts"])
+            part = {"train_file_path": train_file_path, "test_file_path": test_file_path}
+            if self.data_ingestion_config.deduplicate:
+                part.update(minhash_settings=self.get_minhash_settings(),
+                            signatures_file_path=os.path.join(
+                                incremental_dir, f"{MINHASH_SIGNATURES_FILE_NAME}-{part_number:05d}.npy"),
+                            is_test_file_path=os.path.join(
+                                incremental_dir, f"{NEAR_DUPLICATE_SPLIT_FILE_NAME}-{part_number:05d}.npy"))
+
+            train_rows, test_rows = self.stream_split_data_as_train_test(
+                imdb_file_paths=[os.path.join(raw_data_dir, file_name) for file_name in new_raw_files.values()],
+                train_file_path=train_file_path,
+                test_file_path=test_file_path,
+                earlier_parts=state["parts"],
+                part=part)
+
+            state["raw_files"].update(new_raw_files)
+            part.update(train_rows=train_rows, test_rows=test_rows)
+            state["parts"].append(part)
+            write_yaml_file(file_path=f"{state_file_path}{PENDING_STATE_FILE_EXTENSION}", data=state)
+            logging.info(f"Train and test splits will have [{sum(part['train_rows'] for part in state['parts'])}] "
+                         f"and [{sum(part['test_rows'] for part in state['parts'])}] rows "
+                         f"in [{len(state['parts'])}] parts once committed")
+
+            return DataIngestionArtifact(train_file_path=train_file_path,
+                                         test_file_path=test_file_path,
+                                         is_ingested=True,
+                                         message=f"Ingested [{train_rows + test_rows}] new rows.",
+                                         file_format=file_format,
+                                         is_incremental=True)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def commit_incremental_state(self):
+        """
+        Records the raw files and split files of the last split_new_data_as_train_test as ingested.
+        Called by the pipeline once the new rows are transformed.
+        """
+        try:
+            state_file_path = os.path.join(self.data_ingestion_config.incremental_dir, INCREMENTAL_STATE_FILE_NAME)
+            pending_state_file_path = f"{state_file_path}{PENDING_STATE_FILE_EXTENSION}"
+            if not os.path.exists(pending_state_file_path):
+                raise Exception(f"No pending incremental state: [{pending_state_file_path}] to commit")
+            os.replace(pending_state_file_path, state_file_path)
+            logging.info(f"Committed incremental state: [{state_file_path}]")
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
     def initiate_data_ingestion(self) -> DataIngestionArtifact:
         try:
             self.download_imdb_data()
+            if self.data_ingestion_config.incremental:
+                return self.split_new_data_as_train_test()
             return self.split_data_as_train_test()
         except Exception as e:
             raise IMDBException(e, sys) from e
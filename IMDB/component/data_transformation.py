@@ -1,15 +1,41 @@
+from __future__ import annotations
+
 from IMDB.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, \
     DataTransformationArtifact
-from IMDB.util.util import load_data, read_yaml_file, save_numpy_array_data, save_object
+from IMDB.util.util import load_data, read_yaml_file, save_numpy_array_data, save_object, \
+    save_sparse_array_data, load_data_in_chunks, save_sparse_shard_manifest, load_object, save_fitted_object, \
+    get_file_hash, get_fingerprint, get_label_codes, load_fitted_object, read_data, save_data, write_yaml_file
+from IMDB.util.token_corpus import TokenCorpus, TOKEN_CORPUS_VERSION, fit_transform_count_vectorizer, \
+    transform_count_vectorizer
 from IMDB.entity.config_entity import DataTransformationConfig
-from sklearn.feature_extraction.text import CountVectorizer
 from IMDB.exception import IMDBException
 from IMDB.logger import logging
 from IMDB.constant import *
 from IMDB.util.util import porter
-import numpy as np
+from IMDB.util.text_normalizer import load_stopword_list, get_normalizer_settings
+from IMDB.util.performance_recorder import performance_recorder
+from IMDB.util.task_graph import TaskGraph
+from IMDB.util.feature_selection import get_feature_scores, get_top_columns, reduce_vocabulary
+from IMDB.util.lazy_import import lazy_import
+from functools import partial
+import tempfile
+import shutil
 import sys, os
 
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+def get_n_features(preprocessing_obj) -> int:
+    """
+    Returns the number of columns of the matrices of a featurizer with a fixed vocabulary or a hashing one
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    if isinstance(preprocessing_obj, HashingVectorizer):
+        return preprocessing_obj.n_features
+    return len(preprocessing_obj.vocabulary)
+
 
 class DataTransformation:
 
@@ -26,68 +52,652 @@ class DataTransformation:
         except Exception as e:
             raise IMDBException(e, sys) from e
 
-    def initiate_data_transformation(self) -> DataTransformationArtifact:
+    def get_data_transformer_object(self):
+        """
+        Returns the featurizer selected by data_transformation_config.featurizer:
+        a CountVectorizer keeping the max_features most frequent n-grams, or a fit free
+        HashingVectorizer counting n-grams into n_features columns.
+        """
         try:
-            logging.info(f"Obtaining preprocessing object.")
-            preprocessing_obj = CountVectorizer(max_features=25000, ngram_range=(1, 2))
+            from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
 
-            logging.info(f"Obtaining training and test file path.")
-            train_file_path = self.data_ingestion_artifact.train_file_path
-            test_file_path = self.data_ingestion_artifact.test_file_path
+            featurizer = self.data_transformation_config.featurizer
+            ngram_range = tuple(self.data_transformation_config.ngram_range)
+
+            if featurizer == COUNT_FEATURIZER:
+                return CountVectorizer(max_features=self.data_transformation_config.max_features,
+                                       ngram_range=ngram_range)
+            if featurizer == HASHING_FEATURIZER:
+                return HashingVectorizer(n_features=self.data_transformation_config.n_features,
+                                         ngram_range=ngram_range,
+                                         alternate_sign=False,
+                                         norm=None,
+                                         dtype=np.int64)
+            raise Exception(f"Featurizer: [{featurizer}] is not one of "
+                            f"{[COUNT_FEATURIZER, HASHING_FEATURIZER]}")
+        except Exception as e:
+            raise IMDBException(e, sys) from e
 
+    def iter_normalized_chunks(self, file_path: str):
+        """
+        Streams an ingested split and yields (normalized reviews, target) of at most shard_size rows
+        file_path: str location of the ingested split
+        """
+        try:
             schema_file_path = self.data_validation_artifact.schema_file_path
+            target_column_name = read_yaml_file(file_path=schema_file_path)[TARGET_COLUMNS_KEY]
+
+            for dataframe in load_data_in_chunks(file_path=file_path,
+                                                 schema_file_path=schema_file_path,
+                                                 file_format=self.data_ingestion_artifact.file_format,
+                                                 chunk_size=self.data_transformation_config.shard_size):
+                input_feature = porter(dataframe.drop(columns=[target_column_name]),
+                                       n_jobs=self.data_transformation_config.n_jobs,
+                                       chunk_size=self.data_transformation_config.chunk_size,
+                                       nltk_data_dir=self.data_transformation_config.nltk_data_dir)
+                yield input_feature, get_label_codes(dataframe[target_column_name], SENTIMENT_LABELS)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
 
-            logging.info(f"Loading training and test data as pandas dataframe.")
-            train_df = load_data(file_path=train_file_path, schema_file_path=schema_file_path)
+    def prune_term_statistics(self, term_statistics: pd.DataFrame, max_terms: int):
+        """
+        Keeps the max_terms n-grams with the highest term_count, ties broken alphabetically
+        return: tuple of the kept statistics and the highest term_count dropped, 0 if none
+        """
+        if max_terms is None or len(term_statistics) <= max_terms:
+            return term_statistics, 0
+        term_counts = term_statistics["term_count"].sort_index()
+        term_counts = term_counts.sort_values(ascending=False, kind="stable")
+        return term_statistics.loc[term_counts.index[:max_terms]], int(term_counts.iloc[max_terms])
 
-            test_df = load_data(file_path=test_file_path, schema_file_path=schema_file_path)
+    def get_term_statistics(self, normalized_chunks) -> pd.DataFrame:
+        """
+        Counts every n-gram chunk by chunk, its occurrences as term_count and the reviews it occurs in
+        as document_frequency, added to running totals after every chunk. Memory is bounded by
+        max_candidate_terms plus the n-grams of one chunk: once the totals hold more n-grams, only the
+        max_candidate_terms most frequent are kept, as in lossy counting. Counts are exact while the corpus
+        has fewer distinct n-grams, beyond that the hashing featurizer needs no vocabulary at all.
+        normalized_chunks: iterable of (normalized reviews, target)
+        return: pd.DataFrame indexed by n-gram
+        """
+        try:
+            from sklearn.feature_extraction.text import CountVectorizer
+
+            ngram_range = tuple(self.data_transformation_config.ngram_range)
+            max_candidate_terms = self.data_transformation_config.max_candidate_terms
 
-            schema = read_yaml_file(file_path=schema_file_path)
+            term_statistics = None
+            max_dropped_term_count = 0
+            for input_feature, _ in normalized_chunks:
+                chunk_vectorizer = CountVectorizer(ngram_range=ngram_range)
+                try:
+                    with performance_recorder.measure("fit_transform", rows=len(input_feature)):
+                        chunk_counts = chunk_vectorizer.fit_transform(input_feature)
+                except ValueError:
+                    # every review of the chunk is empty after normalization
+                    continue
+                chunk_statistics = pd.DataFrame(
+                    {"term_count": np.asarray(chunk_counts.sum(axis=0)).ravel(),
+                     # a review holds every n-gram it contains once in its row
+                     "document_frequency": np.bincount(chunk_counts.indices, minlength=chunk_counts.shape[1])},
+                    index=chunk_vectorizer.get_feature_names_out())
+                if term_statistics is None:
+                    term_statistics = chunk_statistics
+                else:
+                    term_statistics = pd.concat([term_statistics, chunk_statistics]).groupby(level=0,
+                                                                                             sort=False).sum()
 
-            target_column_name = schema[TARGET_COLUMNS_KEY]
+                term_statistics, dropped_term_count = self.prune_term_statistics(term_statistics,
+                                                                                 max_terms=max_candidate_terms)
+                max_dropped_term_count = max(max_dropped_term_count, dropped_term_count)
+
+            if max_dropped_term_count:
+                logging.warning(f"Kept the [{max_candidate_terms}] most frequent n-grams only, n-grams seen up to "
+                                f"[{max_dropped_term_count}] times were dropped and may be undercounted if seen again. "
+                                f"Raise max_candidate_terms for exact counts or use the "
+                                f"[{HASHING_FEATURIZER}] featurizer")
+            if term_statistics is None:
+                return pd.DataFrame({"term_count": [], "document_frequency": []}, dtype=np.int64)
+            return term_statistics
+        except Exception as e:
+            raise IMDBException(e, sys) from e
 
-            logging.info(f"Splitting input and target feature from training and testing dataframe.")
-            input_train_df = train_df.drop(columns=[target_column_name], axis=1)
-            input_feature_train_df = porter(input_train_df)
-            target_feature_train_df = train_df[target_column_name].map({"positive": 1, "negative": 0})
+    def get_vocabulary_terms(self, term_statistics: pd.DataFrame) -> list:
+        """
+        Returns the max_features n-grams with the highest term_count, ties broken alphabetically,
+        in alphabetical order
+        term_statistics: pd.DataFrame returned by get_term_statistics
+        """
+        max_features = self.data_transformation_config.max_features
+        term_counts = term_statistics["term_count"].sort_index()
+        selected_terms = term_counts.sort_values(ascending=False, kind="stable").index
+        if max_features is not None:
+            selected_terms = selected_terms[:max_features]
+        return sorted(selected_terms)
 
-            input_test_df = test_df.drop(columns=[target_column_name], axis=1)
-            input_feature_test_df = porter(input_test_df)
-            target_feature_test_df = test_df[target_column_name].map({"positive": 1, "negative": 0})
+    def fit_vocabulary_out_of_core(self, normalized_chunks) -> CountVectorizer:
+        """
+        Counts every n-gram chunk by chunk and returns a CountVectorizer fixed to the max_features
+        most frequent ones, ties broken alphabetically. Only the term counts are held in memory,
+        at most max_candidate_terms of them, see get_term_statistics.
+        normalized_chunks: iterable of (normalized reviews, target)
+        """
+        try:
+            from sklearn.feature_extraction.text import CountVectorizer
 
-            logging.info(f"Applying preprocessing object on training dataframe and testing dataframe")
-            input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df).toarray()
-            input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df).toarray()
+            term_statistics = self.get_term_statistics(normalized_chunks)
+            if term_statistics.empty:
+                raise Exception("Empty vocabulary: every review of the training split is empty after normalization")
+            vocabulary = {term: index for index, term in enumerate(self.get_vocabulary_terms(term_statistics))}
+            logging.info(f"Fitted vocabulary of [{len(vocabulary)}] terms out of [{len(term_statistics)}]")
+            return CountVectorizer(vocabulary=vocabulary,
+                                   ngram_range=tuple(self.data_transformation_config.ngram_range))
+        except Exception as e:
+            raise IMDBException(e, sys) from e
 
-            train_arr = np.c_[input_feature_train_arr, target_feature_train_df]
+    def save_sparse_shards(self, preprocessing_obj, normalized_chunks, transformed_dir: str,
+                           file_name: str) -> str:
+        """
+        Vectorizes every chunk and saves it as a numbered sparse shard, then writes their manifest
+        preprocessing_obj: fitted or fit free featurizer
+        normalized_chunks: iterable of (normalized reviews, target)
+        transformed_dir: str
+        file_name: str name of the split without extension
+        return: str location of the manifest
+        """
+        try:
+            shards = self.write_sparse_shards(preprocessing_obj=preprocessing_obj,
+                                              normalized_chunks=normalized_chunks,
+                                              transformed_dir=transformed_dir,
+                                              file_name=file_name)
+            manifest_file_path = os.path.join(transformed_dir, f"{file_name}{SHARD_MANIFEST_EXTENSION}")
+            save_sparse_shard_manifest(file_path=manifest_file_path, shards=shards,
+                                       n_features=get_n_features(preprocessing_obj))
+            return manifest_file_path
+        except Exception as e:
+            raise IMDBException(e, sys) from e
 
-            test_arr = np.c_[input_feature_test_arr, target_feature_test_df]
+    def write_sparse_shards(self, preprocessing_obj, normalized_chunks, transformed_dir: str,
+                            file_name: str) -> list:
+        """
+        Vectorizes every chunk and saves it as a numbered sparse shard
+        return: list of dict with the file_path, n_rows and nnz of every shard
+        """
+        try:
+            shards = []
+            for shard_number, (input_feature, target_feature) in enumerate(normalized_chunks):
+                with performance_recorder.measure("transform", rows=len(input_feature)):
+                    input_feature_arr = preprocessing_obj.transform(input_feature)
+                shard_file_path = os.path.join(transformed_dir, SHARD_DIR_NAME, f"{file_name}-{shard_number:05d}.npz")
+                save_sparse_array_data(file_path=shard_file_path, array=input_feature_arr, target=target_feature)
+                shards.append({"file_path": shard_file_path,
+                               "n_rows": input_feature_arr.shape[0],
+                               "nnz": input_feature_arr.nnz})
+                logging.info(f"Saved shard: [{shard_file_path}] with [{input_feature_arr.shape[0]}] rows")
+            return shards
+        except Exception as e:
+            raise IMDBException(e, sys) from e
 
+    def save_normalized_chunks(self, file_path: str, normalized_dir: str) -> list:
+        """
+        Normalizes a split chunk by chunk into normalized_dir, so later passes over it skip stemming
+        return: list of the files of the chunks, loaded with load_object
+        """
+        try:
+            logging.info(f"Normalizing [{file_path}] into: [{normalized_dir}]")
+            normalized_chunk_file_paths = []
+            for chunk_number, normalized_chunk in enumerate(self.iter_normalized_chunks(file_path)):
+                normalized_chunk_file_path = os.path.join(normalized_dir, f"{chunk_number:05d}.pkl")
+                save_object(file_path=normalized_chunk_file_path, obj=normalized_chunk)
+                normalized_chunk_file_paths.append(normalized_chunk_file_path)
+            return normalized_chunk_file_paths
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def initiate_out_of_core_data_transformation(self) -> DataTransformationArtifact:
+        """
+        Transforms the splits shard_size rows at a time into sparse shards plus a manifest per split,
+        so peak memory is bounded by the shard size instead of the corpus size. A count featurizer
+        takes a first pass over the training split to fit its vocabulary, the normalized chunks
+        are kept in a temporary directory so the reviews are only stemmed once.
+        """
+        try:
+            from sklearn.feature_extraction.text import CountVectorizer
+
+            train_file_path = self.data_ingestion_artifact.train_file_path
+            test_file_path = self.data_ingestion_artifact.test_file_path
             transformed_train_dir = self.data_transformation_config.transformed_train_dir
             transformed_test_dir = self.data_transformation_config.transformed_test_dir
+            train_file_name = os.path.splitext(os.path.basename(train_file_path))[0]
+            test_file_name = os.path.splitext(os.path.basename(test_file_path))[0]
 
-            train_file_name = os.path.basename(train_file_path).replace(".csv", ".npz")
-            test_file_name = os.path.basename(test_file_path).replace(".csv", ".npz")
+            preprocessing_obj = self.get_data_transformer_object()
 
-            transformed_train_file_path = os.path.join(transformed_train_dir, train_file_name)
-            transformed_test_file_path = os.path.join(transformed_test_dir, test_file_name)
+            os.makedirs(transformed_train_dir, exist_ok=True)
+            with tempfile.TemporaryDirectory(dir=transformed_train_dir) as normalized_dir:
+                if isinstance(preprocessing_obj, CountVectorizer):
+                    normalized_chunk_file_paths = self.save_normalized_chunks(train_file_path, normalized_dir)
 
-            logging.info(f"Saving transformed training and testing array.")
+                    logging.info(f"Fitting vocabulary over [{len(normalized_chunk_file_paths)}] chunks")
+                    preprocessing_obj = self.fit_vocabulary_out_of_core(
+                        load_object(file_path) for file_path in normalized_chunk_file_paths)
+                    train_chunks = (load_object(file_path) for file_path in normalized_chunk_file_paths)
+                else:
+                    train_chunks = self.iter_normalized_chunks(train_file_path)
 
-            save_numpy_array_data(file_path=transformed_train_file_path, array=train_arr)
-            save_numpy_array_data(file_path=transformed_test_file_path, array=test_arr)
+                logging.info(f"Saving transformed training shards.")
+                transformed_train_file_path = self.save_sparse_shards(preprocessing_obj=preprocessing_obj,
+                                                                      normalized_chunks=train_chunks,
+                                                                      transformed_dir=transformed_train_dir,
+                                                                      file_name=train_file_name)
+
+            logging.info(f"Saving transformed testing shards.")
+            transformed_test_file_path = self.save_sparse_shards(preprocessing_obj=preprocessing_obj,
+                                                                 normalized_chunks=self.iter_normalized_chunks(
+                                                                     test_file_path),
+                                                                 transformed_dir=transformed_test_dir,
+                                                                 file_name=test_file_name)
 
             preprocessing_obj_file_path = self.data_transformation_config.preprocessed_object_file_path
 
             logging.info(f"Saving preprocessing object.")
-            save_object(file_path=preprocessing_obj_file_path, obj=preprocessing_obj)
+            save_fitted_object(file_path=preprocessing_obj_file_path, obj=preprocessing_obj,
+                               compress=self.data_transformation_config.compress)
+
+            data_transformation_artifact = DataTransformationArtifact(is_transformed=True,
+                                                                      message="Data transformation successfully.",
+                                                                      transformed_train_file_path=transformed_train_file_path,
+                                                                      transformed_test_file_path=transformed_test_file_path,
+                                                                      preprocessed_object_file_path=preprocessing_obj_file_path,
+                                                                      is_sparse=True,
+                                                                      is_sharded=True
+                                                                      )
+            logging.info(f"Data transformation artifact: {data_transformation_artifact}")
+            return data_transformation_artifact
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def update_term_summary(self, term_summary: pd.DataFrame, term_statistics: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds the counts of the new rows to the running totals of earlier runs and keeps the
+        TERM_SUMMARY_TERMS_PER_FEATURE * max_features most frequent n-grams, as in lossy counting,
+        so the summary every run reads and rewrites stays small however many rows were ingested
+        term_summary: pd.DataFrame running totals of earlier runs, None on the first run
+        term_statistics: pd.DataFrame counts of the new rows
+        """
+        max_features = self.data_transformation_config.max_features
+        max_terms = TERM_SUMMARY_TERMS_PER_FEATURE * max_features if max_features is not None \
+            else self.data_transformation_config.max_candidate_terms
+        if term_summary is not None:
+            term_statistics = pd.concat([term_summary, term_statistics]).groupby(level=0, sort=False).sum()
+        term_summary, _ = self.prune_term_statistics(term_statistics, max_terms=max_terms)
+        return term_summary
+
+    def get_vocabulary_drift(self, preprocessing_obj, term_statistics: pd.DataFrame) -> float:
+        """
+        Returns the share of the max_features most frequent n-grams of term_statistics
+        that are not in the vocabulary of preprocessing_obj
+        term_statistics: pd.DataFrame of the rows to compare with the vocabulary
+        """
+        vocabulary_terms = self.get_vocabulary_terms(term_statistics)
+        if not vocabulary_terms:
+            return 0.0
+        return 1.0 - len(set(vocabulary_terms).intersection(preprocessing_obj.vocabulary)) / len(vocabulary_terms)
+
+    def initiate_incremental_data_transformation(self) -> DataTransformationArtifact:
+        """
+        Transforms only the rows ingested by this run into sparse shards, which are listed after the shards
+        of earlier runs in the manifests of this run. The first run fixes the featurizer, a count featurizer
+        takes the max_features most frequent n-grams, later runs keep it so the columns of every shard agree.
+        The term counts and document frequencies of the new training rows are saved as a file of their own,
+        earlier files are never read or rewritten and their sum gives the counts of every row. Their running
+        totals are only kept for the most frequent n-grams, see update_term_summary, and the share of the
+        max_features most frequent ones missing from the vocabulary is logged as vocabulary_drift,
+        a warning asks for a full run to refit it once it exceeds max_vocabulary_drift.
+        The state of incremental_dir is replaced at the end of the run, so an interrupted run leaves it untouched.
+        """
+        try:
+            from sklearn.feature_extraction.text import CountVectorizer
+
+            config = self.data_transformation_config
+            train_file_path = self.data_ingestion_artifact.train_file_path
+            test_file_path = self.data_ingestion_artifact.test_file_path
+            train_file_name = os.path.splitext(os.path.basename(train_file_path))[0]
+            test_file_name = os.path.splitext(os.path.basename(test_file_path))[0]
+
+            state_file_path = os.path.join(config.incremental_dir, INCREMENTAL_STATE_FILE_NAME)
+            state = read_yaml_file(file_path=state_file_path) if os.path.exists(state_file_path) else None
+            state = state or {"parts": [], "preprocessed_object_file_path": None, "term_statistics_file_paths": [],
+                              "term_summary_file_path": None, "n_features": None, "vocabulary_drift": 0.0,
+                              "train_shards": [], "test_shards": []}
+
+            if train_file_path in state["parts"]:
+                logging.info(f"[{train_file_path}] was already transformed by an earlier run")
+            else:
+                if state["preprocessed_object_file_path"] is None:
+                    preprocessing_obj = self.get_data_transformer_object()
+                else:
+                    preprocessing_obj = load_fitted_object(file_path=state["preprocessed_object_file_path"])
+                term_statistics, term_summary = None, None
+                os.makedirs(config.transformed_train_dir, exist_ok=True)
+                with tempfile.TemporaryDirectory(dir=config.transformed_train_dir) as normalized_dir:
+                    normalized_chunk_file_paths = self.save_normalized_chunks(train_file_path, normalized_dir)
+                    if isinstance(preprocessing_obj, CountVectorizer):
+                        term_statistics = self.get_term_statistics(
+                            load_object(file_path) for file_path in normalized_chunk_file_paths)
+                        if state["preprocessed_object_file_path"] is None:
+                            vocabulary_terms = self.get_vocabulary_terms(term_statistics)
+                            if not vocabulary_terms:
+                                raise Exception("Empty vocabulary: every review of the training split "
+                                                "is empty after normalization")
+                            preprocessing_obj = CountVectorizer(
+                                vocabulary={term: index for index, term in enumerate(vocabulary_terms)},
+                                ngram_range=tuple(config.ngram_range))
+                        if state["term_summary_file_path"] is not None:
+                            term_summary = read_data(file_path=state["term_summary_file_path"],
+                                                     file_format=PARQUET_FILE_FORMAT).set_index("term")
+                        term_summary = self.update_term_summary(term_summary, term_statistics)
+                        state["vocabulary_drift"] = self.get_vocabulary_drift(preprocessing_obj, term_summary)
+
+                    logging.info(f"Saving transformed training shards.")
+                    train_shards = self.write_sparse_shards(
+                        preprocessing_obj=preprocessing_obj,
+                        normalized_chunks=(load_object(file_path) for file_path in normalized_chunk_file_paths),
+                        transformed_dir=config.transformed_train_dir,
+                        file_name=train_file_name)
+
+                logging.info(f"Saving transformed testing shards.")
+                test_shards = self.write_sparse_shards(preprocessing_obj=preprocessing_obj,
+                                                       normalized_chunks=self.iter_normalized_chunks(test_file_path),
+                                                       transformed_dir=config.transformed_test_dir,
+                                                       file_name=test_file_name)
+
+                # new files are named after the number of parts, the state file is the only one replaced
+                part_number = len(state["parts"])
+                if state["preprocessed_object_file_path"] is None:
+                    state["preprocessed_object_file_path"] = os.path.join(
+                        config.incremental_dir, os.path.basename(config.preprocessed_object_file_path))
+                    save_fitted_object(file_path=state["preprocessed_object_file_path"], obj=preprocessing_obj,
+                                       compress=config.compress)
+                if term_statistics is not None:
+                    term_statistics_file_path = os.path.join(
+                        config.incremental_dir, f"{TERM_STATISTICS_FILE_NAME}-{part_number:05d}.parquet")
+                    save_data(file_path=term_statistics_file_path,
+                              dataframe=term_statistics.rename_axis("term").reset_index(),
+                              file_format=PARQUET_FILE_FORMAT)
+                    state["term_statistics_file_paths"].append(term_statistics_file_path)
+                previous_term_summary_file_path = state["term_summary_file_path"]
+                if term_summary is not None:
+                    state["term_summary_file_path"] = os.path.join(
+                        config.incremental_dir, f"{TERM_SUMMARY_FILE_NAME}-{part_number:05d}.parquet")
+                    save_data(file_path=state["term_summary_file_path"],
+                              dataframe=term_summary.rename_axis("term").reset_index(),
+                              file_format=PARQUET_FILE_FORMAT)
+                state["parts"].append(train_file_path)
+                state["n_features"] = get_n_features(preprocessing_obj)
+                state["train_shards"].extend(train_shards)
+                state["test_shards"].extend(test_shards)
+                write_yaml_file(file_path=f"{state_file_path}.partial", data=state)
+                os.replace(f"{state_file_path}.partial", state_file_path)
+                if previous_term_summary_file_path not in (None, state["term_summary_file_path"]):
+                    os.remove(previous_term_summary_file_path)
+
+            logging.info(f"Vocabulary drift: [{state['vocabulary_drift']:.4f}]")
+            if state["vocabulary_drift"] > config.max_vocabulary_drift:
+                logging.warning(f"Vocabulary drift [{state['vocabulary_drift']:.4f}] is above "
+                                f"[{config.max_vocabulary_drift}], refit the vocabulary with a full run")
+
+            transformed_train_file_path = os.path.join(config.transformed_train_dir,
+                                                       f"{train_file_name}{SHARD_MANIFEST_EXTENSION}")
+            save_sparse_shard_manifest(file_path=transformed_train_file_path, shards=state["train_shards"],
+                                       n_features=state["n_features"])
+            transformed_test_file_path = os.path.join(config.transformed_test_dir,
+                                                      f"{test_file_name}{SHARD_MANIFEST_EXTENSION}")
+            save_sparse_shard_manifest(file_path=transformed_test_file_path, shards=state["test_shards"],
+                                       n_features=state["n_features"])
+            os.makedirs(os.path.dirname(config.preprocessed_object_file_path), exist_ok=True)
+            shutil.copy2(state["preprocessed_object_file_path"], config.preprocessed_object_file_path)
 
             data_transformation_artifact = DataTransformationArtifact(is_transformed=True,
                                                                       message="Data transformation successfully.",
                                                                       transformed_train_file_path=transformed_train_file_path,
                                                                       transformed_test_file_path=transformed_test_file_path,
-                                                                      preprocessed_object_file_path=preprocessing_obj_file_path
+                                                                      preprocessed_object_file_path=config.preprocessed_object_file_path,
+                                                                      is_sparse=True,
+                                                                      is_sharded=True
+                                                                      )
+            logging.info(f"Data transformation artifact: {data_transformation_artifact}")
+            return data_transformation_artifact
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def get_normalized_features(self, dataframe, target_column_name: str, n_jobs: int = None):
+        """
+        Returns the normalized review text and the 0/1 target of a split
+        dataframe: pd.DataFrame split with the target column
+        target_column_name: str
+        n_jobs: int normalizer processes, the configured n_jobs by default
+        """
+        try:
+            n_jobs = n_jobs if n_jobs is not None else self.data_transformation_config.n_jobs
+            chunk_size = self.data_transformation_config.chunk_size
+            logging.info(f"Normalizing reviews with n_jobs: [{n_jobs}] and chunk_size: [{chunk_size}]")
+            input_feature = porter(dataframe.drop(columns=[target_column_name]), n_jobs=n_jobs, chunk_size=chunk_size,
+                                   nltk_data_dir=self.data_transformation_config.nltk_data_dir)
+            target_feature = get_label_codes(dataframe[target_column_name], SENTIMENT_LABELS)
+            return input_feature, target_feature
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def get_normalized_split(self, file_path: str, target_column_name: str, n_jobs: int = None):
+        """
+        Returns the normalized reviews and the 0/1 target of an ingested split.
+        With token_corpus_dir set the reviews are returned as a TokenCorpus, normalized once per split content
+        and normalizer settings (stopword list, stemmer, NLTK version)
+        and saved, so later runs with other featurizer settings skip loading, stemming and tokenizing.
+        file_path: str location of the ingested split
+        target_column_name: str
+        n_jobs: int normalizer processes, the configured n_jobs by default
+        """
+        try:
+            schema_file_path = self.data_validation_artifact.schema_file_path
+            file_format = self.data_ingestion_artifact.file_format
+            token_corpus_dir = self.data_transformation_config.token_corpus_dir
+            if not token_corpus_dir:
+                dataframe = load_data(file_path=file_path, schema_file_path=schema_file_path, file_format=file_format)
+                return self.get_normalized_features(dataframe, target_column_name=target_column_name, n_jobs=n_jobs)
+
+            stopword_list = load_stopword_list(language='english',
+                                               nltk_data_dir=self.data_transformation_config.nltk_data_dir)
+            corpus_dir = os.path.join(token_corpus_dir, get_fingerprint(TOKEN_CORPUS_VERSION,
+                                                                        get_normalizer_settings(stopword_list),
+                                                                        get_file_hash(file_path)))
+            if os.path.isdir(corpus_dir):
+                logging.info(f"Reusing token corpus: [{corpus_dir}] of [{file_path}]")
+                with performance_recorder.measure("load_token_corpus"):
+                    corpus = TokenCorpus.load(corpus_dir)
+                return corpus, corpus.labels
+
+            dataframe = load_data(file_path=file_path, schema_file_path=schema_file_path, file_format=file_format)
+            input_feature, target_feature = self.get_normalized_features(dataframe,
+                                                                         target_column_name=target_column_name,
+                                                                         n_jobs=n_jobs)
+            with performance_recorder.measure("build_token_corpus", rows=len(input_feature)):
+                corpus = TokenCorpus.from_texts(input_feature, labels=target_feature)
+                corpus.save(corpus_dir)
+            logging.info(f"Saved token corpus: [{corpus_dir}] of [{file_path}] with [{corpus.n_terms}] terms")
+            return corpus, corpus.labels
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def can_count_tokens(self, preprocessing_obj, input_feature) -> bool:
+        """
+        Checks that a CountVectorizer can count the n-grams of a TokenCorpus without rebuilding its text
+        """
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        return isinstance(input_feature, TokenCorpus) and isinstance(preprocessing_obj, CountVectorizer) \
+            and input_feature.can_encode_ngrams(preprocessing_obj.ngram_range[1])
+
+    def select_features(self, preprocessing_obj, input_feature_arr, target_feature):
+        """
+        Keeps the selected_features columns of the training matrix that score highest with feature_selection.
+        The vocabulary of the returned preprocessing object only holds them, so the testing split and
+        the reviews scored later are vectorized straight into the reduced columns.
+        preprocessing_obj: fitted CountVectorizer
+        input_feature_arr: scipy.sparse training matrix
+        target_feature: np.array 0/1 target of the training reviews
+        return: tuple of (reduced preprocessing object, reduced training matrix)
+        """
+        try:
+            feature_selection = self.data_transformation_config.feature_selection
+            with performance_recorder.measure("feature_selection", rows=input_feature_arr.shape[0]) as measurement:
+                scores = get_feature_scores(feature_selection, input_feature_arr, target_feature)
+                columns = get_top_columns(scores, self.data_transformation_config.selected_features)
+                measurement.extra.update(features_before=int(input_feature_arr.shape[1]),
+                                         features_after=int(len(columns)))
+            logging.info(f"Selected [{len(columns)}] of [{input_feature_arr.shape[1]}] features "
+                         f"with [{feature_selection}]")
+            return reduce_vocabulary(preprocessing_obj, columns), input_feature_arr.tocsc()[:, columns].tocsr()
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def fit_transform_features(self, train_features):
+        """
+        Returns the preprocessing object fitted on the normalized training reviews and their features,
+        reduced to the selected features when feature_selection is set
+        train_features: tuple returned by get_normalized_features
+        """
+        try:
+            input_feature_train, target_feature_train = train_features
+            preprocessing_obj = self.get_data_transformer_object()
+            with performance_recorder.measure("fit_transform", rows=len(input_feature_train)):
+                if self.can_count_tokens(preprocessing_obj, input_feature_train):
+                    input_feature_train_arr = fit_transform_count_vectorizer(preprocessing_obj, input_feature_train)
+                else:
+                    if isinstance(input_feature_train, TokenCorpus):
+                        input_feature_train = input_feature_train.get_texts()
+                    input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train)
+            if self.data_transformation_config.feature_selection:
+                return self.select_features(preprocessing_obj, input_feature_train_arr, target_feature_train)
+            return preprocessing_obj, input_feature_train_arr
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def transform_features(self, fitted, test_features):
+        """
+        Returns the features of the normalized testing reviews
+        fitted: tuple returned by fit_transform_features
+        test_features: tuple returned by get_normalized_features
+        """
+        try:
+            preprocessing_obj, _ = fitted
+            input_feature_test, _ = test_features
+            with performance_recorder.measure("transform", rows=len(input_feature_test)):
+                if self.can_count_tokens(preprocessing_obj, input_feature_test):
+                    return transform_count_vectorizer(preprocessing_obj, input_feature_test)
+                if isinstance(input_feature_test, TokenCorpus):
+                    input_feature_test = input_feature_test.get_texts()
+                return preprocessing_obj.transform(input_feature_test)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
 
+    def save_transformed_data(self, file_path: str, input_feature_arr, features) -> str:
+        """
+        Saves the features of a split with its target: a sparse matrix with a separate target,
+        or a dense array with the target as last column
+        features: tuple returned by get_normalized_features
+        """
+        try:
+            _, target_feature = features
+            if self.data_transformation_config.sparse_output:
+                save_sparse_array_data(file_path=file_path, array=input_feature_arr, target=target_feature)
+            else:
+                save_numpy_array_data(file_path=file_path, array=np.c_[input_feature_arr.toarray(), target_feature],
+                                      compress=bool(self.data_transformation_config.compress))
+            logging.info(f"Saved transformed data: [{file_path}]")
+            return file_path
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def save_fitted_transformed_data(self, file_path: str, fitted, features) -> str:
+        _, input_feature_arr = fitted
+        return self.save_transformed_data(file_path=file_path, input_feature_arr=input_feature_arr, features=features)
+
+    def save_preprocessing_object(self, fitted) -> str:
+        try:
+            preprocessing_obj, _ = fitted
+            preprocessing_obj_file_path = self.data_transformation_config.preprocessed_object_file_path
+            logging.info(f"Saving preprocessing object.")
+            save_fitted_object(file_path=preprocessing_obj_file_path, obj=preprocessing_obj,
+                               compress=self.data_transformation_config.compress)
+            return preprocessing_obj_file_path
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def initiate_data_transformation(self) -> DataTransformationArtifact:
+        """
+        Transforms the splits as a task graph: training and testing splits are normalized and saved concurrently,
+        only transforming the testing split waits for the fitted preprocessing object
+        """
+        try:
+            if self.data_transformation_config.feature_selection and (
+                    self.data_ingestion_artifact.is_incremental or self.data_transformation_config.out_of_core
+                    or self.data_transformation_config.featurizer != COUNT_FEATURIZER):
+                raise Exception(f"Feature selection: [{self.data_transformation_config.feature_selection}] needs "
+                                f"the [{COUNT_FEATURIZER}] featurizer fitted in memory, "
+                                f"neither out_of_core nor incremental")
+            if self.data_ingestion_artifact.is_incremental:
+                return self.initiate_incremental_data_transformation()
+            if self.data_transformation_config.out_of_core:
+                return self.initiate_out_of_core_data_transformation()
+
+            logging.info(f"Obtaining training and test file path.")
+            train_file_path = self.data_ingestion_artifact.train_file_path
+            test_file_path = self.data_ingestion_artifact.test_file_path
+
+            schema_file_path = self.data_validation_artifact.schema_file_path
+            target_column_name = read_yaml_file(file_path=schema_file_path)[TARGET_COLUMNS_KEY]
+
+            transformed_train_dir = self.data_transformation_config.transformed_train_dir
+            transformed_test_dir = self.data_transformation_config.transformed_test_dir
+
+            is_sparse = self.data_transformation_config.sparse_output
+            compress = bool(self.data_transformation_config.compress)
+            # sparse matrices and compressed arrays are saved as .npz, dense arrays as memory mappable .npy
+            file_extension = ".npz" if is_sparse or compress else ".npy"
+
+            train_file_name = os.path.splitext(os.path.basename(train_file_path))[0] + file_extension
+            test_file_name = os.path.splitext(os.path.basename(test_file_path))[0] + file_extension
+
+            transformed_train_file_path = os.path.join(transformed_train_dir, train_file_name)
+            transformed_test_file_path = os.path.join(transformed_test_dir, test_file_name)
+
+            task_graph = TaskGraph(name="data_transformation")
+            # both splits may be normalized at once, each starts its share of the n_jobs processes
+            n_jobs = task_graph.get_task_n_jobs(self.data_transformation_config.n_jobs, n_tasks=2)
+            task_graph.add_task("normalize_train", partial(self.get_normalized_split, train_file_path,
+                                                           target_column_name=target_column_name, n_jobs=n_jobs))
+            task_graph.add_task("normalize_test", partial(self.get_normalized_split, test_file_path,
+                                                          target_column_name=target_column_name, n_jobs=n_jobs))
+            task_graph.add_task("fit_transform", self.fit_transform_features, dependencies=["normalize_train"])
+            task_graph.add_task("transform", self.transform_features, dependencies=["fit_transform", "normalize_test"])
+            task_graph.add_task("save_train", partial(self.save_fitted_transformed_data,
+                                                      transformed_train_file_path),
+                                dependencies=["fit_transform", "normalize_train"])
+            task_graph.add_task("save_test", partial(self.save_transformed_data, transformed_test_file_path),
+                                dependencies=["transform", "normalize_test"])
+            task_graph.add_task("save_preprocessing_object", self.save_preprocessing_object,
+                                dependencies=["fit_transform"])
+            results = task_graph.run()
+
+            data_transformation_artifact = DataTransformationArtifact(is_transformed=True,
+                                                                      message="Data transformation successfully.",
+                                                                      transformed_train_file_path=results["save_train"],
+                                                                      transformed_test_file_path=results["save_test"],
+                                                                      preprocessed_object_file_path=results["save_preprocessing_object"],
+                                                                      is_sparse=is_sparse,
+                                                                      is_sharded=False
                                                                       )
             logging.info(f"Data transformation artifact: {data_transformation_artifact}")
             return data_transformation_artifact
@@ -1,11 +1,19 @@
+from __future__ import annotations
+
 from IMDB.entity.artifact_entity import DataValidationArtifact, DataIngestionArtifact
 from IMDB.entity.config_entity import DataValidationConfig
 from IMDB.exception import IMDBException
-from IMDB.util.util import read_yaml_file
+from IMDB.util.util import read_yaml_file, read_data_columns, iter_data_chunks
+from IMDB.util.task_graph import TaskGraph
 from IMDB.logger import logging
-import pandas as pd
+from IMDB.util.lazy_import import lazy_import
+from IMDB.constant import *
+from functools import partial
 import os, sys
 
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
 
 class DataValidation:
 
@@ -18,14 +26,6 @@ class DataValidation:
         except Exception as e:
             raise IMDBException(e, sys) from e
 
-    def get_train_and_test_df(self):
-        try:
-            train_df = pd.read_csv(self.data_ingestion_artifact.train_file_path)
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
-            return train_df, test_df
-        except Exception as e:
-            raise IMDBException(e, sys) from e
-
     def is_train_test_file_exists(self) -> bool:
         try:
             logging.info("Checking if training and test file is available")
@@ -48,100 +48,187 @@ class DataValidation:
         except Exception as e:
             raise IMDBException(e, sys) from e
 
-    def validate_dataset_schema(self) -> bool:
+    def validate_file_columns(self, file_path: str, split_name: str, dataset_schema: dict) -> bool:
+        """
+        Checks the number, names and order of the columns of a split against the schema
+        from its header alone, no row is read
+        file_path: str
+        split_name: str Train or Test, used in log messages
+        dataset_schema: dict content of schema.yaml
+        """
         try:
-            config = read_yaml_file(self.data_validation_config.schema_file_path)
-            len_col = config["number_of_column"]
-            names_of_columns = list(config["columns"].keys())
-            target_column = config["target_column"]
-            train_df, test_df = self.get_train_and_test_df()
+            len_col = dataset_schema["number_of_column"]
+            names_of_columns = list(dataset_schema["columns"].keys())
+            target_column = dataset_schema[TARGET_COLUMNS_KEY]
 
-            # Checking train file
-
-            logging.info("Validating Train file  with Schema file,"
-                         f"Train file path {self.data_ingestion_artifact.train_file_path}"
+            logging.info(f"Validating {split_name} file with Schema file, "
+                         f"{split_name} file path {file_path} "
                          f"Schema file path {self.data_validation_config.schema_file_path}")
 
-            # Check number of columns in train file
-            len_col_train = len(train_df.columns)
-            if len_col == len_col_train:
-                train_col_no_checked: bool = True
-                logging.info("length of columns of Train file is equal to length of columns in schema config")
-            else:
-                train_col_no_checked: bool = False
-                logging.error("length of columns of Train file is equal to length of columns in schema config"
-                              f"length of columns in train file is {len_col_train}, required length is {len_col}")
-
-            # Check column names in train file
-            col_names = list(train_df.columns.str.rstrip()[:])
-            if names_of_columns == col_names:
-                train_col_name_checked: bool = True
-                logging.info("columns name matching with schema config in train file")
-            else:
-                train_col_name_checked: bool = False
-                logging.error("columns name not matching with schema config in train file")
-
-            # Check target column in train file
-            target_column_name = train_df.columns[-1]
-            if target_column == target_column_name:
-                train_target_col_checked: bool = True
-                logging.info("train file target column match with schema file")
-            else:
-                train_target_col_checked: bool = False
-                logging.error("train file target column does not match with schema file")
-
-            train_checked = train_col_no_checked and train_target_col_checked and train_col_name_checked
-
-            # test file
+            col_names = [column.rstrip() for column in
+                         read_data_columns(file_path=file_path, file_format=self.data_ingestion_artifact.file_format)]
 
-            logging.info("Validating Test file  with Schema file"
-                         f"Test file path {self.data_ingestion_artifact.test_file_path}"
-                         f"Schema file path {self.data_validation_config.schema_file_path}")
-
-            # Check number of columns in test file
-            len_col_test = len(test_df.columns)
-            if len_col == len_col_test:
-                test_col_no_checked: bool = True
-                logging.info("length of columns of Test file is equal to length of columns in schema config")
+            # Check number of columns
+            col_no_checked = len_col == len(col_names)
+            if col_no_checked:
+                logging.info(f"length of columns of {split_name} file is equal to length of columns in schema config")
             else:
-                test_col_no_checked: bool = False
-                logging.error("length of columns of Test file is not equal to length of columns in schema config"
-                              f"length of columns in test file is {len_col_test}, required length is {len_col}")
-
-            # Check column names in test file
-            col_names = list(test_df.columns.str.rstrip()[:])
-            if names_of_columns == col_names:
-                test_col_name_checked: bool = True
-                logging.info("columns name matching with schema config in test file")
+                logging.error(f"length of columns of {split_name} file is not equal to length of columns in schema "
+                              f"config, length of columns in {split_name} file is {len(col_names)}, "
+                              f"required length is {len_col}")
+
+            # Check column names
+            col_name_checked = names_of_columns == col_names
+            if col_name_checked:
+                logging.info(f"columns name matching with schema config in {split_name} file")
             else:
-                test_col_name_checked: bool = False
-                logging.error("columns name not matching with schema config in test file")
-
-            # Check target column in test file
-            target_column_name = test_df.columns[-1]
-            if target_column == target_column_name:
-                test_target_col_checked: bool = True
-                logging.info("test file target column match with schema file")
+                logging.error(f"columns name {col_names} not matching with schema config in {split_name} file")
+
+            # Check target column
+            target_col_checked = len(col_names) > 0 and col_names[-1] == target_column
+            if target_col_checked:
+                logging.info(f"{split_name} file target column match with schema file")
             else:
-                test_target_col_checked: bool = False
-                logging.error("test file target column does not match with schema file")
+                logging.error(f"{split_name} file target column does not match with schema file")
 
-            test_checked = test_col_no_checked and test_target_col_checked and test_col_name_checked
-            validation_status = train_checked and test_checked
+            return col_no_checked and col_name_checked and target_col_checked
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def validate_dataset_schema(self) -> bool:
+        try:
+            dataset_schema = read_yaml_file(self.data_validation_config.schema_file_path)
+            task_graph = TaskGraph(name="validate_dataset_schema")
+            task_graph.add_task("validate_train_columns",
+                                partial(self.validate_file_columns,
+                                        file_path=self.data_ingestion_artifact.train_file_path,
+                                        split_name="Train", dataset_schema=dataset_schema))
+            task_graph.add_task("validate_test_columns",
+                                partial(self.validate_file_columns,
+                                        file_path=self.data_ingestion_artifact.test_file_path,
+                                        split_name="Test", dataset_schema=dataset_schema))
+            results = task_graph.run()
+            validation_status = results["validate_train_columns"] and results["validate_test_columns"]
 
             return validation_status
         except Exception as e:
             raise IMDBException(e, sys) from e
 
+    def get_data_profile(self, file_path: str, dataset_schema: dict):
+        """
+        Profiles a split in one streaming pass of chunk_size rows, every statistic is computed
+        on whole columns of a chunk, so memory only grows by one hash and one length per review:
+        null counts per column, values outside the schema domain_value, value counts of those columns,
+        duplicate reviews and the distribution of review lengths in characters
+        file_path: str
+        dataset_schema: dict content of schema.yaml
+        return: tuple of (profile dict, sorted unique review hashes)
+        """
+        try:
+            domain_value = dataset_schema.get(DATASET_SCHEMA_DOMAIN_VALUE_KEY) or {}
+            n_rows = 0
+            null_counts = {}
+            domain_violations = {column: 0 for column in domain_value}
+            value_counts = {column: {} for column in domain_value}
+            review_hashes, review_lengths = [], []
+
+            for chunk in iter_data_chunks(file_path=file_path,
+                                          file_format=self.data_ingestion_artifact.file_format,
+                                          chunk_size=self.data_validation_config.chunk_size):
+                n_rows += len(chunk)
+                for column, null_count in chunk.isna().sum().items():
+                    null_counts[column] = null_counts.get(column, 0) + int(null_count)
+
+                for column, values in domain_value.items():
+                    column_values = chunk[column]
+                    domain_violations[column] += int((column_values.notna() & ~column_values.isin(values)).sum())
+                    for value, count in column_values.value_counts().items():
+                        value_counts[column][str(value)] = value_counts[column].get(str(value), 0) + int(count)
+
+                reviews = chunk[REVIEW_COLUMN_NAME].dropna()
+                review_hashes.append(pd.util.hash_pandas_object(reviews, index=False).to_numpy())
+                review_lengths.append(reviews.str.len().to_numpy(dtype=np.int32))
+
+            review_hashes = np.concatenate(review_hashes) if review_hashes else np.empty(0, dtype=np.uint64)
+            unique_review_hashes = np.unique(review_hashes)
+            review_lengths = np.concatenate(review_lengths) if review_lengths else np.empty(0, dtype=np.int32)
+
+            review_length = {}
+            if len(review_lengths):
+                review_length = {"min": int(review_lengths.min()),
+                                 "mean": float(review_lengths.mean()),
+                                 "max": int(review_lengths.max())}
+                for percentile, value in zip(REVIEW_LENGTH_PERCENTILES,
+                                             np.percentile(review_lengths, REVIEW_LENGTH_PERCENTILES)):
+                    review_length[f"p{percentile}"] = float(value)
+
+            profile = {"rows": n_rows,
+                       "null_counts": null_counts,
+                       "domain_violations": domain_violations,
+                       "value_counts": value_counts,
+                       "duplicate_reviews": int(len(review_hashes) - len(unique_review_hashes)),
+                       "review_length": review_length}
+            logging.info(f"Profile of [{file_path}]: {profile}")
+            return profile, unique_review_hashes
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def get_profile_errors(self, split_name: str, profile: dict) -> list:
+        """
+        Returns the data quality problems of a split profile that fail the validation.
+        Duplicate reviews are only reported, the IMDB dataset has a few hundred.
+        """
+        errors = []
+        if profile["rows"] == 0:
+            errors.append(f"{split_name} file is empty")
+        for column, null_count in profile["null_counts"].items():
+            if null_count > 0:
+                errors.append(f"{split_name} file has [{null_count}] null values in column [{column}]")
+        for column, violation_count in profile["domain_violations"].items():
+            if violation_count > 0:
+                errors.append(f"{split_name} file has [{violation_count}] values of column [{column}] "
+                              f"outside of the schema domain_value")
+        return errors
+
     def initiate_data_validation(self) -> DataValidationArtifact:
         try:
             self.is_train_test_file_exists()
-            self.validate_dataset_schema()
+            if not self.validate_dataset_schema():
+                data_validation_artifact = DataValidationArtifact(
+                    schema_file_path=self.data_validation_config.schema_file_path,
+                    is_validated=False,
+                    message="Train or test file columns do not match the schema file.",
+                    profile=None
+                )
+                logging.error(f"Data validation artifact: {data_validation_artifact}")
+                return data_validation_artifact
+
+            dataset_schema = read_yaml_file(self.data_validation_config.schema_file_path)
+            task_graph = TaskGraph(name="data_validation")
+            task_graph.add_task("profile_train", partial(self.get_data_profile,
+                                                         file_path=self.data_ingestion_artifact.train_file_path,
+                                                         dataset_schema=dataset_schema))
+            task_graph.add_task("profile_test", partial(self.get_data_profile,
+                                                        file_path=self.data_ingestion_artifact.test_file_path,
+                                                        dataset_schema=dataset_schema))
+            results = task_graph.run()
+            train_profile, train_review_hashes = results["profile_train"]
+            test_profile, test_review_hashes = results["profile_test"]
+            profile = {"train": train_profile,
+                       "test": test_profile,
+                       "duplicate_reviews_across_splits": int(len(np.intersect1d(train_review_hashes,
+                                                                                 test_review_hashes,
+                                                                                 assume_unique=True)))}
+
+            errors = self.get_profile_errors("Train", train_profile) + self.get_profile_errors("Test", test_profile)
+            for error in errors:
+                logging.error(error)
 
             data_validation_artifact = DataValidationArtifact(
                 schema_file_path=self.data_validation_config.schema_file_path,
-                is_validated=True,
-                message="Data Validation performed successfully."
+                is_validated=not errors,
+                message="Data Validation performed successfully." if not errors else " ".join(errors),
+                profile=profile
             )
             logging.info(f"Data validation artifact: {data_validation_artifact}")
             return data_validation_artifact
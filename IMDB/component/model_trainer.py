@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+from IMDB.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
+from IMDB.entity.config_entity import ModelTrainerConfig
+from IMDB.util.util import load_numpy_array_data, load_sparse_array_data, iter_sparse_shards, \
+    load_sparse_shards, read_yaml_file, save_fitted_object
+from IMDB.util.performance_recorder import performance_recorder
+from IMDB.exception import IMDBException
+from IMDB.logger import logging
+from IMDB.util.lazy_import import lazy_import
+from IMDB.constant import *
+import sys
+
+np = lazy_import("numpy")
+scipy = lazy_import("scipy")
+
+
+def get_model(model_name: str, random_state: int):
+    """
+    Returns an unfitted linear model that trains directly on sparse matrices
+    model_name: str one of logistic_regression, sgd, linear_svc
+    random_state: int
+    """
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.svm import LinearSVC
+
+    if model_name == LOGISTIC_REGRESSION_MODEL:
+        return LogisticRegression(solver="liblinear", max_iter=1000, random_state=random_state)
+    if model_name == SGD_MODEL:
+        return SGDClassifier(random_state=random_state)
+    if model_name == LINEAR_SVC_MODEL:
+        return LinearSVC(random_state=random_state)
+    raise Exception(f"Model: [{model_name}] is not one of "
+                    f"{[LOGISTIC_REGRESSION_MODEL, SGD_MODEL, LINEAR_SVC_MODEL]}")
+
+
+def get_invalid_params(model_name: str, param_grid: dict) -> list:
+    """
+    Returns the names of param_grid that are not parameters of the model
+    """
+    model_params = get_model(model_name, random_state=None).get_params()
+    return [param for param in param_grid if param not in model_params]
+
+
+def load_shard(shard):
+    """
+    Returns (input feature, target) of a shard given as its file path, or as a (file path, slice) tuple
+    to only keep some of its rows
+    """
+    if isinstance(shard, tuple):
+        shard_file_path, rows = shard
+        input_feature, target_feature = load_sparse_array_data(shard_file_path)
+        return input_feature[rows], target_feature[rows]
+    return load_sparse_array_data(shard)
+
+
+def fit_on_shards(model, shards, n_epochs: int, random_state: int = None):
+    """
+    Trains a partial_fit model over sparse shards, one shard in memory at a time,
+    in a new order every epoch so the model does not keep drifting towards the last shards
+    shards: list of shards as taken by load_shard
+    """
+    random_generator = np.random.RandomState(random_state)
+    for _ in range(n_epochs):
+        for shard_number in random_generator.permutation(len(shards)):
+            input_feature, target_feature = load_shard(shards[shard_number])
+            model.partial_fit(input_feature, target_feature, classes=np.array([0, 1]))
+    return model
+
+
+def score_on_shards(model, shards) -> float:
+    """
+    Returns the accuracy of model over sparse shards, one shard in memory at a time
+    shards: list of shards as taken by load_shard
+    """
+    n_correct, n_rows = 0, 0
+    for shard in shards:
+        input_feature, target_feature = load_shard(shard)
+        n_correct += int((model.predict(input_feature) == target_feature).sum())
+        n_rows += len(target_feature)
+    return n_correct / n_rows if n_rows else 0.0
+
+
+def fit_and_score_on_shards(model, params: dict, train_shards, validation_shards, n_epochs: int,
+                            random_state: int = None):
+    model.set_params(**params)
+    fit_on_shards(model, train_shards, n_epochs, random_state=random_state)
+    return score_on_shards(model, validation_shards)
+
+
+class ModelTrainer:
+
+    def __init__(self, model_trainer_config: ModelTrainerConfig,
+                 data_transformation_artifact: DataTransformationArtifact):
+        try:
+            logging.info(f"{'>>' * 20}Model trainer log started.{'<<' * 20} ")
+            self.model_trainer_config = model_trainer_config
+            self.data_transformation_artifact = data_transformation_artifact
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def load_transformed_data(self, file_path: str):
+        """
+        Returns (sparse input feature, target) of a transformed split,
+        dense arrays are converted to csr with the target taken from their last column
+        """
+        try:
+            if self.data_transformation_artifact.is_sharded:
+                return load_sparse_shards(file_path)
+            if self.data_transformation_artifact.is_sparse:
+                return load_sparse_array_data(file_path)
+            array = load_numpy_array_data(file_path, mmap_mode="r")
+            return scipy.sparse.csr_matrix(array[:, :-1]), array[:, -1].astype(np.int8)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def get_shard_file_paths(self, manifest_file_path: str) -> list:
+        manifest_dir = os.path.dirname(manifest_file_path)
+        manifest = read_yaml_file(file_path=manifest_file_path)
+        return [os.path.join(manifest_dir, shard["file_path"]) for shard in manifest["shards"]]
+
+    def get_validation_split(self, manifest_file_path: str):
+        """
+        Holds out the last validation_size share of the rows of the last training shard,
+        so parameters are compared on rows no candidate was trained on, even with a single shard
+        return: tuple of (train shards, validation shards) as taken by load_shard,
+                (None, None) when the last shard has too few rows to hold any out
+        """
+        manifest = read_yaml_file(file_path=manifest_file_path)
+        shard_file_paths = self.get_shard_file_paths(manifest_file_path)
+        if not shard_file_paths:
+            return None, None
+        n_rows = manifest["shards"][-1]["n_rows"]
+        n_validation_rows = int(n_rows * self.model_trainer_config.validation_size)
+        if n_validation_rows == 0 or n_validation_rows == n_rows:
+            return None, None
+        train_shards = shard_file_paths[:-1] + [(shard_file_paths[-1], slice(0, n_rows - n_validation_rows))]
+        validation_shards = [(shard_file_paths[-1], slice(n_rows - n_validation_rows, None))]
+        return train_shards, validation_shards
+
+    def train_in_memory(self):
+        """
+        Grid searches the model on the whole sparse training matrix, folds and candidates run in parallel
+        return: tuple of (best model, best params, train accuracy, test accuracy)
+        """
+        try:
+            from sklearn.model_selection import GridSearchCV
+
+            config = self.model_trainer_config
+            input_feature_train, target_feature_train = self.load_transformed_data(
+                self.data_transformation_artifact.transformed_train_file_path)
+            logging.info(f"Loaded training matrix of shape {input_feature_train.shape} "
+                         f"with [{input_feature_train.nnz}] non zeros")
+
+            grid_search = GridSearchCV(estimator=get_model(config.model_name, config.random_state),
+                                       param_grid=config.param_grid,
+                                       cv=config.cv,
+                                       n_jobs=config.n_jobs,
+                                       scoring=config.scoring)
+            with performance_recorder.measure("grid_search", rows=input_feature_train.shape[0]):
+                grid_search.fit(input_feature_train, target_feature_train)
+            logging.info(f"Best params: {grid_search.best_params_} cv score: [{grid_search.best_score_}]")
+
+            model = grid_search.best_estimator_
+            train_accuracy = model.score(input_feature_train, target_feature_train)
+            del input_feature_train, target_feature_train
+
+            input_feature_test, target_feature_test = self.load_transformed_data(
+                self.data_transformation_artifact.transformed_test_file_path)
+            test_accuracy = model.score(input_feature_test, target_feature_test)
+            return model, grid_search.best_params_, train_accuracy, test_accuracy
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def train_on_shards(self):
+        """
+        Searches the params of a partial_fit model over sharded data: every candidate is trained on the
+        training shards but the validation rows held out by get_validation_split and scored on them, in parallel,
+        then the best one is refit on every shard
+        return: tuple of (best model, best params, train accuracy, test accuracy)
+        """
+        try:
+            from sklearn.model_selection import ParameterGrid
+            from joblib import Parallel, delayed
+
+            config = self.model_trainer_config
+            if config.model_name != SGD_MODEL:
+                raise Exception(f"Sharded training data needs a partial_fit model, set model_name to [{SGD_MODEL}]")
+
+            train_shard_file_paths = self.get_shard_file_paths(
+                self.data_transformation_artifact.transformed_train_file_path)
+            test_shard_file_paths = self.get_shard_file_paths(
+                self.data_transformation_artifact.transformed_test_file_path)
+
+            candidates = list(ParameterGrid(config.param_grid))
+            best_params = candidates[0]
+            if len(candidates) > 1:
+                train_shards, validation_shards = self.get_validation_split(
+                    self.data_transformation_artifact.transformed_train_file_path)
+                if train_shards is None:
+                    logging.warning(f"Too few training rows to hold out a validation share of "
+                                    f"[{config.validation_size}], params are not searched: {best_params}")
+                else:
+                    with performance_recorder.measure("parameter_search"):
+                        scores = Parallel(n_jobs=config.n_jobs)(
+                            delayed(fit_and_score_on_shards)(get_model(config.model_name, config.random_state),
+                                                             params, train_shards, validation_shards,
+                                                             config.n_epochs, config.random_state)
+                            for params in candidates)
+                    best_params = candidates[int(np.argmax(scores))]
+                    logging.info(f"Best params: {best_params} validation score: [{max(scores)}]")
+
+            model = get_model(config.model_name, config.random_state).set_params(**best_params)
+            with performance_recorder.measure("fit_on_shards"):
+                fit_on_shards(model, train_shard_file_paths, config.n_epochs, random_state=config.random_state)
+
+            train_accuracy = score_on_shards(model, train_shard_file_paths)
+            test_accuracy = score_on_shards(model, test_shard_file_paths)
+            return model, best_params, train_accuracy, test_accuracy
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def initiate_model_trainer(self) -> ModelTrainerArtifact:
+        try:
+            logging.info(f"Training [{self.model_trainer_config.model_name}] "
+                         f"with param grid: {self.model_trainer_config.param_grid}")
+            invalid_params = get_invalid_params(self.model_trainer_config.model_name,
+                                                self.model_trainer_config.param_grid)
+            if invalid_params:
+                raise Exception(f"Param grid: {invalid_params} are not parameters of model "
+                                f"[{self.model_trainer_config.model_name}]")
+            if self.data_transformation_artifact.is_sharded:
+                model, best_params, train_accuracy, test_accuracy = self.train_on_shards()
+            else:
+                model, best_params, train_accuracy, test_accuracy = self.train_in_memory()
+
+            logging.info(f"Train accuracy: [{train_accuracy}] test accuracy: [{test_accuracy}]")
+
+            trained_model_file_path = self.model_trainer_config.trained_model_file_path
+            logging.info(f"Saving trained model to: [{trained_model_file_path}]")
+            save_fitted_object(file_path=trained_model_file_path, obj=model,
+                               compress=self.model_trainer_config.compress)
+
+            model_trainer_artifact = ModelTrainerArtifact(is_trained=True,
+                                                          message="Model trained successfully.",
+                                                          trained_model_file_path=trained_model_file_path,
+                                                          train_accuracy=float(train_accuracy),
+                                                          test_accuracy=float(test_accuracy),
+                                                          best_params={key: value.item() if hasattr(value, "item")
+                                                                       else value
+                                                                       for key, value in best_params.items()}
+                                                          )
+            logging.info(f"Model trainer artifact: {model_trainer_artifact}")
+            return model_trainer_artifact
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def __del__(self):
+        logging.info(f"{'>>' * 20}Model trainer log completed.{'<<' * 20} \n\n")
@@ -1,5 +1,5 @@
 from IMDB.entity.config_entity import DataIngestionConfig, TrainingPipelineConfig, DataValidationConfig, \
-     DataTransformationConfig
+     DataTransformationConfig, ModelTrainerConfig, BatchPredictionConfig, ScoringServiceConfig
 from IMDB.util.util import read_yaml_file
 from IMDB.logger import logging
 from IMDB.constant import *
@@ -15,8 +15,8 @@ class Configuration:
                  ) -> None:
         try:
             self.config_info = read_yaml_file(file_path=config_file_path)
-            self.training_pipeline_config = self.get_training_pipeline_config()
             self.time_stamp = current_time_stamp
+            self.training_pipeline_config = self.get_training_pipeline_config()
         except Exception as e:
             raise IMDBException(e, sys) from e
 
@@ -50,13 +50,48 @@ class Configuration:
                 data_ingestion_info[DATA_INGESTION_TEST_DIR_KEY]
             )
 
+            download_cache_dir = os.path.join(
+                artifact_dir,
+                DATA_INGESTION_ARTIFACT_DIR,
+                data_ingestion_info.get(DATA_INGESTION_DOWNLOAD_CACHE_DIR_KEY, "download_cache")
+            )
+
+            # rows ingested by earlier runs are recorded here, so it is shared by runs
+            incremental_dir = os.path.join(
+                artifact_dir,
+                DATA_INGESTION_ARTIFACT_DIR,
+                data_ingestion_info.get(DATA_INGESTION_INCREMENTAL_DIR_KEY, "incremental")
+            )
+
             data_ingestion_config = DataIngestionConfig(
                 author_username=username,
                 kaggel_dataset_name=dataset_name,
                 raw_data_dir=raw_data_dir,
                 ingested_train_dir=ingested_train_dir,
-                ingested_test_dir=ingested_test_dir
+                ingested_test_dir=ingested_test_dir,
+                test_size=data_ingestion_info.get(DATA_INGESTION_TEST_SIZE_KEY, 0.2),
+                random_state=data_ingestion_info.get(DATA_INGESTION_RANDOM_STATE_KEY, 42),
+                streaming=data_ingestion_info.get(DATA_INGESTION_STREAMING_KEY, False),
+                chunk_size=data_ingestion_info.get(DATA_INGESTION_CHUNK_SIZE_KEY, 10000),
+                file_format=data_ingestion_info.get(DATA_INGESTION_FILE_FORMAT_KEY, PARQUET_FILE_FORMAT),
+                dataset_version=data_ingestion_info.get(DATA_INGESTION_DATASET_VERSION_KEY),
+                download_cache_dir=download_cache_dir,
+                mirror=data_ingestion_info.get(DATA_INGESTION_MIRROR_KEY),
+                deduplicate=data_ingestion_info.get(DATA_INGESTION_DEDUPLICATE_KEY, False),
+                drop_near_duplicates=data_ingestion_info.get(DATA_INGESTION_DROP_NEAR_DUPLICATES_KEY, False),
+                near_duplicate_threshold=data_ingestion_info.get(DATA_INGESTION_NEAR_DUPLICATE_THRESHOLD_KEY, 0.8),
+                minhash_num_perm=data_ingestion_info.get(DATA_INGESTION_MINHASH_NUM_PERM_KEY, 64),
+                minhash_bands=data_ingestion_info.get(DATA_INGESTION_MINHASH_BANDS_KEY, 16),
+                shingle_size=data_ingestion_info.get(DATA_INGESTION_SHINGLE_SIZE_KEY, 3),
+                n_jobs=data_ingestion_info.get(DATA_INGESTION_N_JOBS_KEY, 1),
+                schema_file_path=self.get_data_validation_config().schema_file_path,
+                incremental=data_ingestion_info.get(DATA_INGESTION_INCREMENTAL_KEY, False),
+                incremental_dir=incremental_dir
             )
+            if data_ingestion_config.streaming and data_ingestion_config.deduplicate:
+                logging.warning(f"Streaming with deduplicate keeps the [{data_ingestion_config.minhash_num_perm}] "
+                                f"MinHash values of every row in memory, and their LSH band keys while grouping, "
+                                f"memory grows with the number of rows instead of staying bounded by chunk_size")
             logging.info(f"Data Ingestion config: {data_ingestion_config}")
             return data_ingestion_config
         except Exception as e:
@@ -72,7 +107,8 @@ class Configuration:
                                             )
 
             data_validation_config = DataValidationConfig(
-                schema_file_path=schema_file_path
+                schema_file_path=schema_file_path,
+                chunk_size=data_validation_config.get(DATA_VALIDATION_CHUNK_SIZE_KEY, 50000)
             )
             return data_validation_config
         except Exception as e:
@@ -110,17 +146,181 @@ class Configuration:
 
             )
 
+            # normalized corpora are keyed by the content of the split they come from, so they are shared by runs
+            token_corpus_dir = data_transformation_config_info.get(DATA_TRANSFORMATION_TOKEN_CORPUS_DIR_KEY)
+            if token_corpus_dir:
+                token_corpus_dir = os.path.join(artifact_dir, DATA_TRANSFORMATION_ARTIFACT_DIR, token_corpus_dir)
+
+            incremental_dir = os.path.join(
+                artifact_dir,
+                DATA_TRANSFORMATION_ARTIFACT_DIR,
+                data_transformation_config_info.get(DATA_TRANSFORMATION_INCREMENTAL_DIR_KEY, "incremental")
+            )
+
+            nltk_data_dir = data_transformation_config_info.get(DATA_TRANSFORMATION_NLTK_DATA_DIR_KEY)
+            if nltk_data_dir is not None:
+                nltk_data_dir = os.path.join(ROOT_DIR, nltk_data_dir)
+
             data_transformation_config = DataTransformationConfig(
                 preprocessed_object_file_path=preprocessed_object_file_path,
                 transformed_train_dir=transformed_train_dir,
-                transformed_test_dir=transformed_test_dir
+                transformed_test_dir=transformed_test_dir,
+                sparse_output=data_transformation_config_info.get(DATA_TRANSFORMATION_SPARSE_OUTPUT_KEY, True),
+                n_jobs=data_transformation_config_info.get(DATA_TRANSFORMATION_N_JOBS_KEY, 1),
+                chunk_size=data_transformation_config_info.get(DATA_TRANSFORMATION_CHUNK_SIZE_KEY, 2000),
+                nltk_data_dir=nltk_data_dir,
+                featurizer=data_transformation_config_info.get(DATA_TRANSFORMATION_FEATURIZER_KEY, COUNT_FEATURIZER),
+                max_features=data_transformation_config_info.get(DATA_TRANSFORMATION_MAX_FEATURES_KEY, 25000),
+                ngram_range=data_transformation_config_info.get(DATA_TRANSFORMATION_NGRAM_RANGE_KEY, [1, 2]),
+                n_features=data_transformation_config_info.get(DATA_TRANSFORMATION_N_FEATURES_KEY, 2 ** 20),
+                out_of_core=data_transformation_config_info.get(DATA_TRANSFORMATION_OUT_OF_CORE_KEY, False),
+                shard_size=data_transformation_config_info.get(DATA_TRANSFORMATION_SHARD_SIZE_KEY, 50000),
+                max_candidate_terms=data_transformation_config_info.get(
+                    DATA_TRANSFORMATION_MAX_CANDIDATE_TERMS_KEY, 2000000),
+                compress=data_transformation_config_info.get(DATA_TRANSFORMATION_COMPRESS_KEY, 0),
+                token_corpus_dir=token_corpus_dir,
+                incremental_dir=incremental_dir,
+                max_vocabulary_drift=data_transformation_config_info.get(
+                    DATA_TRANSFORMATION_MAX_VOCABULARY_DRIFT_KEY, 0.1),
+                feature_selection=data_transformation_config_info.get(DATA_TRANSFORMATION_FEATURE_SELECTION_KEY),
+                selected_features=data_transformation_config_info.get(DATA_TRANSFORMATION_SELECTED_FEATURES_KEY, 5000)
             )
 
+            if (data_transformation_config.featurizer == HASHING_FEATURIZER
+                    and not data_transformation_config.sparse_output and not data_transformation_config.out_of_core):
+                # a dense array of n_features columns per review does not fit in memory for any real corpus
+                raise Exception(f"Featurizer: [{HASHING_FEATURIZER}] needs sparse_output, its "
+                                f"[{data_transformation_config.n_features}] columns cannot be saved as a dense array")
+
             logging.info(f"Data transformation config: {data_transformation_config}")
             return data_transformation_config
         except Exception as e:
             raise IMDBException(e, sys) from e
 
+    def get_model_trainer_config(self) -> ModelTrainerConfig:
+        try:
+            artifact_dir = self.training_pipeline_config.artifact_dir
+
+            model_trainer_artifact_dir = os.path.join(
+                artifact_dir,
+                MODEL_TRAINER_ARTIFACT_DIR,
+                self.time_stamp
+            )
+
+            model_trainer_config_info = self.config_info[MODEL_TRAINER_CONFIG_KEY]
+
+            trained_model_file_path = os.path.join(
+                model_trainer_artifact_dir,
+                model_trainer_config_info[MODEL_TRAINER_TRAINED_MODEL_DIR_KEY],
+                model_trainer_config_info[MODEL_TRAINER_TRAINED_MODEL_FILE_NAME_KEY]
+            )
+
+            model_name = model_trainer_config_info[MODEL_TRAINER_MODEL_NAME_KEY]
+            param_grid = model_trainer_config_info[MODEL_TRAINER_PARAM_GRID_KEY]
+            # grids listed by model name keep a valid grid whichever model_name is set
+            if model_name in param_grid:
+                param_grid = param_grid[model_name]
+
+            # sharded data is trained with partial_fit, which only the sgd model has
+            data_transformation_config_info = self.config_info[DATA_TRANSFORMATION_CONFIG_KEY]
+            if data_transformation_config_info.get(DATA_TRANSFORMATION_OUT_OF_CORE_KEY, False) \
+                    and model_name != SGD_MODEL:
+                raise Exception(f"Out of core data transformation writes sharded data, "
+                                f"which needs model_name [{SGD_MODEL}], not [{model_name}]")
+            data_ingestion_info = self.config_info[DATA_INGESTION_CONFIG_KEY]
+            if data_ingestion_info.get(DATA_INGESTION_INCREMENTAL_KEY, False) and model_name != SGD_MODEL:
+                raise Exception(f"Incremental data ingestion is transformed into sharded data, "
+                                f"which needs model_name [{SGD_MODEL}], not [{model_name}]")
+
+            model_trainer_config = ModelTrainerConfig(
+                trained_model_file_path=trained_model_file_path,
+                model_name=model_name,
+                param_grid=param_grid,
+                cv=model_trainer_config_info.get(MODEL_TRAINER_CV_KEY, 3),
+                n_jobs=model_trainer_config_info.get(MODEL_TRAINER_N_JOBS_KEY, 1),
+                scoring=model_trainer_config_info.get(MODEL_TRAINER_SCORING_KEY, "accuracy"),
+                random_state=model_trainer_config_info.get(MODEL_TRAINER_RANDOM_STATE_KEY, 42),
+                n_epochs=model_trainer_config_info.get(MODEL_TRAINER_N_EPOCHS_KEY, 5),
+                validation_size=model_trainer_config_info.get(MODEL_TRAINER_VALIDATION_SIZE_KEY, 0.2),
+                compress=model_trainer_config_info.get(MODEL_TRAINER_COMPRESS_KEY, 0)
+            )
+
+            logging.info(f"Model trainer config: {model_trainer_config}")
+            return model_trainer_config
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def get_batch_prediction_config(self, input_file_path: str, preprocessed_object_file_path: str,
+                                    trained_model_file_path: str) -> BatchPredictionConfig:
+        """
+        input_file_path: str csv or parquet file with a review column to score
+        preprocessed_object_file_path: str preprocessing object written by data transformation
+        trained_model_file_path: str model written by the model trainer
+        """
+        try:
+            artifact_dir = self.training_pipeline_config.artifact_dir
+
+            batch_prediction_artifact_dir = os.path.join(
+                artifact_dir,
+                BATCH_PREDICTION_ARTIFACT_DIR,
+                self.time_stamp
+            )
+
+            batch_prediction_config_info = self.config_info[BATCH_PREDICTION_CONFIG_KEY]
+
+            input_file_format = PARQUET_FILE_FORMAT if input_file_path.endswith(
+                FILE_FORMAT_EXTENSIONS[PARQUET_FILE_FORMAT]) else CSV_FILE_FORMAT
+            prediction_file_format = batch_prediction_config_info.get(BATCH_PREDICTION_FILE_FORMAT_KEY,
+                                                                      input_file_format)
+
+            prediction_file_path = os.path.join(
+                batch_prediction_artifact_dir,
+                batch_prediction_config_info[BATCH_PREDICTION_DIR_KEY],
+                os.path.splitext(os.path.basename(input_file_path))[0] + FILE_FORMAT_EXTENSIONS[prediction_file_format]
+            )
+
+            batch_prediction_config = BatchPredictionConfig(
+                input_file_path=input_file_path,
+                input_file_format=input_file_format,
+                prediction_file_path=prediction_file_path,
+                prediction_file_format=prediction_file_format,
+                preprocessed_object_file_path=preprocessed_object_file_path,
+                trained_model_file_path=trained_model_file_path,
+                batch_size=batch_prediction_config_info.get(BATCH_PREDICTION_BATCH_SIZE_KEY, 10000),
+                n_jobs=batch_prediction_config_info.get(BATCH_PREDICTION_N_JOBS_KEY, 1),
+                nltk_data_dir=self.get_data_transformation_config().nltk_data_dir
+            )
+
+            logging.info(f"Batch prediction config: {batch_prediction_config}")
+            return batch_prediction_config
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def get_scoring_service_config(self, preprocessed_object_file_path: str,
+                                   trained_model_file_path: str) -> ScoringServiceConfig:
+        """
+        preprocessed_object_file_path: str preprocessing object written by data transformation
+        trained_model_file_path: str model written by the model trainer
+        """
+        try:
+            scoring_service_config_info = self.config_info[SCORING_SERVICE_CONFIG_KEY]
+
+            scoring_service_config = ScoringServiceConfig(
+                preprocessed_object_file_path=preprocessed_object_file_path,
+                trained_model_file_path=trained_model_file_path,
+                nltk_data_dir=self.get_data_transformation_config().nltk_data_dir,
+                host=scoring_service_config_info.get(SCORING_SERVICE_HOST_KEY, "127.0.0.1"),
+                port=scoring_service_config_info.get(SCORING_SERVICE_PORT_KEY, 8080),
+                max_batch_size=scoring_service_config_info.get(SCORING_SERVICE_MAX_BATCH_SIZE_KEY, 64),
+                max_wait_ms=scoring_service_config_info.get(SCORING_SERVICE_MAX_WAIT_MS_KEY, 5),
+                latency_window=scoring_service_config_info.get(SCORING_SERVICE_LATENCY_WINDOW_KEY, 10000)
+            )
+
+            logging.info(f"Scoring service config: {scoring_service_config}")
+            return scoring_service_config
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
     def get_training_pipeline_config(self) -> TrainingPipelineConfig:
         try:
             training_pipeline_config = self.config_info[TRAINING_PIPELINE_CONFIG_KEY]
@@ -129,7 +329,20 @@ class Configuration:
                                         training_pipeline_config[TRAINING_PIPELINE_ARTIFACT_DIR_KEY]
                                         )
 
-            training_pipeline_config = TrainingPipelineConfig(artifact_dir=artifact_dir)
+            reuse_artifacts = training_pipeline_config.get(TRAINING_PIPELINE_REUSE_ARTIFACTS_KEY, False)
+
+            metrics_dir = os.path.join(artifact_dir,
+                                       training_pipeline_config.get(TRAINING_PIPELINE_METRICS_DIR_KEY, "metrics"),
+                                       self.time_stamp)
+
+            training_pipeline_config = TrainingPipelineConfig(
+                artifact_dir=artifact_dir,
+                reuse_artifacts=reuse_artifacts,
+                metrics_dir=metrics_dir,
+                profile=training_pipeline_config.get(TRAINING_PIPELINE_PROFILE_KEY, False),
+                task_executor=training_pipeline_config.get(TRAINING_PIPELINE_TASK_EXECUTOR_KEY, "thread"),
+                max_task_workers=training_pipeline_config.get(TRAINING_PIPELINE_MAX_TASK_WORKERS_KEY, 1)
+            )
             logging.info(f"Training pipeline config: {training_pipeline_config}")
             return training_pipeline_config
         except Exception as e:
@@ -17,6 +17,14 @@ CONFIG_FILE_PATH = os.path.join(ROOT_DIR, CONFIG_DIR, CONFIG_FILE_NAME)
 TRAINING_PIPELINE_CONFIG_KEY = "training_pipeline_config"
 TRAINING_PIPELINE_ARTIFACT_DIR_KEY = "artifact_dir"
 TRAINING_PIPELINE_NAME_KEY = "pipeline_name"
+TRAINING_PIPELINE_REUSE_ARTIFACTS_KEY = "reuse_artifacts"
+TRAINING_PIPELINE_METRICS_DIR_KEY = "metrics_dir"
+TRAINING_PIPELINE_PROFILE_KEY = "profile"
+TRAINING_PIPELINE_TASK_EXECUTOR_KEY = "task_executor"
+TRAINING_PIPELINE_MAX_TASK_WORKERS_KEY = "max_task_workers"
+ARTIFACT_REGISTRY_DIR = "fingerprint"
+METRICS_FILE_NAME = "metrics.json"
+PROFILE_FILE_EXTENSION = ".prof"
 
 
 # Data Ingestion related variable
@@ -29,12 +37,54 @@ DATA_INGESTION_RAW_DATA_DIR_KEY = "raw_data_dir"
 DATA_INGESTION_INGESTED_DIR_NAME_KEY = "ingested_dir"
 DATA_INGESTION_TRAIN_DIR_KEY = "ingested_train_dir"
 DATA_INGESTION_TEST_DIR_KEY = "ingested_test_dir"
+DATA_INGESTION_TEST_SIZE_KEY = "test_size"
+DATA_INGESTION_RANDOM_STATE_KEY = "random_state"
+DATA_INGESTION_STREAMING_KEY = "streaming"
+DATA_INGESTION_CHUNK_SIZE_KEY = "chunk_size"
+DATA_INGESTION_FILE_FORMAT_KEY = "file_format"
+DATA_INGESTION_DATASET_VERSION_KEY = "dataset_version"
+DATA_INGESTION_DOWNLOAD_CACHE_DIR_KEY = "download_cache_dir"
+DATA_INGESTION_MIRROR_KEY = "mirror"
+DATA_INGESTION_DEDUPLICATE_KEY = "deduplicate"
+DATA_INGESTION_DROP_NEAR_DUPLICATES_KEY = "drop_near_duplicates"
+DATA_INGESTION_NEAR_DUPLICATE_THRESHOLD_KEY = "near_duplicate_threshold"
+DATA_INGESTION_MINHASH_NUM_PERM_KEY = "minhash_num_perm"
+DATA_INGESTION_MINHASH_BANDS_KEY = "minhash_bands"
+DATA_INGESTION_SHINGLE_SIZE_KEY = "shingle_size"
+DATA_INGESTION_N_JOBS_KEY = "n_jobs"
+DATA_INGESTION_INCREMENTAL_KEY = "incremental"
+DATA_INGESTION_INCREMENTAL_DIR_KEY = "incremental_dir"
+DOWNLOAD_CHECKSUM_FILE_NAME = "checksums.yaml"
+HASH_SPLIT_BUCKETS = 10000
+# state kept across runs by the incremental data ingestion and transformation, in their incremental_dir
+INCREMENTAL_STATE_FILE_NAME = "state.yaml"
+# state of an incremental data ingestion waiting for its rows to be transformed
+PENDING_STATE_FILE_EXTENSION = ".pending"
+# MinHash signatures and split of the rows of every incremental part, new rows are matched against them
+MINHASH_SIGNATURES_FILE_NAME = "minhash_signatures"
+NEAR_DUPLICATE_SPLIT_FILE_NAME = "is_test"
+TERM_STATISTICS_FILE_NAME = "term_statistics"
+TERM_SUMMARY_FILE_NAME = "term_summary"
+# n-grams per vocabulary term kept in the running term counts of incremental data transformation
+TERM_SUMMARY_TERMS_PER_FEATURE = 4
+
+# Artifact file formats
+CSV_FILE_FORMAT = "csv"
+PARQUET_FILE_FORMAT = "parquet"
+FILE_FORMAT_EXTENSIONS = {CSV_FILE_FORMAT: ".csv", PARQUET_FILE_FORMAT: ".parquet"}
 
 # Data Validation related variables
 
 DATA_VALIDATION_CONFIG_KEY = "data_validation_config"
+DATA_VALIDATION_ARTIFACT_DIR = "data_validation"
 DATA_VALIDATION_SCHEMA_FILE_NAME_KEY = "schema_file_name"
 DATA_VALIDATION_SCHEMA_DIR_KEY = "schema_dir"
+DATA_VALIDATION_CHUNK_SIZE_KEY = "chunk_size"
+DATASET_SCHEMA_DOMAIN_VALUE_KEY = "domain_value"
+CATEGORY_DTYPE = "category"
+# values of the target column, the 0/1 label of a review is the position of its sentiment
+SENTIMENT_LABELS = ("negative", "positive")
+REVIEW_LENGTH_PERCENTILES = (50, 90, 99)
 
 # Data Transformation related variables
 DATA_TRANSFORMATION_ARTIFACT_DIR = "data_transformation"
@@ -44,5 +94,65 @@ DATA_TRANSFORMATION_TRAIN_DIR_NAME_KEY = "transformed_train_dir"
 DATA_TRANSFORMATION_TEST_DIR_NAME_KEY = "transformed_test_dir"
 DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY = "preprocessing_dir"
 DATA_TRANSFORMATION_PREPROCESSED_FILE_NAME_KEY = "preprocessed_object_file_name"
+DATA_TRANSFORMATION_SPARSE_OUTPUT_KEY = "sparse_output"
+DATA_TRANSFORMATION_N_JOBS_KEY = "n_jobs"
+DATA_TRANSFORMATION_CHUNK_SIZE_KEY = "chunk_size"
+DATA_TRANSFORMATION_NLTK_DATA_DIR_KEY = "nltk_data_dir"
+DATA_TRANSFORMATION_FEATURIZER_KEY = "featurizer"
+DATA_TRANSFORMATION_MAX_FEATURES_KEY = "max_features"
+DATA_TRANSFORMATION_NGRAM_RANGE_KEY = "ngram_range"
+DATA_TRANSFORMATION_N_FEATURES_KEY = "n_features"
+DATA_TRANSFORMATION_OUT_OF_CORE_KEY = "out_of_core"
+DATA_TRANSFORMATION_SHARD_SIZE_KEY = "shard_size"
+DATA_TRANSFORMATION_MAX_CANDIDATE_TERMS_KEY = "max_candidate_terms"
+DATA_TRANSFORMATION_COMPRESS_KEY = "compress"
+DATA_TRANSFORMATION_TOKEN_CORPUS_DIR_KEY = "token_corpus_dir"
+DATA_TRANSFORMATION_INCREMENTAL_DIR_KEY = "incremental_dir"
+DATA_TRANSFORMATION_MAX_VOCABULARY_DRIFT_KEY = "max_vocabulary_drift"
+DATA_TRANSFORMATION_FEATURE_SELECTION_KEY = "feature_selection"
+DATA_TRANSFORMATION_SELECTED_FEATURES_KEY = "selected_features"
+CHI2_FEATURE_SELECTION = "chi2"
+MUTUAL_INFO_FEATURE_SELECTION = "mutual_info"
+L1_FEATURE_SELECTION = "l1"
+SHARD_DIR_NAME = "shards"
+SHARD_MANIFEST_EXTENSION = ".manifest.yaml"
+COUNT_FEATURIZER = "count"
+HASHING_FEATURIZER = "hashing"
 TARGET_COLUMNS_KEY = "target_column"
 
+
+# Model Trainer related variables
+MODEL_TRAINER_ARTIFACT_DIR = "model_trainer"
+MODEL_TRAINER_CONFIG_KEY = "model_trainer_config"
+MODEL_TRAINER_TRAINED_MODEL_DIR_KEY = "trained_model_dir"
+MODEL_TRAINER_TRAINED_MODEL_FILE_NAME_KEY = "model_file_name"
+MODEL_TRAINER_MODEL_NAME_KEY = "model_name"
+MODEL_TRAINER_PARAM_GRID_KEY = "param_grid"
+MODEL_TRAINER_CV_KEY = "cv"
+MODEL_TRAINER_N_JOBS_KEY = "n_jobs"
+MODEL_TRAINER_SCORING_KEY = "scoring"
+MODEL_TRAINER_RANDOM_STATE_KEY = "random_state"
+MODEL_TRAINER_N_EPOCHS_KEY = "n_epochs"
+MODEL_TRAINER_VALIDATION_SIZE_KEY = "validation_size"
+MODEL_TRAINER_COMPRESS_KEY = "compress"
+LOGISTIC_REGRESSION_MODEL = "logistic_regression"
+SGD_MODEL = "sgd"
+LINEAR_SVC_MODEL = "linear_svc"
+
+# Batch Prediction related variables
+BATCH_PREDICTION_ARTIFACT_DIR = "batch_prediction"
+BATCH_PREDICTION_CONFIG_KEY = "batch_prediction_config"
+BATCH_PREDICTION_DIR_KEY = "prediction_dir"
+BATCH_PREDICTION_FILE_FORMAT_KEY = "prediction_file_format"
+BATCH_PREDICTION_BATCH_SIZE_KEY = "batch_size"
+BATCH_PREDICTION_N_JOBS_KEY = "n_jobs"
+REVIEW_COLUMN_NAME = "review"
+PREDICTION_COLUMN_NAME = "predicted_sentiment"
+
+# Scoring Service related variables
+SCORING_SERVICE_CONFIG_KEY = "scoring_service_config"
+SCORING_SERVICE_HOST_KEY = "host"
+SCORING_SERVICE_PORT_KEY = "port"
+SCORING_SERVICE_MAX_BATCH_SIZE_KEY = "max_batch_size"
+SCORING_SERVICE_MAX_WAIT_MS_KEY = "max_wait_ms"
+SCORING_SERVICE_LATENCY_WINDOW_KEY = "latency_window"
@@ -1,11 +1,21 @@
 from collections import namedtuple
 
 DataIngestionArtifact = namedtuple("DataIngestionArtifact",
-                                   ["train_file_path", "test_file_path", "is_ingested", "message"])
+                                   ["train_file_path", "test_file_path", "is_ingested", "message", "file_format",
+                                    "is_incremental"])
 
 DataValidationArtifact = namedtuple("DataValidationArtifact",
-                                    ["schema_file_path", "is_validated", "message"])
+                                    ["schema_file_path", "is_validated", "message", "profile"])
 
 DataTransformationArtifact = namedtuple("DataTransformationArtifact",
                                         ["is_transformed", "message", "transformed_train_file_path",
-                                         "transformed_test_file_path", "preprocessed_object_file_path"])
+                                         "transformed_test_file_path", "preprocessed_object_file_path",
+                                         "is_sparse", "is_sharded"])
+
+ModelTrainerArtifact = namedtuple("ModelTrainerArtifact",
+                                  ["is_trained", "message", "trained_model_file_path", "train_accuracy",
+                                   "test_accuracy", "best_params"])
+
+BatchPredictionArtifact = namedtuple("BatchPredictionArtifact",
+                                     ["is_predicted", "message", "prediction_file_path", "n_reviews",
+                                      "elapsed_seconds", "reviews_per_second"])
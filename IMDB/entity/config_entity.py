@@ -2,13 +2,49 @@ from collections import namedtuple
 
 DataIngestionConfig = namedtuple("DataIngestionConfig",
                                  ["author_username", "raw_data_dir", "ingested_train_dir",
-                                  "kaggel_dataset_name", "ingested_test_dir"])
+                                  "kaggel_dataset_name", "ingested_test_dir", "test_size", "random_state",
+                                  "streaming", "chunk_size", "file_format", "dataset_version",
+                                  "download_cache_dir", "mirror", "deduplicate", "drop_near_duplicates",
+                                  "near_duplicate_threshold", "minhash_num_perm", "minhash_bands", "shingle_size",
+                                  "n_jobs", "schema_file_path", "incremental", "incremental_dir"])
 
-TrainingPipelineConfig = namedtuple("TrainingPipelineConfig", ["artifact_dir"])
+TrainingPipelineConfig = namedtuple("TrainingPipelineConfig", ["artifact_dir", "reuse_artifacts", "metrics_dir",
+                                                               "profile", "task_executor", "max_task_workers"])
 
 DataValidationConfig = namedtuple("DataValidationConfig",
-                                  ["schema_file_path"])
+                                  ["schema_file_path", "chunk_size"])
 
 DataTransformationConfig = namedtuple("DataTransformationConfig", ["transformed_train_dir",
                                                                    "transformed_test_dir",
-                                                                   "preprocessed_object_file_path"])
+                                                                   "preprocessed_object_file_path",
+                                                                   "sparse_output",
+                                                                   "n_jobs",
+                                                                   "chunk_size",
+                                                                   "nltk_data_dir",
+                                                                   "featurizer",
+                                                                   "max_features",
+                                                                   "ngram_range",
+                                                                   "n_features",
+                                                                   "out_of_core",
+                                                                   "shard_size",
+                                                                   "max_candidate_terms",
+                                                                   "compress",
+                                                                   "token_corpus_dir",
+                                                                   "incremental_dir",
+                                                                   "max_vocabulary_drift",
+                                                                   "feature_selection",
+                                                                   "selected_features"])
+
+ModelTrainerConfig = namedtuple("ModelTrainerConfig", ["trained_model_file_path", "model_name", "param_grid", "cv",
+                                                       "n_jobs", "scoring", "random_state", "n_epochs",
+                                                       "validation_size", "compress"])
+
+BatchPredictionConfig = namedtuple("BatchPredictionConfig", ["input_file_path", "input_file_format",
+                                                             "prediction_file_path", "prediction_file_format",
+                                                             "preprocessed_object_file_path",
+                                                             "trained_model_file_path", "batch_size", "n_jobs",
+                                                             "nltk_data_dir"])
+
+ScoringServiceConfig = namedtuple("ScoringServiceConfig", ["preprocessed_object_file_path", "trained_model_file_path",
+                                                           "nltk_data_dir", "host", "port", "max_batch_size",
+                                                           "max_wait_ms", "latency_window"])
@@ -1,6 +1,5 @@
 import logging
 import os
-import pandas as pd
 from IMDB.constant import get_current_time_stamp
 
 LOG_DIR = "logs"
@@ -12,26 +11,47 @@ def get_log_file_name():
 
 LOG_FILE_NAME = get_log_file_name()
 
-os.makedirs(LOG_DIR, exist_ok=True)
-
 LOG_FILE_PATH = os.path.join(LOG_DIR, LOG_FILE_NAME)
 
-logging.basicConfig(filename=LOG_FILE_PATH,
-                    filemode="w",
-                    format='[%(asctime)s] %(levelname)s : %(lineno)d %(filename)s %(funcName)s() %(message)s',
+# fields are separated by LOG_FIELD_SEPARATOR so get_log_dataframe can split them
+LOG_FIELD_SEPARATOR = "^;"
+LOG_COLUMNS = ["Time stamp", "Log Level", "line number", "file name", "function name", "message"]
+
+
+class DelayedFileHandler(logging.FileHandler):
+    """
+    FileHandler creating the log directory and file with the first record, so importing IMDB does no I/O
+    """
+
+    def __init__(self, filename: str, mode: str = "a"):
+        super().__init__(filename, mode=mode, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+logging.basicConfig(handlers=[DelayedFileHandler(LOG_FILE_PATH, mode="w")],
+                    format=LOG_FIELD_SEPARATOR.join(['[%(asctime)s]', '%(levelname)s', '%(lineno)d', '%(filename)s',
+                                                     '%(funcName)s()', '%(message)s']),
                     level=logging.INFO
                     )
 
 
 def get_log_dataframe(file_path):
+    import pandas as pd
+
     data = []
     with open(file_path) as log_file:
         for line in log_file.readlines():
-            data.append(line.split("^;"))
-
-    log_df = pd.DataFrame(data)
-    columns = ["Time stamp", "Log Level", "line number", "file name", "function name", "message"]
-    log_df.columns = columns
+            fields = line.rstrip("\n").split(LOG_FIELD_SEPARATOR, len(LOG_COLUMNS) - 1)
+            if len(fields) == len(LOG_COLUMNS):
+                data.append(fields)
+            elif data:
+                # continuation of a multi line message such as an IMDBException
+                data[-1][-1] += "\n" + line.rstrip("\n")
+
+    log_df = pd.DataFrame(data, columns=LOG_COLUMNS)
 
     log_df["log_message"] = log_df['Time stamp'].astype(str) + ":$" + log_df["message"]
 
@@ -0,0 +1,56 @@
+from IMDB.util.util import read_yaml_file, write_yaml_file
+from IMDB.exception import IMDBException
+from IMDB.logger import logging
+import sys, os
+
+ARTIFACT_PATH_SUFFIXES = ("_file_path", "_dir")
+
+
+class ArtifactRegistry:
+    """
+    Remembers the artifact a stage produced for a fingerprint of its inputs and config,
+    as one YAML file per fingerprint under registry_dir/<stage name>/.
+    registry_dir: str
+    """
+
+    def __init__(self, registry_dir: str):
+        self.registry_dir = registry_dir
+
+    def get_record_file_path(self, stage_name: str, fingerprint: str) -> str:
+        return os.path.join(self.registry_dir, stage_name, f"{fingerprint}.yaml")
+
+    def get_artifact(self, stage_name: str, fingerprint: str, artifact_type):
+        """
+        Returns the artifact recorded for fingerprint, or None when there is none
+        or when one of the files it points at no longer exists.
+        stage_name: str
+        fingerprint: str
+        artifact_type: namedtuple class of the artifact
+        """
+        try:
+            record_file_path = self.get_record_file_path(stage_name, fingerprint)
+            if not os.path.exists(record_file_path):
+                return None
+
+            record = read_yaml_file(file_path=record_file_path)
+            if set(record.keys()) != set(artifact_type._fields):
+                logging.info(f"Ignoring [{record_file_path}], its fields do not match {artifact_type.__name__}")
+                return None
+
+            for field_name, value in record.items():
+                if field_name.endswith(ARTIFACT_PATH_SUFFIXES) and isinstance(value, str) \
+                        and not os.path.exists(value):
+                    logging.info(f"Ignoring [{record_file_path}], [{value}] no longer exists")
+                    return None
+
+            return artifact_type(**record)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def save_artifact(self, stage_name: str, fingerprint: str, artifact):
+        try:
+            record_file_path = self.get_record_file_path(stage_name, fingerprint)
+            write_yaml_file(file_path=record_file_path, data=dict(artifact._asdict()))
+            logging.info(f"Recorded {type(artifact).__name__} for fingerprint [{fingerprint}]")
+        except Exception as e:
+            raise IMDBException(e, sys) from e
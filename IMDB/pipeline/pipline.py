@@ -1,34 +1,166 @@
 from IMDB.config.configuration import Configuration
 from IMDB.exception import IMDBException
-from IMDB.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact
+from IMDB.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact, \
+    ModelTrainerArtifact, BatchPredictionArtifact
 from IMDB.component.data_ingestion import DataIngestion
 from IMDB.component.data_validation import DataValidation
 from IMDB.component.data_transformation import DataTransformation
+from IMDB.component.model_trainer import ModelTrainer
+from IMDB.component.batch_prediction import BatchPrediction
+from IMDB.pipeline.artifact_registry import ArtifactRegistry
+from IMDB.util.util import get_file_hash, get_fingerprint
+from IMDB.util.artifact_cache import artifact_cache
+from IMDB.util.performance_recorder import performance_recorder
+from IMDB.util.task_graph import task_pool
+from IMDB.logger import logging
+from IMDB.constant import *
+import cProfile
+import json
+import time
 import sys
 
 
 class Pipeline:
 
-    def __init__(self, config: Configuration = Configuration()) -> None:
+    def __init__(self, config: Configuration = None) -> None:
+        """
+        config: Configuration read from config.yaml when the pipeline is built, not when this module is imported
+        """
         try:
-            self.config = config
+            self.config = config if config is not None else Configuration()
+            self.artifact_registry = ArtifactRegistry(
+                registry_dir=os.path.join(self.config.training_pipeline_config.artifact_dir, ARTIFACT_REGISTRY_DIR)
+            )
+
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def profile_stage(self, stage_name: str, run):
+        """
+        Runs the stage, under cProfile when training_pipeline_config.profile is set, in which case
+        the stats are dumped to <metrics_dir>/<stage_name>.prof for pstats or snakeviz
+        stage_name: str
+        run: callable running the stage and returning its artifact
+        """
+        training_pipeline_config = self.config.training_pipeline_config
+        if not training_pipeline_config.profile:
+            return run()
+
+        profile_file_path = os.path.join(training_pipeline_config.metrics_dir, stage_name + PROFILE_FILE_EXTENSION)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(run)
+        finally:
+            os.makedirs(training_pipeline_config.metrics_dir, exist_ok=True)
+            profiler.dump_stats(profile_file_path)
+            logging.info(f"Saved [{stage_name}] profile: [{profile_file_path}]")
+
+    def run_stage(self, stage_name: str, config_key: str, artifact_type, run, input_file_paths=(), reuse: bool = True):
+        """
+        Runs a stage, or returns the artifact of an earlier run with the same fingerprint.
+        The fingerprint covers the stage config section and the content of input_file_paths.
+        Wall and CPU time, peak RSS and the bytes written under the stage artifact directory are recorded.
+        stage_name: str
+        config_key: str key of the stage section in config.yaml
+        artifact_type: namedtuple class of the stage artifact
+        run: callable running the stage and returning its artifact
+        input_file_paths: files the stage reads
+        reuse: bool False for stages updating a state kept across runs, which always run
+        """
+        try:
+            stage_artifact_dir = os.path.join(self.config.training_pipeline_config.artifact_dir, stage_name,
+                                              self.config.time_stamp)
+            with performance_recorder.measure(stage_name, output_file_paths=(stage_artifact_dir,)) as measurement:
+                measurement.extra["reused"] = False
+                if not (reuse and self.config.training_pipeline_config.reuse_artifacts):
+                    return self.profile_stage(stage_name, run)
+
+                fingerprint = get_fingerprint(stage_name,
+                                              self.config.config_info.get(config_key),
+                                              [get_file_hash(file_path) for file_path in input_file_paths])
 
+                artifact = self.artifact_registry.get_artifact(stage_name=stage_name, fingerprint=fingerprint,
+                                                               artifact_type=artifact_type)
+                if artifact is not None:
+                    logging.info(f"Skipping [{stage_name}], inputs are unchanged since fingerprint [{fingerprint}]. "
+                                 f"Reusing: {artifact}")
+                    measurement.extra["reused"] = True
+                    return artifact
+
+                artifact = self.profile_stage(stage_name, run)
+                self.artifact_registry.save_artifact(stage_name=stage_name, fingerprint=fingerprint,
+                                                     artifact=artifact)
+                return artifact
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def save_metrics(self, wall_seconds: float) -> str:
+        """
+        Writes the measurements of the run to <metrics_dir>/metrics.json
+        wall_seconds: float duration of the whole run
+        return: str location of the metrics file
+        """
+        try:
+            metrics_file_path = os.path.join(self.config.training_pipeline_config.metrics_dir, METRICS_FILE_NAME)
+            os.makedirs(os.path.dirname(metrics_file_path), exist_ok=True)
+            metrics = {"time_stamp": self.config.time_stamp,
+                       "wall_seconds": wall_seconds,
+                       "artifact_cache": {"hits": artifact_cache.hits, "misses": artifact_cache.misses},
+                       "measurements": performance_recorder.get_report()}
+            with open(metrics_file_path, "w") as metrics_file:
+                json.dump(metrics, metrics_file, indent=2)
+            for measurement in metrics["measurements"]:
+                logging.info(f"Performance: {measurement}")
+            logging.info(f"Saved run metrics: [{metrics_file_path}]")
+            return metrics_file_path
         except Exception as e:
             raise IMDBException(e, sys) from e
 
     def start_data_ingestion(self) -> DataIngestionArtifact:
         try:
-            data_ingestion = DataIngestion(data_ingestion_config=self.config.get_data_ingestion_config())
-            return data_ingestion.initiate_data_ingestion()
+            data_ingestion_config = self.config.get_data_ingestion_config()
+
+            def run():
+                data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config)
+                return data_ingestion.initiate_data_ingestion()
+
+            # only a pinned Kaggle dataset_version is immutable, the latest release or a mirror can change
+            # without the config changing, so ingestion then always runs and later stages reuse their
+            # artifacts only when the ingested files hash the same
+            is_pinned = data_ingestion_config.dataset_version is not None and not data_ingestion_config.mirror
+            data_ingestion_artifact = self.run_stage(stage_name=DATA_INGESTION_ARTIFACT_DIR,
+                                                     config_key=DATA_INGESTION_CONFIG_KEY,
+                                                     artifact_type=DataIngestionArtifact,
+                                                     run=run,
+                                                     input_file_paths=(data_ingestion_config.schema_file_path,),
+                                                     reuse=is_pinned and not data_ingestion_config.incremental)
+            # an incremental run without new raw files has nothing to do, run_pipeline stops after ingestion
+            if not data_ingestion_artifact.is_ingested and not data_ingestion_artifact.is_incremental:
+                raise Exception(f"Data ingestion failed: {data_ingestion_artifact.message}")
+            return data_ingestion_artifact
         except Exception as e:
             raise IMDBException(e, sys) from e
 
     def start_data_validation(self, data_ingestion_artifact: DataIngestionArtifact) -> DataValidationArtifact:
         try:
-            data_validation = DataValidation(data_validation_config=self.config.get_data_validation_config(),
-                                             data_ingestion_artifact=data_ingestion_artifact
-                                             )
-            return data_validation.initiate_data_validation()
+            data_validation_config = self.config.get_data_validation_config()
+
+            def run():
+                data_validation = DataValidation(data_validation_config=data_validation_config,
+                                                 data_ingestion_artifact=data_ingestion_artifact
+                                                 )
+                return data_validation.initiate_data_validation()
+
+            data_validation_artifact = self.run_stage(stage_name=DATA_VALIDATION_ARTIFACT_DIR,
+                                                      config_key=DATA_VALIDATION_CONFIG_KEY,
+                                                      artifact_type=DataValidationArtifact,
+                                                      run=run,
+                                                      input_file_paths=(data_ingestion_artifact.train_file_path,
+                                                                        data_ingestion_artifact.test_file_path,
+                                                                        data_validation_config.schema_file_path))
+            if not data_validation_artifact.is_validated:
+                raise Exception(f"Data validation failed: {data_validation_artifact.message}")
+            return data_validation_artifact
         except Exception as e:
             raise IMDBException(e, sys) from e
 
@@ -37,25 +169,123 @@ class Pipeline:
                                   data_validation_artifact: DataValidationArtifact
                                   ) -> DataTransformationArtifact:
         try:
-            data_transformation = DataTransformation(
-                data_transformation_config=self.config.get_data_transformation_config(),
-                data_ingestion_artifact=data_ingestion_artifact,
-                data_validation_artifact=data_validation_artifact
-            )
-            return data_transformation.initiate_data_transformation()
+            def run():
+                data_transformation = DataTransformation(
+                    data_transformation_config=self.config.get_data_transformation_config(),
+                    data_ingestion_artifact=data_ingestion_artifact,
+                    data_validation_artifact=data_validation_artifact
+                )
+                return data_transformation.initiate_data_transformation()
+
+            data_transformation_artifact = self.run_stage(stage_name=DATA_TRANSFORMATION_ARTIFACT_DIR,
+                                                          config_key=DATA_TRANSFORMATION_CONFIG_KEY,
+                                                          artifact_type=DataTransformationArtifact,
+                                                          run=run,
+                                                          input_file_paths=(data_ingestion_artifact.train_file_path,
+                                                                            data_ingestion_artifact.test_file_path,
+                                                                            data_validation_artifact.schema_file_path),
+                                                          reuse=not data_ingestion_artifact.is_incremental)
+            # new raw files are only recorded as ingested once their rows are transformed,
+            # a run failing earlier leaves them to the next run
+            if data_ingestion_artifact.is_incremental:
+                DataIngestion(data_ingestion_config=self.config.get_data_ingestion_config()).commit_incremental_state()
+            return data_transformation_artifact
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact) -> ModelTrainerArtifact:
+        try:
+            def run():
+                model_trainer = ModelTrainer(model_trainer_config=self.config.get_model_trainer_config(),
+                                             data_transformation_artifact=data_transformation_artifact
+                                             )
+                return model_trainer.initiate_model_trainer()
+
+            return self.run_stage(stage_name=MODEL_TRAINER_ARTIFACT_DIR,
+                                  config_key=MODEL_TRAINER_CONFIG_KEY,
+                                  artifact_type=ModelTrainerArtifact,
+                                  run=run,
+                                  input_file_paths=(data_transformation_artifact.transformed_train_file_path,
+                                                    data_transformation_artifact.transformed_test_file_path))
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def start_batch_prediction(self, input_file_path: str, preprocessed_object_file_path: str,
+                               trained_model_file_path: str) -> BatchPredictionArtifact:
+        try:
+            batch_prediction_config = self.config.get_batch_prediction_config(
+                input_file_path=input_file_path,
+                preprocessed_object_file_path=preprocessed_object_file_path,
+                trained_model_file_path=trained_model_file_path)
+
+            def run():
+                batch_prediction = BatchPrediction(batch_prediction_config=batch_prediction_config)
+                return batch_prediction.initiate_batch_prediction()
+
+            return self.run_stage(stage_name=BATCH_PREDICTION_ARTIFACT_DIR,
+                                  config_key=BATCH_PREDICTION_CONFIG_KEY,
+                                  artifact_type=BatchPredictionArtifact,
+                                  run=run,
+                                  input_file_paths=(input_file_path, preprocessed_object_file_path,
+                                                    trained_model_file_path),
+                                  # every run is scored, its throughput is what is reported
+                                  reuse=False)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def run_batch_prediction(self, input_file_path: str, preprocessed_object_file_path: str,
+                             trained_model_file_path: str) -> BatchPredictionArtifact:
+        """
+        Scores input_file_path and writes the run metrics, the throughput of the run is
+        reviews_per_second of the artifact
+        input_file_path: str csv or parquet file with a review column to score
+        preprocessed_object_file_path: str preprocessing object written by data transformation
+        trained_model_file_path: str model written by the model trainer
+        """
+        try:
+            with performance_recorder.session():
+                start_time = time.perf_counter()
+                try:
+                    return self.start_batch_prediction(input_file_path=input_file_path,
+                                                       preprocessed_object_file_path=preprocessed_object_file_path,
+                                                       trained_model_file_path=trained_model_file_path)
+                finally:
+                    self.save_metrics(wall_seconds=time.perf_counter() - start_time)
         except Exception as e:
             raise IMDBException(e, sys) from e
 
     def run_pipeline(self):
+        """
+        Runs data ingestion, validation, transformation and model training one after the other.
+        An incremental run without new raw files stops after data ingestion.
+        Independent work inside the stages runs on the pool set by task_executor and max_task_workers.
+        """
         try:
-            # data ingestion
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-            data_transformation_artifact = self.start_data_transformation(
-                data_ingestion_artifact=data_ingestion_artifact,
-                data_validation_artifact=data_validation_artifact
-            )
+            training_pipeline_config = self.config.training_pipeline_config
+            # stage configs are read when their stage starts, the model trainer one is checked
+            # before the data stages so an invalid model for the data fails the run at once
+            self.config.get_model_trainer_config()
+            # loaded splits and parsed schema are shared between stages until the run ends
+            with artifact_cache.session(), performance_recorder.session(), \
+                    task_pool.configure(executor_type=training_pipeline_config.task_executor,
+                                        max_workers=training_pipeline_config.max_task_workers):
+                start_time = time.perf_counter()
+                try:
+                    data_ingestion_artifact = self.start_data_ingestion()
+                    if not data_ingestion_artifact.is_ingested:
+                        logging.info(f"Skipping the other stages: {data_ingestion_artifact.message}")
+                        return
+                    data_validation_artifact = self.start_data_validation(
+                        data_ingestion_artifact=data_ingestion_artifact)
+                    data_transformation_artifact = self.start_data_transformation(
+                        data_ingestion_artifact=data_ingestion_artifact,
+                        data_validation_artifact=data_validation_artifact
+                    )
+                    self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
+                    logging.info(f"Artifact cache hits: [{artifact_cache.hits}] misses: [{artifact_cache.misses}]")
+                finally:
+                    # written for failed runs too, so the stages that completed can be compared
+                    self.save_metrics(wall_seconds=time.perf_counter() - start_time)
 
         except Exception as e:
             raise IMDBException(e, sys) from e
-        
\ No newline at end of file
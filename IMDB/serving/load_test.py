@@ -0,0 +1,96 @@
+"""
+Load tests the scoring service with and without micro-batching.
+
+Starts the service in process once per max batch size (1 means per-request scoring), sends the same
+single review requests from concurrent keep-alive connections and prints throughput and latency.
+
+usage: python -m IMDB.serving.load_test --preprocessed-object preprocessed.pkl --model model.pkl
+                                        --file "IMDB Dataset.csv" [--requests 2000] [--concurrency 64]
+                                        [--max-batch-size 1 64]
+"""
+from IMDB.serving.scoring_service import ScoringService, LatencyRecorder
+from IMDB.config.configuration import Configuration
+import pandas as pd
+import argparse
+import asyncio
+import json
+import time
+
+
+async def send_requests(host: str, port: int, reviews: list, latency: LatencyRecorder):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for review in reviews:
+            body = json.dumps({"review": review}).encode("utf-8")
+            start_time = time.perf_counter()
+            writer.write(f"POST /predict HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+
+            status_line = await reader.readline()
+            content_length = 0
+            while True:
+                header_line = await reader.readline()
+                if header_line in (b"\r\n", b""):
+                    break
+                name, _, value = header_line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    content_length = int(value)
+            await reader.readexactly(content_length)
+            if b" 200 " not in status_line:
+                raise Exception(f"Request failed: {status_line!r}")
+            latency.record(time.perf_counter() - start_time)
+    finally:
+        writer.close()
+
+
+async def run_load(scoring_service_config, reviews: list, concurrency: int) -> dict:
+    service = ScoringService(scoring_service_config)
+    server = await service.start()
+    host, port = server.sockets[0].getsockname()[:2]
+    latency = LatencyRecorder(window=len(reviews))
+    try:
+        start_time = time.perf_counter()
+        await asyncio.gather(*(send_requests(host, port, reviews[worker::concurrency], latency)
+                               for worker in range(concurrency)))
+        elapsed_seconds = time.perf_counter() - start_time
+    finally:
+        await service.stop()
+
+    metrics = service.get_metrics()
+    return {
+        "max_batch_size": scoring_service_config.max_batch_size,
+        "requests": latency.count,
+        "requests_per_second": latency.count / elapsed_seconds,
+        "latency_p50_ms": latency.percentile(50) * 1000,
+        "latency_p99_ms": latency.percentile(99) * 1000,
+        "mean_batch_size": metrics["mean_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preprocessed-object", required=True, help="preprocessed.pkl written by the pipeline")
+    parser.add_argument("--model", required=True, help="model.pkl written by the model trainer")
+    parser.add_argument("--file", required=True, help="csv file with a review column")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-batch-size", type=int, nargs="+", default=None,
+                        help="batch sizes to compare, 1 and the configured one by default")
+    args = parser.parse_args()
+
+    scoring_service_config = Configuration().get_scoring_service_config(
+        preprocessed_object_file_path=args.preprocessed_object,
+        trained_model_file_path=args.model)._replace(host="127.0.0.1", port=0)
+    reviews = pd.read_csv(args.file, nrows=args.requests)["review"].tolist()
+    max_batch_sizes = args.max_batch_size or [1, scoring_service_config.max_batch_size]
+
+    for max_batch_size in max_batch_sizes:
+        report = asyncio.run(run_load(scoring_service_config._replace(max_batch_size=max_batch_size),
+                                      reviews=reviews, concurrency=args.concurrency))
+        print(", ".join(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}"
+                        for key, value in report.items()))
+
+
+if __name__ == "__main__":
+    main()
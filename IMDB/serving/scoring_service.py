@@ -0,0 +1,253 @@
+"""
+Local HTTP sentiment scoring service built on asyncio, with request micro-batching.
+
+endpoints:
+    POST /predict  body {"reviews": ["...", ...]} or {"review": "..."}
+    GET  /metrics  request, batch and p50/p99 latency counters
+    GET  /health
+
+usage: python -m IMDB.serving.scoring_service --preprocessed-object preprocessed.pkl --model model.pkl
+"""
+from IMDB.entity.config_entity import ScoringServiceConfig
+from IMDB.util.imdb_predictor import IMDBPredictor
+from IMDB.config.configuration import Configuration
+from IMDB.exception import IMDBException
+from IMDB.logger import logging
+from collections import deque
+import argparse
+import asyncio
+import json
+import time
+import sys
+
+WARM_UP_REVIEWS = ["This movie was a wonderful surprise, great acting.",
+                   "Terrible plot and boring characters, a waste of time."]
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                500: "Internal Server Error"}
+
+
+class LatencyRecorder:
+    """
+    Keeps the last window latencies, in seconds, and reports their percentiles
+    """
+
+    def __init__(self, window: int = 10000):
+        self.latencies = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.latencies.append(seconds)
+        self.count += 1
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        index = min(len(latencies) - 1, int(round(percent / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+
+class MicroBatcher:
+    """
+    Coalesces reviews submitted by concurrent requests into batches of at most max_batch_size,
+    waiting at most max_wait_ms after the first one, and scores every batch as one sparse matrix
+    in a worker thread so the event loop keeps accepting requests.
+    """
+
+    def __init__(self, predictor: IMDBPredictor, max_batch_size: int, max_wait_ms: float):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.queue = None
+        self.batch_count = 0
+        self.review_count = 0
+        self._task = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def predict(self, reviews: list) -> list:
+        loop = asyncio.get_running_loop()
+        futures = []
+        for review in reviews:
+            future = loop.create_future()
+            self.queue.put_nowait((review, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def _next_batch(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            reviews = [review for review, _ in batch]
+            try:
+                predictions = await loop.run_in_executor(None, self.predictor.predict_sentiment, reviews)
+                for (_, future), prediction in zip(batch, predictions):
+                    if not future.done():
+                        future.set_result(str(prediction))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self.batch_count += 1
+            self.review_count += len(batch)
+
+
+class ScoringService:
+
+    def __init__(self, scoring_service_config: ScoringServiceConfig):
+        try:
+            self.scoring_service_config = scoring_service_config
+            self.predictor = IMDBPredictor(
+                preprocessed_object_file_path=scoring_service_config.preprocessed_object_file_path,
+                trained_model_file_path=scoring_service_config.trained_model_file_path,
+                nltk_data_dir=scoring_service_config.nltk_data_dir)
+            self.batcher = MicroBatcher(predictor=self.predictor,
+                                        max_batch_size=scoring_service_config.max_batch_size,
+                                        max_wait_ms=scoring_service_config.max_wait_ms)
+            self.latency = LatencyRecorder(window=scoring_service_config.latency_window)
+            self.server = None
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def warm_up(self):
+        """
+        Runs a first prediction so lazy model state, the stem cache and the vectorizer are warm
+        before the first request
+        """
+        self.predictor.predict_sentiment(WARM_UP_REVIEWS)
+
+    def get_metrics(self) -> dict:
+        return {
+            "requests": self.latency.count,
+            "reviews": self.batcher.review_count,
+            "batches": self.batcher.batch_count,
+            "mean_batch_size": self.batcher.review_count / self.batcher.batch_count if self.batcher.batch_count else 0,
+            "latency_p50_ms": self.latency.percentile(50) * 1000,
+            "latency_p99_ms": self.latency.percentile(99) * 1000,
+        }
+
+    async def handle_request(self, method: str, path: str, body: bytes):
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            return 200, self.get_metrics()
+        if path != "/predict":
+            return 404, {"error": f"Unknown path: {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+
+        start_time = time.perf_counter()
+        try:
+            payload = json.loads(body or b"{}")
+            reviews = payload["reviews"] if "reviews" in payload else [payload["review"]]
+            if not isinstance(reviews, list) or not reviews:
+                raise ValueError("reviews must be a non empty list")
+            if not all(isinstance(review, str) for review in reviews):
+                raise ValueError("reviews must be strings")
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": f"Expected {{\"reviews\": [str]}} or {{\"review\": str}}: {e}"}
+
+        predictions = await self.batcher.predict(reviews)
+        self.latency.record(time.perf_counter() - start_time)
+        return 200, {"predictions": predictions}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    header_line = await reader.readline()
+                    if header_line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header_line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    status, response = await self.handle_request(method, path, body)
+                except Exception as e:
+                    logging.error(f"Scoring request failed: {e}")
+                    status, response = 500, {"error": str(e)}
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                response_body = json.dumps(response).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(response_body)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                             + response_body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.warm_up()
+        self.batcher.start()
+        self.server = await asyncio.start_server(self.handle_connection,
+                                                 host=self.scoring_service_config.host,
+                                                 port=self.scoring_service_config.port)
+        logging.info(f"Scoring service listening on "
+                     f"[{self.scoring_service_config.host}:{self.scoring_service_config.port}]")
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preprocessed-object", required=True, help="preprocessed.pkl written by the pipeline")
+    parser.add_argument("--model", required=True, help="model.pkl written by the model trainer")
+    args = parser.parse_args()
+
+    scoring_service_config = Configuration().get_scoring_service_config(
+        preprocessed_object_file_path=args.preprocessed_object,
+        trained_model_file_path=args.model)
+    asyncio.run(ScoringService(scoring_service_config).serve_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from contextlib import contextmanager
+from typing import Any, Callable
+import threading
+import os
+
+
+class ArtifactCache:
+    """
+    In-process cache of loaded files, keyed by absolute path plus modification time and size,
+    so a file rewritten on disk is loaded again. It is only active inside session(),
+    which the pipeline opens for one run and which evicts every entry when it ends.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._sessions = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def is_active(self) -> bool:
+        return self._sessions > 0
+
+    def get_or_load(self, file_path: str, loader: Callable[[], Any], *key_parts) -> Any:
+        """
+        Returns the cached value of file_path, calling loader when it is missing or stale
+        file_path: str file the value was loaded from
+        loader: callable returning the value
+        key_parts: extra values distinguishing several loads of the same file
+        """
+        if not self.is_active:
+            return loader()
+
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path),) + key_parts
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader()
+        with self._lock:
+            self._entries[key] = (version, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @contextmanager
+    def session(self):
+        with self._lock:
+            self._sessions += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._sessions -= 1
+                if self._sessions == 0:
+                    self._entries.clear()
+
+
+artifact_cache = ArtifactCache()
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from IMDB.util.lazy_import import lazy_import
+from IMDB.constant import CHI2_FEATURE_SELECTION, MUTUAL_INFO_FEATURE_SELECTION, L1_FEATURE_SELECTION
+import copy
+
+np = lazy_import("numpy")
+scipy = lazy_import("scipy")
+
+FEATURE_SELECTIONS = (CHI2_FEATURE_SELECTION, MUTUAL_INFO_FEATURE_SELECTION, L1_FEATURE_SELECTION)
+
+
+def get_chi2_scores(input_feature, target: np.ndarray) -> np.ndarray:
+    """
+    Returns the chi2 statistic of the counts of every column against the target
+    """
+    from sklearn.feature_selection import chi2
+
+    scores, _ = chi2(input_feature, target)
+    # columns without any count have no statistic
+    return np.nan_to_num(scores)
+
+
+def get_mutual_info_scores(input_feature, target: np.ndarray) -> np.ndarray:
+    """
+    Returns the mutual information in nats between the occurrence of every column in a review and the target.
+    It is computed from the number of reviews of every class a column occurs in, so the matrix stays sparse,
+    where sklearn mutual_info_classif would go through every column as a dense array.
+    """
+    input_feature = scipy.sparse.csr_matrix(input_feature) > 0
+    target = np.asarray(target)
+    n_rows = input_feature.shape[0]
+    n_occurrences = np.asarray(input_feature.sum(axis=0)).ravel()
+
+    scores = np.zeros(input_feature.shape[1])
+    for label, n_class_rows in zip(*np.unique(target, return_counts=True)):
+        n_class_occurrences = np.asarray(input_feature[target == label].sum(axis=0)).ravel()
+        for n_joint, n_marginal in ((n_class_occurrences, n_occurrences),
+                                    (n_class_rows - n_class_occurrences, n_rows - n_occurrences)):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # 0 log 0 gives nan and counts as 0
+                scores += np.nan_to_num(n_joint / n_rows * np.log(n_joint * n_rows / (n_class_rows * n_marginal)))
+    return scores
+
+
+def get_l1_scores(input_feature, target: np.ndarray, c: float = 1.0, random_state: int = 42) -> np.ndarray:
+    """
+    Returns the absolute coefficients of an L1 regularized logistic regression, zero for the columns it drops
+    c: float inverse of the regularization strength, lower values keep fewer columns
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.utils.fixes import parse_version
+    import sklearn
+
+    # penalty is deprecated from sklearn 1.8 on, where l1_ratio alone selects the L1 penalty
+    if parse_version(sklearn.__version__) >= parse_version("1.8"):
+        penalty = {"l1_ratio": 1.0}
+    else:
+        penalty = {"penalty": "l1"}
+    model = LogisticRegression(solver="liblinear", C=c, random_state=random_state, **penalty)
+    model.fit(input_feature, target)
+    return np.abs(model.coef_).max(axis=0)
+
+
+def get_feature_scores(method: str, input_feature, target: np.ndarray, random_state: int = 42) -> np.ndarray:
+    """
+    Returns one score per column of the sparse count matrix, higher for columns telling more about the target
+    method: str one of FEATURE_SELECTIONS
+    input_feature: scipy.sparse matrix of counts
+    target: np.ndarray label of every row
+    """
+    if method == CHI2_FEATURE_SELECTION:
+        return get_chi2_scores(input_feature, target)
+    if method == MUTUAL_INFO_FEATURE_SELECTION:
+        return get_mutual_info_scores(input_feature, target)
+    if method == L1_FEATURE_SELECTION:
+        return get_l1_scores(input_feature, target, random_state=random_state)
+    raise Exception(f"Feature selection: [{method}] is not one of {list(FEATURE_SELECTIONS)}")
+
+
+def get_top_columns(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Returns the sorted indices of the k columns with the highest score, ties going to the lower index.
+    Columns scoring 0 are never kept, so fewer than k may be returned.
+    """
+    columns = np.argsort(-scores, kind="stable")[:k]
+    return np.sort(columns[scores[columns] > 0])
+
+
+def reduce_vocabulary(vectorizer, columns: np.ndarray):
+    """
+    Returns a copy of a fitted CountVectorizer whose vocabulary only holds columns, renumbered in their order,
+    so its matrices equal the columns of the original ones and other n-grams are never counted
+    vectorizer: fitted CountVectorizer
+    columns: sorted column indices
+    """
+    terms = vectorizer.get_feature_names_out()[columns]
+    reduced_vectorizer = copy.copy(vectorizer)
+    reduced_vectorizer.vocabulary_ = dict(zip(terms.tolist(), range(len(terms))))
+    return reduced_vectorizer
@@ -0,0 +1,49 @@
+from __future__ import annotations
+from IMDB.util.text_normalizer import TextNormalizer, load_stopword_list
+from IMDB.util.util import load_fitted_object
+from IMDB.util.lazy_import import lazy_import
+from IMDB.exception import IMDBException
+from IMDB.constant import SENTIMENT_LABELS
+from typing import Iterable
+import sys
+
+np = lazy_import("numpy")
+
+
+class IMDBPredictor:
+    """
+    Scores raw review text with the preprocessing object and model written by the training pipeline.
+    Both are loaded once with their arrays memory mapped, reviews go through the same normalization
+    as porter and every batch is vectorized and predicted as a single sparse matrix.
+    preprocessed_object_file_path: str
+    trained_model_file_path: str
+    nltk_data_dir: str optional local directory holding the NLTK stopwords corpus
+    """
+
+    def __init__(self, preprocessed_object_file_path: str, trained_model_file_path: str,
+                 nltk_data_dir: str = None):
+        try:
+            self.preprocessing_obj = load_fitted_object(file_path=preprocessed_object_file_path)
+            self.model = load_fitted_object(file_path=trained_model_file_path)
+            self.normalizer = TextNormalizer(
+                stopword_list=load_stopword_list(language='english', nltk_data_dir=nltk_data_dir))
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def predict(self, reviews: Iterable[str]) -> np.array:
+        """
+        Returns 1 for positive and 0 for negative, one per review
+        reviews: iterable of raw review text
+        """
+        try:
+            input_feature = self.preprocessing_obj.transform(self.normalizer.normalize_many(reviews))
+            return self.model.predict(input_feature)
+        except Exception as e:
+            raise IMDBException(e, sys) from e
+
+    def predict_sentiment(self, reviews: Iterable[str]) -> np.array:
+        """
+        Returns positive or negative, one per review
+        reviews: iterable of raw review text
+        """
+        return np.asarray(SENTIMENT_LABELS)[self.predict(reviews).astype(int)]
@@ -0,0 +1,32 @@
+from types import ModuleType
+import importlib.util
+import importlib
+import sys
+
+
+class LazyModule(ModuleType):
+    """
+    Stands for a module that is imported on first attribute access. The import goes through
+    importlib.import_module, whose module locks make concurrent first accesses from several threads safe,
+    unlike importlib.util.LazyLoader before Python 3.12 which could expose a partly executed module.
+    """
+
+    def __getattr__(self, attribute: str):
+        module = importlib.import_module(self.__name__)
+        # later lookups find the attributes directly, missing ones such as submodules imported later come back here
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+
+def lazy_import(module_name: str) -> ModuleType:
+    """
+    Returns the module, executed on first attribute access instead of at import,
+    so heavy dependencies are only paid for by the code paths that use them
+    module_name: str absolute module name such as "pandas" or "scipy"
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    if importlib.util.find_spec(module_name) is None:
+        raise ModuleNotFoundError(f"No module named '{module_name}'", name=module_name)
+    return LazyModule(module_name)
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from IMDB.util.text_normalizer import NON_ALPHANUMERIC_PATTERN, get_worker_count
+from IMDB.util.lazy_import import lazy_import
+from collections import deque
+from typing import Iterable, List
+import itertools
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+scipy = lazy_import("scipy")
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_CHUNK_SIZE = 2000
+# reviews hashed at once, bounds the (shingles x num_perm) matrix of a batch to a few tens of MB
+SIGNATURE_BATCH_SIZE = 256
+# odd multiplier combining consecutive hashes into shingle and band keys
+HASH_MULTIPLIER = 0x100000001B3
+
+# hasher owned by a process pool worker, built once by _init_worker
+_worker_hasher = None
+
+
+def _init_worker(num_perm: int, shingle_size: int, random_state: int):
+    global _worker_hasher
+    _worker_hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size, random_state=random_state)
+
+
+def _get_chunk_signatures(reviews: List[str]) -> np.ndarray:
+    return _worker_hasher.get_signatures(reviews)
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of reviews over their word shingles.
+    Two signatures agree on a share of positions that estimates the Jaccard similarity of the shingle sets.
+    Tokens are hashed with pandas' fixed key siphash, so signatures are the same in every process.
+    """
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, shingle_size: int = DEFAULT_SHINGLE_SIZE,
+                 random_state: int = 42):
+        """
+        num_perm: int number of hash functions, the signature length
+        shingle_size: int words per shingle, shorter reviews are shingled by word
+        random_state: int seed of the hash functions
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.random_state = random_state
+        rng = np.random.RandomState(random_state)
+        # multiply-shift hash functions: the top 32 bits of (a * x + b) mod 2 ** 64 with a odd,
+        # universal without the modulo by a prime that dominated the signature time
+        self.a = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    def get_shingle_hashes(self, reviews: List[str]):
+        """
+        Returns the 64 bit hash of every shingle and the position of its review, grouped by review.
+        Every review gets at least one shingle, empty ones a shingle of hash 0.
+        """
+        token_lists = [NON_ALPHANUMERIC_PATTERN.sub(" ", review.lower()).split() for review in reviews]
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        n_tokens = int(offsets[-1])
+        review_of_token = np.repeat(np.arange(len(reviews)), lengths)
+
+        tokens = np.fromiter(itertools.chain.from_iterable(token_lists), dtype=object, count=n_tokens)
+        token_hashes = pd.util.hash_array(tokens) if n_tokens else np.zeros(0, dtype=np.uint64)
+
+        k = self.shingle_size
+        n_windows = max(n_tokens - k + 1, 0)
+        window_hashes = token_hashes[:n_windows].copy()
+        with np.errstate(over="ignore"):
+            for shift in range(1, k):
+                window_hashes = window_hashes * np.uint64(HASH_MULTIPLIER) + token_hashes[shift:shift + n_windows]
+        window_reviews = review_of_token[:n_windows]
+        # windows crossing into the next review are dropped
+        is_inside = np.arange(n_windows) + k <= offsets[window_reviews + 1]
+
+        is_short = lengths < k
+        short_tokens = is_short[review_of_token]
+        empty_reviews = np.flatnonzero(lengths == 0)
+
+        shingle_hashes = np.concatenate([window_hashes[is_inside], token_hashes[short_tokens],
+                                         np.zeros(len(empty_reviews), dtype=np.uint64)])
+        shingle_reviews = np.concatenate([window_reviews[is_inside], review_of_token[short_tokens], empty_reviews])
+        order = np.argsort(shingle_reviews, kind="stable")
+        return shingle_hashes[order], shingle_reviews[order]
+
+    def get_signatures(self, reviews: List[str]) -> np.ndarray:
+        """
+        Returns a (len(reviews), num_perm) uint32 array of MinHash signatures
+        reviews: list of raw review text
+        """
+        signatures = np.empty((len(reviews), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(reviews), SIGNATURE_BATCH_SIZE):
+            batch = reviews[start:start + SIGNATURE_BATCH_SIZE]
+            shingle_hashes, shingle_reviews = self.get_shingle_hashes(batch)
+            permuted = np.multiply(shingle_hashes[:, None], self.a)
+            permuted += self.b
+            permuted >>= np.uint64(32)
+            permuted = permuted.astype(np.uint32)
+            review_starts = np.flatnonzero(np.r_[True, shingle_reviews[1:] != shingle_reviews[:-1]])
+            signatures[start:start + len(batch)] = np.minimum.reduceat(permuted, review_starts, axis=0)
+        return signatures
+
+    def get_signatures_many(self, reviews: Iterable[str], n_jobs: int = 1,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+        """
+        Returns the signatures of every review, in input order.
+        With more than one job chunks of reviews are hashed by a process pool.
+        reviews: iterable of raw review text
+        n_jobs: int number of worker processes, -1 to use every core
+        chunk_size: int number of reviews sent to a worker at once
+        """
+        reviews = iter(reviews)
+        chunks = iter(lambda: list(itertools.islice(reviews, chunk_size)), [])
+        return self.get_chunk_signatures(chunks, n_jobs=n_jobs)
+
+    def get_chunk_signatures(self, review_chunks: Iterable[List[str]], n_jobs: int = 1) -> np.ndarray:
+        """
+        Returns the signatures of the reviews of every chunk, in input order.
+        Chunks are read lazily and at most two per worker are in flight,
+        so only the signatures are held for the whole corpus.
+        review_chunks: iterable of lists of raw review text
+        n_jobs: int number of worker processes, -1 to use every core
+        """
+        n_workers = get_worker_count(n_jobs)
+        if n_workers == 1:
+            signatures = [self.get_signatures(list(chunk)) for chunk in review_chunks]
+            return np.concatenate(signatures) if signatures else np.zeros((0, self.num_perm), dtype=np.uint32)
+
+        signatures = []
+        with ProcessPoolExecutor(max_workers=n_workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.num_perm, self.shingle_size, self.random_state)) as executor:
+            pending = deque()
+            for chunk in review_chunks:
+                pending.append(executor.submit(_get_chunk_signatures, list(chunk)))
+                if len(pending) >= 2 * n_workers:
+                    signatures.append(pending.popleft().result())
+            signatures.extend(future.result() for future in pending)
+        return np.concatenate(signatures) if signatures else np.zeros((0, self.num_perm), dtype=np.uint32)
+
+
+def get_band_keys(signatures: np.ndarray, bands: int = DEFAULT_BANDS) -> np.ndarray:
+    """
+    Returns a (n, bands) uint64 array, the LSH bucket of every row in every band
+    signatures: (n, num_perm) array, num_perm must be a multiple of bands
+    bands: int number of bands
+    """
+    n_rows, num_perm = signatures.shape
+    if num_perm % bands:
+        raise Exception(f"Signature length [{num_perm}] is not a multiple of bands [{bands}]")
+    rows_per_band = num_perm // bands
+    band_signatures = signatures.reshape(n_rows, bands, rows_per_band).astype(np.uint64)
+    band_keys = band_signatures[:, :, 0].copy()
+    with np.errstate(over="ignore"):
+        for column in range(1, rows_per_band):
+            band_keys = band_keys * np.uint64(HASH_MULTIPLIER) + band_signatures[:, :, column]
+    return band_keys
+
+
+def get_candidate_pairs(signatures: np.ndarray, bands: int = DEFAULT_BANDS):
+    """
+    Returns the (row, representative) pairs of rows sharing an LSH bucket in at least one band.
+    Each bucket links its rows to its first row instead of to each other, so the number of pairs
+    grows linearly with the rows and not with the square of the bucket sizes.
+    signatures: (n, num_perm) array, num_perm must be a multiple of bands
+    bands: int number of bands, more bands find less similar pairs
+    """
+    n_rows = len(signatures)
+    band_keys = get_band_keys(signatures, bands=bands)
+    row_index = np.arange(n_rows)
+    pairs = []
+    for band in range(bands):
+        _, first_rows, bucket_of_row = np.unique(band_keys[:, band], return_index=True, return_inverse=True)
+        representatives = first_rows[bucket_of_row.ravel()]
+        is_linked = representatives != row_index
+        pairs.append(row_index[is_linked] * n_rows + representatives[is_linked])
+    pairs = np.unique(np.concatenate(pairs)) if pairs else np.zeros(0, dtype=np.int64)
+    return pairs // max(n_rows, 1), pairs % max(n_rows, 1)
+
+
+def find_near_duplicate_groups(signatures: np.ndarray, bands: int = DEFAULT_BANDS,
+                               threshold: float = DEFAULT_THRESHOLD, block_size: int = 100000) -> np.ndarray:
+    """
+    Returns the group of every row: the index of the first row it is a near duplicate of, itself if none.
+    Candidate pairs from LSH are kept when their estimated Jaccard similarity reaches threshold,
+    groups are the connected components of the kept pairs.
+    signatures: (n, num_perm) array from MinHasher
+    bands: int LSH bands
+    threshold: float minimum estimated Jaccard similarity of near duplicates
+    block_size: int candidate pairs compared at once
+    """
+    n_rows = len(signatures)
+    rows, representatives = get_candidate_pairs(signatures, bands=bands)
+    is_similar = np.zeros(len(rows), dtype=bool)
+    for start in range(0, len(rows), block_size):
+        end = start + block_size
+        similarity = (signatures[rows[start:end]] == signatures[representatives[start:end]]).mean(axis=1)
+        is_similar[start:end] = similarity >= threshold
+
+    graph = scipy.sparse.coo_matrix((np.ones(int(is_similar.sum()), dtype=np.int8),
+                                     (rows[is_similar], representatives[is_similar])), shape=(n_rows, n_rows))
+    n_components, components = scipy.sparse.csgraph.connected_components(graph, directed=False)
+    first_rows = np.full(n_components, n_rows, dtype=np.int64)
+    np.minimum.at(first_rows, components, np.arange(n_rows))
+    return first_rows[components]
+
+
+def find_earlier_near_duplicates(signatures: np.ndarray, earlier_signatures: np.ndarray, bands: int = DEFAULT_BANDS,
+                                 threshold: float = DEFAULT_THRESHOLD, block_size: int = 100000) -> np.ndarray:
+    """
+    Returns for every row of signatures the position of a near duplicate among earlier_signatures, -1 if none.
+    A row is compared with the first earlier row of every LSH bucket it falls in, as in get_candidate_pairs.
+    Earlier signatures are read block by block, so they can be a memory mapped array larger than memory.
+    signatures: (n, num_perm) array from MinHasher
+    earlier_signatures: (m, num_perm) array from a MinHasher with the same settings
+    bands: int LSH bands
+    threshold: float minimum estimated Jaccard similarity of near duplicates
+    block_size: int earlier rows compared at once
+    """
+    matches = np.full(len(signatures), -1, dtype=np.int64)
+    if not len(signatures):
+        return matches
+    band_keys = get_band_keys(signatures, bands=bands)
+    for start in range(0, len(earlier_signatures), block_size):
+        block = np.asarray(earlier_signatures[start:start + block_size])
+        block_keys = get_band_keys(block, bands=bands)
+        for band in range(bands):
+            bucket_keys, first_rows = np.unique(block_keys[:, band], return_index=True)
+            positions = np.minimum(np.searchsorted(bucket_keys, band_keys[:, band]), len(bucket_keys) - 1)
+            rows = np.flatnonzero((bucket_keys[positions] == band_keys[:, band]) & (matches < 0))
+            candidates = first_rows[positions[rows]]
+            is_similar = (signatures[rows] == block[candidates]).mean(axis=1) >= threshold
+            matches[rows[is_similar]] = start + candidates[is_similar]
+    return matches
@@ -0,0 +1,282 @@
+from contextlib import contextmanager
+from typing import Iterable
+import threading
+import time
+import sys
+import os
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# seconds between two samples of the resident set size of a running stage
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def get_peak_rss_mb(who: int = None) -> float:
+    """
+    Returns the peak resident set size in MB of this process, or of its terminated child processes
+    such as process pool workers, since it started. None where the resource module is missing.
+    who: int resource.RUSAGE_SELF by default or resource.RUSAGE_CHILDREN
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return max_rss / 2 ** 20 if sys.platform == "darwin" else max_rss / 2 ** 10
+
+
+def get_rss_mb() -> float:
+    """
+    Returns the current resident set size in MB of this process, None where /proc is missing
+    """
+    try:
+        with open("/proc/self/statm") as statm_file:
+            resident_pages = int(statm_file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+class RssSampler:
+    """
+    Samples the resident set size of this process on a daemon thread while it is entered
+    and keeps the highest value, the peak of the enclosed block rather than of the process lifetime
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_rss_mb = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss_mb = get_rss_mb()
+        if rss_mb is not None and (self.peak_rss_mb is None or rss_mb > self.peak_rss_mb):
+            self.peak_rss_mb = rss_mb
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        if self.peak_rss_mb is not None:
+            self._thread = threading.Thread(target=self._run, name="rss_sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sample()
+
+
+def get_children_cpu_seconds() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def get_output_bytes(paths: Iterable[str]) -> int:
+    """
+    Returns the total size of the files under paths, directories are walked
+    paths: iterable of file or directory paths, missing ones are skipped
+    """
+    output_bytes = 0
+    for path in paths:
+        if os.path.isfile(path):
+            output_bytes += os.path.getsize(path)
+        elif os.path.isdir(path):
+            for root, _, file_names in os.walk(path):
+                output_bytes += sum(os.path.getsize(os.path.join(root, file_name)) for file_name in file_names)
+    return output_bytes
+
+
+# keys of Measurement.to_dict, the others come from extra
+MEASUREMENT_KEYS = ("name", "calls", "wall_seconds", "cpu_seconds", "rows", "rows_per_second", "output_bytes",
+                    "peak_rss_mb", "process_peak_rss_mb", "children_process_peak_rss_mb")
+
+
+class Measurement:
+    """
+    Totals of every call measured under the same name: wall and CPU time, rows processed and bytes written.
+    peak_rss_mb is the highest RSS sampled while a stage, a measurement not nested in another one, ran.
+    process_peak_rss_mb and children_process_peak_rss_mb are the lifetime peaks of the process and its terminated
+    children when a call ended, so every measurement after the largest one reports the same value.
+    Code running inside measure() can set rows, output_bytes, output_file_paths and extra
+    on the measurement it yields. CPU time is that of the whole process and its children,
+    so measurements running at the same time in several threads include each other's CPU time.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rows = None
+        self.output_bytes = 0
+        self.peak_rss_mb = None
+        self.process_peak_rss_mb = None
+        self.children_process_peak_rss_mb = None
+        self.output_file_paths = ()
+        self.extra = {}
+
+    def to_dict(self) -> dict:
+        rows_per_second = self.rows / self.wall_seconds if self.rows is not None and self.wall_seconds > 0 else None
+        return {"name": self.name,
+                "calls": self.calls,
+                "wall_seconds": self.wall_seconds,
+                "cpu_seconds": self.cpu_seconds,
+                "rows": self.rows,
+                "rows_per_second": rows_per_second,
+                "output_bytes": self.output_bytes,
+                "peak_rss_mb": self.peak_rss_mb,
+                "process_peak_rss_mb": self.process_peak_rss_mb,
+                "children_process_peak_rss_mb": self.children_process_peak_rss_mb,
+                **self.extra}
+
+
+class PerformanceRecorder:
+    """
+    Records Measurement of pipeline stages and of the hot spots they call. Names of nested
+    measurements are prefixed by the enclosing one, e.g. data_transformation/porter.
+    It is only active inside session(), which the pipeline opens for one run,
+    outside of it measure() costs nothing and records nothing.
+    """
+
+    def __init__(self):
+        self._measurements = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions = 0
+
+    @property
+    def is_active(self) -> bool:
+        return self._sessions > 0
+
+    def _get_stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def get_scope(self) -> tuple:
+        """
+        Returns the names of the measurements enclosing the calling thread
+        """
+        return tuple(self._get_stack())
+
+    @contextmanager
+    def scope(self, names: Iterable[str]):
+        """
+        Nests the measurements of the calling thread under names, so work handed to a thread pool
+        is reported under the measurement that started it
+        names: scope returned by get_scope in the starting thread
+        """
+        stack = self._get_stack()
+        previous = list(stack)
+        stack[:] = names
+        try:
+            yield
+        finally:
+            stack[:] = previous
+
+    @contextmanager
+    def measure(self, name: str, rows: int = None, output_file_paths: Iterable[str] = ()):
+        """
+        Measures the enclosed block and adds it to the totals of its name
+        name: str
+        rows: int rows processed, can also be set on the yielded measurement
+        output_file_paths: files or directories written, their size is added to output_bytes
+        """
+        if not self.is_active:
+            yield Measurement(name)
+            return
+
+        stack = self._get_stack()
+        full_name = "/".join(stack + [name])
+        call = Measurement(full_name)
+        call.rows = rows
+        call.output_file_paths = output_file_paths
+        with self._lock:
+            # registered on entry so stages are reported before the hot spots they call
+            measurement = self._measurements.setdefault(full_name, Measurement(full_name))
+        # only stages are sampled, hot spots they call many times would pay for a thread each
+        rss_sampler = RssSampler() if not stack else None
+        stack.append(name)
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        start_children_cpu = get_children_cpu_seconds()
+        try:
+            if rss_sampler is not None:
+                rss_sampler.__enter__()
+            yield call
+        finally:
+            if rss_sampler is not None:
+                rss_sampler.__exit__(None, None, None)
+            stack.pop()
+            wall_seconds = time.perf_counter() - start_wall
+            cpu_seconds = time.process_time() - start_cpu + get_children_cpu_seconds() - start_children_cpu
+            output_bytes = call.output_bytes + get_output_bytes(call.output_file_paths)
+            with self._lock:
+                measurement.calls += 1
+                measurement.wall_seconds += wall_seconds
+                measurement.cpu_seconds += cpu_seconds
+                if call.rows is not None:
+                    measurement.rows = (measurement.rows or 0) + call.rows
+                measurement.output_bytes += output_bytes
+                if rss_sampler is not None and rss_sampler.peak_rss_mb is not None:
+                    measurement.peak_rss_mb = max(measurement.peak_rss_mb or 0.0, rss_sampler.peak_rss_mb)
+                measurement.process_peak_rss_mb = get_peak_rss_mb()
+                measurement.children_process_peak_rss_mb = get_peak_rss_mb(resource.RUSAGE_CHILDREN) \
+                    if resource else None
+                measurement.extra.update(call.extra)
+
+    def merge_report(self, report: list):
+        """
+        Adds the measurements of another process, returned by its get_report, to the totals of their names.
+        Their peak RSS is kept as sampled, the lifetime peaks stay the ones of this process.
+        report: list of measurement dicts
+        """
+        if not self.is_active:
+            return
+        with self._lock:
+            for row in report:
+                measurement = self._measurements.setdefault(row["name"], Measurement(row["name"]))
+                measurement.calls += row["calls"]
+                measurement.wall_seconds += row["wall_seconds"]
+                measurement.cpu_seconds += row["cpu_seconds"]
+                if row["rows"] is not None:
+                    measurement.rows = (measurement.rows or 0) + row["rows"]
+                measurement.output_bytes += row["output_bytes"]
+                if row["peak_rss_mb"] is not None:
+                    measurement.peak_rss_mb = max(measurement.peak_rss_mb or 0.0, row["peak_rss_mb"])
+                measurement.extra.update({key: value for key, value in row.items() if key not in MEASUREMENT_KEYS})
+
+    def get_report(self) -> list:
+        """
+        Returns the measurements as dicts, in the order they were first entered
+        """
+        with self._lock:
+            return [measurement.to_dict() for measurement in self._measurements.values()]
+
+    def clear(self):
+        with self._lock:
+            self._measurements.clear()
+
+    @contextmanager
+    def session(self):
+        with self._lock:
+            if self._sessions == 0:
+                self._measurements.clear()
+            self._sessions += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._sessions -= 1
+
+
+performance_recorder = PerformanceRecorder()
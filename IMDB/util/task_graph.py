@@ -0,0 +1,216 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from IMDB.util.performance_recorder import performance_recorder
+from IMDB.util.text_normalizer import get_worker_count
+from contextlib import contextmanager
+from collections import namedtuple
+from typing import Callable, Iterable
+from IMDB.logger import logging
+import time
+
+THREAD_EXECUTOR = "thread"
+PROCESS_EXECUTOR = "process"
+
+Task = namedtuple("Task", ["name", "func", "dependencies"])
+TaskTiming = namedtuple("TaskTiming", ["name", "start_seconds", "end_seconds", "dependencies"])
+
+
+def _run_task(name: str, scope: tuple, measure: bool, func: Callable, args: tuple):
+    """
+    Runs a task in a worker process, wall clock time is used so timings of several processes compare.
+    The measurements of the task are recorded in the worker and returned, the parent merges them
+    under the stage that runs the graph.
+    """
+    # a reused or forked worker holds the measurements of earlier tasks or of the parent
+    performance_recorder.clear()
+    start = time.time()
+    with performance_recorder.session(), performance_recorder.scope(scope), _measure_task(name, measure):
+        result = func(*args)
+    end = time.time()
+    report = performance_recorder.get_report()
+    performance_recorder.clear()
+    return result, start, end, report
+
+
+def _run_scoped_task(name: str, scope: tuple, measure: bool, func: Callable, args: tuple):
+    """
+    Runs a task in a worker thread, its measurements are nested under the stage that runs the graph
+    """
+    start = time.time()
+    with performance_recorder.scope(scope), _measure_task(name, measure):
+        result = func(*args)
+    return result, start, time.time(), None
+
+
+@contextmanager
+def _measure_task(name: str, measure: bool):
+    if not measure:
+        yield
+        return
+    with performance_recorder.measure(name):
+        yield
+
+
+class TaskPool:
+    """
+    Executor type and number of workers of the task graphs that do not set their own.
+    The pipeline configures it for one run, outside of it graphs run their tasks one at a time.
+    """
+
+    def __init__(self):
+        self.executor_type = THREAD_EXECUTOR
+        self.max_workers = 1
+
+    @contextmanager
+    def configure(self, executor_type: str = THREAD_EXECUTOR, max_workers: int = 1):
+        if executor_type not in (THREAD_EXECUTOR, PROCESS_EXECUTOR):
+            raise Exception(f"Task executor [{executor_type}] is neither [{THREAD_EXECUTOR}] "
+                            f"nor [{PROCESS_EXECUTOR}]")
+        previous = self.executor_type, self.max_workers
+        self.executor_type, self.max_workers = executor_type, max_workers
+        try:
+            yield self
+        finally:
+            self.executor_type, self.max_workers = previous
+
+
+task_pool = TaskPool()
+
+
+class TaskGraph:
+    """
+    Small dependency graph of tasks. A task is called with the results of its dependencies,
+    in the order they are listed, once they are all done, so independent tasks run concurrently.
+    With a process executor, tasks, their arguments and results must be picklable and
+    a task cannot change objects of the parent process, it can only return new ones.
+    """
+
+    def __init__(self, name: str, executor_type: str = None, max_workers: int = None, measure_tasks: bool = True):
+        """
+        name: str shown in the timing logs
+        executor_type: str "thread" or "process", task_pool.executor_type by default
+        max_workers: int tasks run at once, task_pool.max_workers by default
+        measure_tasks: bool record every task with performance_recorder, off when tasks measure themselves
+        """
+        self.name = name
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.measure_tasks = measure_tasks
+        self.tasks = {}
+        self.timings = {}
+
+    def add_task(self, name: str, func: Callable, dependencies: Iterable[str] = ()) -> str:
+        """
+        Adds a task called as func(*results of dependencies)
+        name: str unique in the graph
+        func: callable
+        dependencies: names of tasks added before
+        return: str name of the task
+        """
+        dependencies = tuple(dependencies)
+        if name in self.tasks:
+            raise Exception(f"Task [{name}] is already in graph [{self.name}]")
+        for dependency in dependencies:
+            if dependency not in self.tasks:
+                raise Exception(f"Task [{name}] depends on unknown task [{dependency}] of graph [{self.name}]")
+        self.tasks[name] = Task(name=name, func=func, dependencies=dependencies)
+        return name
+
+    def get_task_n_jobs(self, n_jobs: int, n_tasks: int) -> int:
+        """
+        Returns the worker processes each of n_tasks tasks that may run at once can start,
+        so together they start about n_jobs and not n_jobs each
+        n_jobs: int processes of the whole graph, -1 to use every core
+        n_tasks: int tasks of the graph starting processes
+        """
+        max_workers = self.max_workers or task_pool.max_workers
+        concurrent_tasks = max(1, min(max_workers, n_tasks))
+        return max(1, get_worker_count(n_jobs) // concurrent_tasks)
+
+    def run(self) -> dict:
+        """
+        Runs every task and returns their results by name.
+        The first failing task stops the graph, tasks already running are waited for.
+        """
+        executor_type = self.executor_type or task_pool.executor_type
+        max_workers = self.max_workers or task_pool.max_workers
+        self.timings = {}
+        start = time.time()
+        if max_workers <= 1:
+            results = self._run_serially(start)
+        else:
+            results = self._run_concurrently(start, executor_type, max_workers)
+        self.log_timings(wall_seconds=time.time() - start)
+        return results
+
+    def _run_serially(self, start: float) -> dict:
+        results = {}
+        # tasks are added after their dependencies, so insertion order is a topological order
+        for task in self.tasks.values():
+            task_start = time.time()
+            with _measure_task(task.name, self.measure_tasks):
+                results[task.name] = task.func(*[results[dependency] for dependency in task.dependencies])
+            self.timings[task.name] = TaskTiming(task.name, task_start - start, time.time() - start,
+                                                 task.dependencies)
+        return results
+
+    def _run_concurrently(self, start: float, executor_type: str, max_workers: int) -> dict:
+        results = {}
+        pending = dict(self.tasks)
+        running = {}
+        executor_class = ProcessPoolExecutor if executor_type == PROCESS_EXECUTOR else ThreadPoolExecutor
+        scope = performance_recorder.get_scope()
+        with executor_class(max_workers=min(max_workers, len(self.tasks))) as executor:
+            try:
+                while pending or running:
+                    for task in [task for task in pending.values()
+                                 if all(dependency in results for dependency in task.dependencies)]:
+                        args = tuple(results[dependency] for dependency in task.dependencies)
+                        run_task = _run_task if executor_type == PROCESS_EXECUTOR else _run_scoped_task
+                        future = executor.submit(run_task, task.name, scope, self.measure_tasks, task.func, args)
+                        running[future] = pending.pop(task.name)
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = running.pop(future)
+                        results[task.name], task_start, task_end, report = future.result()
+                        if report:
+                            performance_recorder.merge_report(report)
+                        self.timings[task.name] = TaskTiming(task.name, task_start - start, task_end - start,
+                                                             task.dependencies)
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+        return results
+
+    def get_critical_path(self) -> list:
+        """
+        Returns the names of the chain of dependent tasks with the longest total duration,
+        the lower bound of the graph wall time whatever the number of workers
+        """
+        path_seconds, previous = {}, {}
+        for name, task in self.tasks.items():
+            timing = self.timings.get(name)
+            if timing is None:
+                continue
+            longest = max((dependency for dependency in task.dependencies if dependency in path_seconds),
+                          key=path_seconds.get, default=None)
+            previous[name] = longest
+            path_seconds[name] = (timing.end_seconds - timing.start_seconds
+                                  + (path_seconds[longest] if longest is not None else 0.0))
+        name = max(path_seconds, key=path_seconds.get, default=None)
+        path = []
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return path[::-1]
+
+    def log_timings(self, wall_seconds: float):
+        for timing in sorted(self.timings.values(), key=lambda timing: timing.start_seconds):
+            logging.info(f"Task [{self.name}/{timing.name}] started at [{timing.start_seconds:.3f}]s "
+                         f"and took [{timing.end_seconds - timing.start_seconds:.3f}]s")
+        critical_path = self.get_critical_path()
+        critical_seconds = sum(self.timings[name].end_seconds - self.timings[name].start_seconds
+                               for name in critical_path)
+        logging.info(f"Graph [{self.name}] took [{wall_seconds:.3f}]s, critical path "
+                     f"[{' -> '.join(critical_path)}] took [{critical_seconds:.3f}]s")
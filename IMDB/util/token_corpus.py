@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+from IMDB.util.lazy_import import lazy_import
+from typing import Iterable, List
+import itertools
+import math
+import re
+import os
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+scipy = lazy_import("scipy")
+
+# default token_pattern of the sklearn vectorizers, so ids are the tokens CountVectorizer would see
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+TOKEN_IDS_FILE_NAME = "token_ids.npy"
+OFFSETS_FILE_NAME = "offsets.npy"
+TERMS_FILE_NAME = "terms.npy"
+LABELS_FILE_NAME = "labels.npy"
+# part of the cache key of saved corpora, to be increased when tokenization or the file layout change
+TOKEN_CORPUS_VERSION = 1
+# tokens match \w+, so they never contain a newline
+TERM_SEPARATOR = "\n"
+
+
+class TokenCorpus:
+    """
+    Normalized reviews as one uint32 stream of term ids, review i being token_ids[offsets[i]:offsets[i + 1]],
+    and the table of terms the ids index. Saved as .npy files that load memory mapped.
+    """
+
+    def __init__(self, token_ids: np.ndarray, offsets: np.ndarray, terms: np.ndarray, labels: np.ndarray = None):
+        """
+        token_ids: uint32 array of term ids
+        offsets: int64 array of len(reviews) + 1 positions in token_ids
+        terms: object array of term strings
+        labels: optional array of the target of every review
+        """
+        self.token_ids = token_ids
+        self.offsets = offsets
+        self.terms = terms
+        self.labels = labels
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def n_terms(self) -> int:
+        return len(self.terms)
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str], labels: np.ndarray = None) -> TokenCorpus:
+        """
+        Tokenizes normalized review text like the sklearn vectorizers: lower cased, tokens of two or more
+        word characters. Term ids follow the order terms first appear in.
+        texts: iterable of normalized review text
+        labels: optional array of the target of every review
+        """
+        token_lists = [TOKEN_PATTERN.findall(text.lower()) for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        tokens = np.fromiter(itertools.chain.from_iterable(token_lists), dtype=object, count=int(offsets[-1]))
+        codes, terms = pd.factorize(tokens)
+        return cls(token_ids=codes.astype(np.uint32), offsets=offsets, terms=np.asarray(terms, dtype=object),
+                   labels=None if labels is None else np.asarray(labels))
+
+    def get_texts(self) -> List[str]:
+        """
+        Returns the review text rebuilt from the tokens, for featurizers that need strings
+        """
+        tokens = self.terms[self.token_ids]
+        return [" ".join(tokens[start:end]) for start, end in zip(self.offsets[:-1], self.offsets[1:])]
+
+    def save(self, dir_path: str):
+        """
+        Writes the corpus into dir_path through a partial directory moved into place once complete
+        """
+        partial_dir_path = f"{dir_path}.partial"
+        os.makedirs(partial_dir_path, exist_ok=True)
+        np.save(os.path.join(partial_dir_path, TOKEN_IDS_FILE_NAME), self.token_ids)
+        np.save(os.path.join(partial_dir_path, OFFSETS_FILE_NAME), self.offsets)
+        np.save(os.path.join(partial_dir_path, TERMS_FILE_NAME),
+                np.frombuffer(TERM_SEPARATOR.join(self.terms).encode("utf-8"), dtype=np.uint8))
+        if self.labels is not None:
+            np.save(os.path.join(partial_dir_path, LABELS_FILE_NAME), self.labels)
+        os.replace(partial_dir_path, dir_path)
+
+    @classmethod
+    def load(cls, dir_path: str, mmap_mode: str = "r") -> TokenCorpus:
+        terms = np.load(os.path.join(dir_path, TERMS_FILE_NAME))
+        terms = terms.tobytes().decode("utf-8").split(TERM_SEPARATOR) if len(terms) else []
+        labels_file_path = os.path.join(dir_path, LABELS_FILE_NAME)
+        return cls(token_ids=np.load(os.path.join(dir_path, TOKEN_IDS_FILE_NAME), mmap_mode=mmap_mode),
+                   offsets=np.load(os.path.join(dir_path, OFFSETS_FILE_NAME), mmap_mode=mmap_mode),
+                   terms=np.asarray(terms, dtype=object),
+                   labels=np.load(labels_file_path) if os.path.exists(labels_file_path) else None)
+
+    def can_encode_ngrams(self, max_n: int) -> bool:
+        """
+        Checks that every n-gram of up to max_n terms, and its alphabetical rank, fit a 64 bit key
+        """
+        return max_n * math.log2(self.n_terms + 1) < 64
+
+    def get_ngram_keys(self, n: int):
+        """
+        Returns the key of every n-gram inside a review, the ids read as digits in base n_terms,
+        and the review of every n-gram
+        """
+        token_ids = np.asarray(self.token_ids, dtype=np.uint64)
+        n_windows = max(len(token_ids) - n + 1, 0)
+        keys = token_ids[:n_windows].copy()
+        for shift in range(1, n):
+            keys = keys * np.uint64(self.n_terms) + token_ids[shift:shift + n_windows]
+        lengths = np.diff(self.offsets)
+        review_of_token = np.repeat(np.arange(len(self)), lengths)
+        window_reviews = review_of_token[:n_windows]
+        is_inside = np.arange(n_windows) + n <= self.offsets[window_reviews + 1]
+        return keys[is_inside], window_reviews[is_inside]
+
+    def get_ngram_term_ids(self, n: int, keys: np.ndarray) -> list:
+        """
+        Returns the term ids of the n-grams of keys, one array per position
+        """
+        term_ids = []
+        for _ in range(n):
+            term_ids.append((keys % np.uint64(self.n_terms)).astype(np.int64))
+            keys = keys // np.uint64(self.n_terms)
+        return term_ids[::-1]
+
+    def get_ngram_strings(self, n: int, keys: np.ndarray) -> np.ndarray:
+        """
+        Returns the n-grams of keys as strings joined by a space, as sklearn names them
+        """
+        tokens = [self.terms[term_ids] for term_ids in self.get_ngram_term_ids(n, keys)]
+        return np.array([" ".join(ngram) for ngram in zip(*tokens)], dtype=object)
+
+
+def fit_transform_count_vectorizer(vectorizer, corpus: TokenCorpus):
+    """
+    Fits vectorizer, a CountVectorizer with default analyzer settings, on the token corpus and returns
+    the document-term matrix. Vocabulary and matrix equal vectorizer.fit_transform on the normalized text,
+    but n-grams are counted and ranked on integer keys, only the max_features kept are turned into strings.
+    vectorizer: CountVectorizer, its vocabulary_ is set
+    corpus: TokenCorpus, can_encode_ngrams(max_n) must hold
+    """
+    min_n, max_n = vectorizer.ngram_range
+    # alphabetical order of n-grams joined by a space is the order of their term rank tuples,
+    # a shorter n-gram coming before the longer ones it starts, as with a padding rank of 0
+    term_ranks = np.empty(corpus.n_terms, dtype=np.uint64)
+    term_ranks[np.argsort(corpus.terms, kind="stable")] = np.arange(1, corpus.n_terms + 1, dtype=np.uint64)
+    rank_base = np.uint64(corpus.n_terms + 1)
+
+    rows, columns, ngram_sizes, ngram_keys, name_keys, term_counts = [], [], [], [], [], []
+    n_columns = 0
+    for n in range(min_n, max_n + 1):
+        keys, reviews = corpus.get_ngram_keys(n)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.ravel()
+        rows.append(reviews)
+        columns.append(inverse + n_columns)
+        ngram_sizes.append(np.full(len(unique_keys), n, dtype=np.int64))
+        ngram_keys.append(unique_keys)
+        term_counts.append(np.bincount(inverse, minlength=len(unique_keys)))
+
+        name_key = np.zeros(len(unique_keys), dtype=np.uint64)
+        for position, term_ids in enumerate(corpus.get_ngram_term_ids(n, unique_keys)):
+            name_key += term_ranks[term_ids] * rank_base ** np.uint64(max_n - 1 - position)
+        name_keys.append(name_key)
+        n_columns += len(unique_keys)
+    if n_columns == 0:
+        raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+
+    ngram_sizes, ngram_keys = np.concatenate(ngram_sizes), np.concatenate(ngram_keys)
+    by_name = np.argsort(np.concatenate(name_keys))
+    term_counts = np.concatenate(term_counts)[by_name]
+    matrix = scipy.sparse.csr_matrix((np.ones(sum(len(row) for row in rows), dtype=np.int64),
+                                      (np.concatenate(rows), np.concatenate(columns))),
+                                     shape=(len(corpus), n_columns))
+
+    selected = by_name
+    max_features = vectorizer.max_features
+    if max_features is not None and n_columns > max_features:
+        # same selection as CountVectorizer._limit_features, including how its argsort orders ties
+        selected = by_name[np.sort((-term_counts).argsort()[:max_features])]
+
+    names = np.empty(len(selected), dtype=object)
+    for n in range(min_n, max_n + 1):
+        is_size = ngram_sizes[selected] == n
+        names[is_size] = corpus.get_ngram_strings(n, ngram_keys[selected[is_size]])
+
+    vectorizer.vocabulary_ = dict(zip(names.tolist(), range(len(names))))
+    vectorizer.fixed_vocabulary_ = False
+    vectorizer.stop_words_ = set()
+    return matrix[:, selected]
+
+
+def transform_count_vectorizer(vectorizer, corpus: TokenCorpus):
+    """
+    Returns the document-term matrix of the token corpus for a fitted CountVectorizer,
+    equal to vectorizer.transform on the normalized text
+    vectorizer: fitted CountVectorizer
+    corpus: TokenCorpus
+    """
+    min_n, max_n = vectorizer.ngram_range
+    term_ids = dict(zip(corpus.terms.tolist(), range(corpus.n_terms)))
+    # keys of the vocabulary n-grams in the term ids of this corpus, n-grams with a term it lacks cannot occur
+    vocabulary_keys = {n: ([], []) for n in range(min_n, max_n + 1)}
+    for ngram, column in vectorizer.vocabulary_.items():
+        key = 0
+        ngram_terms = ngram.split(" ")
+        for term in ngram_terms:
+            term_id = term_ids.get(term)
+            if term_id is None:
+                break
+            key = key * corpus.n_terms + term_id
+        else:
+            keys, columns = vocabulary_keys[len(ngram_terms)]
+            keys.append(key)
+            columns.append(column)
+
+    rows, columns = [], []
+    for n, (keys_of_n, columns_of_n) in vocabulary_keys.items():
+        if not keys_of_n:
+            continue
+        order = np.argsort(np.array(keys_of_n, dtype=np.uint64))
+        sorted_keys = np.array(keys_of_n, dtype=np.uint64)[order]
+        sorted_columns = np.array(columns_of_n, dtype=np.int64)[order]
+
+        keys, reviews = corpus.get_ngram_keys(n)
+        positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+        is_known = sorted_keys[positions] == keys
+        rows.append(reviews[is_known])
+        columns.append(sorted_columns[positions[is_known]])
+
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    columns = np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64)
+    return scipy.sparse.csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, columns)),
+                                   shape=(len(corpus), len(vectorizer.vocabulary_)))
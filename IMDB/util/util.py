@@ -1,14 +1,28 @@
+from __future__ import annotations
 import yaml
 from IMDB.exception import IMDBException
 import sys
-import numpy as np
-import dill
-import pandas as pd
+import copy
+import json
+import hashlib
+from IMDB.util.lazy_import import lazy_import
 from IMDB.constant import *
-import nltk
-from nltk.stem.porter import PorterStemmer
-from nltk.corpus import stopwords
-import re
+from IMDB.util.artifact_cache import artifact_cache
+from IMDB.util.performance_recorder import performance_recorder
+from IMDB.util.text_normalizer import TextNormalizer, DEFAULT_CHUNK_SIZE, load_stopword_list
+
+# heavy dependencies are loaded on first use so importing IMDB stays cheap for CLIs and workers
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+scipy = lazy_import("scipy")
+dill = lazy_import("dill")
+joblib = lazy_import("joblib")
+
+# featurizer attributes holding a term to column dict, and attributes not needed to transform
+VOCABULARY_ATTRIBUTES = ("vocabulary", "vocabulary_")
+INTROSPECTION_ATTRIBUTES = ("stop_words_",)
+# tokens never contain a newline, the analyzer splits on whitespace
+TERM_SEPARATOR = "\n"
 
 
 def read_yaml_file(file_path: str) -> dict:
@@ -17,36 +31,185 @@ def read_yaml_file(file_path: str) -> dict:
     file_path: str
     """
     try:
-        with open(file_path, 'rb') as yaml_file:
-            return yaml.safe_load(yaml_file)
+        def load_yaml_file():
+            with open(file_path, 'rb') as yaml_file:
+                return yaml.safe_load(yaml_file)
+
+        return copy.deepcopy(artifact_cache.get_or_load(file_path, load_yaml_file))
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def write_yaml_file(file_path: str, data: dict):
+    """
+    Writes a dictionary to a YAML file.
+    file_path: str
+    data: dict
+    """
+    try:
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok=True)
+        with open(file_path, 'w') as yaml_file:
+            yaml.safe_dump(data, yaml_file)
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def get_file_hash(file_path: str, block_size: int = 2 ** 20) -> str:
+    """
+    Returns the sha256 hex digest of the content of a file, read block by block
+    file_path: str
+    """
+    try:
+        def hash_file():
+            file_hash = hashlib.sha256()
+            with open(file_path, 'rb') as file_obj:
+                for block in iter(lambda: file_obj.read(block_size), b""):
+                    file_hash.update(block)
+            return file_hash.hexdigest()
+
+        return artifact_cache.get_or_load(file_path, hash_file, "sha256")
     except Exception as e:
         raise IMDBException(e, sys) from e
 
 
-def save_numpy_array_data(file_path: str, array: np.array):
+def get_fingerprint(*parts) -> str:
+    """
+    Returns a sha256 hex digest identifying parts, which may be nested dicts, lists and scalars
     """
-    Save numpy array data to file
+    try:
+        serialized_parts = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(serialized_parts.encode("utf-8")).hexdigest()
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def save_numpy_array_data(file_path: str, array: np.array, compress: bool = False):
+    """
+    Save numpy array data to file, as .npy so it can be memory mapped or,
+    with compress, as a compressed .npz holding the array under "array"
     file_path: str location of file to save
     array: np.array data to save
+    compress: bool
     """
     try:
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
         with open(file_path, 'wb') as file_obj:
-            np.save(file_obj, array)
+            if compress:
+                np.savez_compressed(file_obj, array=array)
+            else:
+                np.save(file_obj, array)
     except Exception as e:
         raise IMDBException(e, sys) from e
 
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: str = None) -> np.array:
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: str numpy mmap mode such as "r", ignored for compressed files
     return: np.array data loaded
     """
     try:
-        with open(file_path, 'rb') as file_obj:
-            return np.load(file_obj)
+        array = np.load(file_path, mmap_mode=mmap_mode)
+        if isinstance(array, np.lib.npyio.NpzFile):
+            with array:
+                return array["array"]
+        return array
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def get_target_file_path(file_path: str) -> str:
+    """
+    Returns the location of the target vector stored next to a sparse feature matrix
+    file_path: str location of the sparse feature matrix
+    """
+    root, ext = os.path.splitext(file_path)
+    return f"{root}_target{ext}"
+
+
+def save_sparse_array_data(file_path: str, array: scipy.sparse.spmatrix, target: np.array):
+    """
+    Save sparse feature matrix and its target vector to file.
+    The target is stored as a one column int8 matrix at get_target_file_path(file_path)
+    file_path: str location of file to save
+    array: scipy.sparse matrix data to save
+    target: np.array target vector to save
+    """
+    try:
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok=True)
+        target = np.asarray(target, dtype=np.int8).reshape(-1, 1)
+        scipy.sparse.save_npz(file_path, scipy.sparse.csr_matrix(array))
+        scipy.sparse.save_npz(get_target_file_path(file_path), scipy.sparse.csr_matrix(target))
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def load_sparse_array_data(file_path: str):
+    """
+    load sparse feature matrix and its target vector from file
+    file_path: str location of file to load
+    return: tuple of (scipy.sparse.csr_matrix, np.array) data loaded
+    """
+    try:
+        array = scipy.sparse.load_npz(file_path).tocsr()
+        target = scipy.sparse.load_npz(get_target_file_path(file_path)).toarray().ravel()
+        return array, target
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def save_sparse_shard_manifest(file_path: str, shards: list, n_features: int):
+    """
+    Writes the manifest of sparse shards saved with save_sparse_array_data.
+    Shard paths are stored relative to the manifest directory.
+    file_path: str location of the manifest
+    shards: list of dict with the file_path, n_rows and nnz of every shard, in row order
+    n_features: int number of columns of every shard
+    """
+    try:
+        manifest_dir = os.path.dirname(file_path)
+        shards = [{"file_path": os.path.relpath(shard["file_path"], manifest_dir),
+                   "n_rows": int(shard["n_rows"]),
+                   "nnz": int(shard["nnz"])} for shard in shards]
+        manifest = {"n_rows": sum(shard["n_rows"] for shard in shards),
+                    "n_features": int(n_features),
+                    "shards": shards}
+        write_yaml_file(file_path=file_path, data=manifest)
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def iter_sparse_shards(file_path: str):
+    """
+    Yields (scipy.sparse.csr_matrix, np.array) of every shard listed in a manifest, in row order
+    file_path: str location of the manifest
+    """
+    try:
+        manifest_dir = os.path.dirname(file_path)
+        manifest = read_yaml_file(file_path=file_path)
+        for shard in manifest["shards"]:
+            yield load_sparse_array_data(os.path.join(manifest_dir, shard["file_path"]))
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def load_sparse_shards(file_path: str):
+    """
+    load every shard listed in a manifest as a single sparse matrix and target vector
+    file_path: str location of the manifest
+    return: tuple of (scipy.sparse.csr_matrix, np.array) data loaded
+    """
+    try:
+        shards = list(iter_sparse_shards(file_path))
+        if not shards:
+            n_features = read_yaml_file(file_path=file_path)["n_features"]
+            return scipy.sparse.csr_matrix((0, n_features), dtype=np.int64), np.zeros(0, dtype=np.int64)
+        arrays, targets = zip(*shards)
+        return scipy.sparse.vstack(arrays, format="csr"), np.concatenate(targets)
     except Exception as e:
         raise IMDBException(e, sys) from e
 
@@ -76,41 +239,362 @@ def load_object(file_path: str):
         raise IMDBException(e, sys) from e
 
 
-def load_data(file_path: str, schema_file_path: str) -> pd.DataFrame:
+class CompactVocabulary:
+    """
+    Vocabulary of a fitted featurizer stored as one utf-8 buffer of its terms, sorted by column index.
+    Pickles as a single numpy array instead of a dict of python strings.
+    vocabulary: dict term to column index
+    """
+
+    def __init__(self, vocabulary: dict):
+        terms = sorted(vocabulary, key=vocabulary.get)
+        self.n_terms = len(terms)
+        self.buffer = np.frombuffer(TERM_SEPARATOR.join(terms).encode("utf-8"), dtype=np.uint8)
+
+    def to_dict(self) -> dict:
+        if self.n_terms == 0:
+            return {}
+        terms = self.buffer.tobytes().decode("utf-8").split(TERM_SEPARATOR)
+        return dict(zip(terms, range(self.n_terms)))
+
+
+def save_fitted_object(file_path: str, obj, compress: int = 0):
+    """
+    Saves a fitted featurizer or model with joblib. Vocabulary dicts are stored as CompactVocabulary,
+    attributes only needed for introspection such as stop_words_ are dropped and, unless compressed,
+    numpy arrays are written so load_fitted_object can memory map them.
+    file_path: str
+    obj: fitted featurizer or model
+    compress: int joblib compression level from 0 to 9, 0 keeps arrays memory mappable
+    """
     try:
-        dataset_schema = read_yaml_file(schema_file_path)
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok=True)
+        obj = copy.copy(obj)
+        for attribute in INTROSPECTION_ATTRIBUTES:
+            obj.__dict__.pop(attribute, None)
+        for attribute in VOCABULARY_ATTRIBUTES:
+            if isinstance(getattr(obj, attribute, None), dict):
+                setattr(obj, attribute, CompactVocabulary(getattr(obj, attribute)))
+        joblib.dump(obj, file_path, compress=compress)
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def load_fitted_object(file_path: str, mmap_mode: str = "r"):
+    """
+    Loads an object saved with save_fitted_object, or with save_object.
+    Arrays of uncompressed files are memory mapped so worker processes share their pages.
+    file_path: str
+    mmap_mode: str numpy mmap mode, None reads arrays into memory
+    """
+    try:
+        with open(file_path, "rb") as file_obj:
+            # uncompressed pickles start with the protocol opcode, compressed files with their codec magic
+            is_compressed = file_obj.read(1) != b"\x80"
+        obj = joblib.load(file_path, mmap_mode=None if is_compressed else mmap_mode)
+        for attribute in VOCABULARY_ATTRIBUTES:
+            if isinstance(getattr(obj, attribute, None), CompactVocabulary):
+                setattr(obj, attribute, getattr(obj, attribute).to_dict())
+        return obj
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def get_file_path_with_format(file_path: str, file_format: str) -> str:
+    """
+    Returns file_path with the extension of file_format
+    file_path: str
+    file_format: str one of FILE_FORMAT_EXTENSIONS
+    """
+    if file_format not in FILE_FORMAT_EXTENSIONS:
+        raise Exception(f"File format: [{file_format}] is not one of {list(FILE_FORMAT_EXTENSIONS.keys())}")
+    root, _ = os.path.splitext(file_path)
+    return f"{root}{FILE_FORMAT_EXTENSIONS[file_format]}"
+
+
+def read_data(file_path: str, file_format: str = CSV_FILE_FORMAT, dtype: dict = None) -> pd.DataFrame:
+    """
+    Reads an ingested split stored as csv or parquet. Parquet files are memory mapped.
+    Inside an artifact_cache session the frame is parsed once and later calls get a shallow copy.
+    file_path: str location of file to read
+    file_format: str one of FILE_FORMAT_EXTENSIONS
+    dtype: dict optional dtype of columns, csv columns are parsed straight into it
+    """
+    try:
+        def load_dataframe():
+            with performance_recorder.measure("read_data") as measurement:
+                if file_format == PARQUET_FILE_FORMAT:
+                    dataframe = pd.read_parquet(file_path, memory_map=True)
+                    if dtype:
+                        dataframe = dataframe.astype(get_present_dtypes(dataframe, dtype))
+                elif file_format == CSV_FILE_FORMAT:
+                    dataframe = pd.read_csv(file_path, dtype=dtype)
+                else:
+                    raise Exception(f"File format: [{file_format}] is not one of "
+                                    f"{list(FILE_FORMAT_EXTENSIONS.keys())}")
+                measurement.rows = len(dataframe)
+                return dataframe
+
+        dtype_key = repr(sorted((column, repr(column_dtype)) for column, column_dtype in (dtype or {}).items()))
+        return artifact_cache.get_or_load(file_path, load_dataframe, file_format, dtype_key).copy(deep=False)
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
 
-        schema = dataset_schema["columns"]
+def read_data_columns(file_path: str, file_format: str = CSV_FILE_FORMAT) -> list:
+    """
+    Returns the column names of a csv or parquet file without reading any row,
+    from the csv header line or the parquet footer
+    file_path: str
+    file_format: str one of FILE_FORMAT_EXTENSIONS
+    """
+    try:
+        if file_format == PARQUET_FILE_FORMAT:
+            import pyarrow.parquet as pq
 
-        dataframe = pd.read_csv(file_path)
-        dataframe.columns = dataframe.columns.str.replace(" ", "")
+            return list(pq.read_schema(file_path).names)
+        if file_format == CSV_FILE_FORMAT:
+            return list(pd.read_csv(file_path, nrows=0).columns)
+        raise Exception(f"File format: [{file_format}] is not one of {list(FILE_FORMAT_EXTENSIONS.keys())}")
+    except Exception as e:
+        raise IMDBException(e, sys) from e
 
-        error_message = ""
 
-        for column in dataframe.columns.str.rstrip():
-            if column in list(schema.keys()):
-                dataframe[column].astype(schema[column])
+def save_data(file_path: str, dataframe: pd.DataFrame, file_format: str = CSV_FILE_FORMAT, dtypes: dict = None):
+    """
+    Save dataframe to file as csv or parquet
+    file_path: str location of file to save
+    dataframe: pd.DataFrame data to save
+    file_format: str one of FILE_FORMAT_EXTENSIONS
+    dtypes: optional dict of pandas dtype by column the parquet schema is taken from
+    """
+    try:
+        with DataChunkWriter(file_path=file_path, file_format=file_format, dtypes=dtypes) as writer:
+            writer.write(dataframe)
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def get_arrow_schema(dataframe: pd.DataFrame, dtypes: dict = None):
+    """
+    Returns the pyarrow schema of the columns of dataframe, the ones in dtypes typed from them
+    instead of from the values, so an empty dataframe gets the same schema as a full one
+    dataframe: pd.DataFrame
+    dtypes: dict of pandas dtype by column, as returned by get_dataset_dtypes
+    """
+    import pyarrow as pa
+
+    dtypes = dtypes or {}
+    typed_dataframe = dataframe.iloc[:0].astype(get_present_dtypes(dataframe, dtypes))
+    schema = pa.Schema.from_pandas(typed_dataframe, preserve_index=False)
+    for column in dtypes:
+        if column in dataframe.columns and isinstance(typed_dataframe[column].dtype, pd.CategoricalDtype):
+            # categories read from the data differ between chunks, only the type of their values is fixed
+            schema = schema.set(schema.get_field_index(column),
+                                pa.field(column, pa.dictionary(pa.int32(), pa.large_string())))
+    return schema
+
+
+class DataChunkWriter:
+    """
+    Writes dataframes one after the other into a single csv or parquet file.
+    file_path: str location of file to write
+    file_format: str one of FILE_FORMAT_EXTENSIONS
+    dtypes: dict of pandas dtype by column the parquet schema is taken from, as returned by get_dataset_dtypes,
+        without it the schema is inferred from the first dataframe written, which fails later if it is empty
+    """
+
+    def __init__(self, file_path: str, file_format: str = CSV_FILE_FORMAT, dtypes: dict = None):
+        if file_format not in FILE_FORMAT_EXTENSIONS:
+            raise Exception(f"File format: [{file_format}] is not one of {list(FILE_FORMAT_EXTENSIONS.keys())}")
+        self.file_path = file_path
+        self.file_format = file_format
+        self.dtypes = dtypes
+        self.rows_written = 0
+        self._parquet_writer = None
+        self._schema = None
+        self._csv_started = False
+
+    def write(self, dataframe: pd.DataFrame):
+        dir_path = os.path.dirname(self.file_path)
+        os.makedirs(dir_path, exist_ok=True)
+        with performance_recorder.measure("write_data", rows=len(dataframe)) as measurement:
+            size_before = os.path.getsize(self.file_path) if self.rows_written else 0
+            if self.file_format == PARQUET_FILE_FORMAT:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                if self._schema is None:
+                    self._schema = get_arrow_schema(dataframe, self.dtypes)
+                table = pa.Table.from_pandas(dataframe, schema=self._schema, preserve_index=False)
+                if self._parquet_writer is None:
+                    self._parquet_writer = pq.ParquetWriter(self.file_path, self._schema)
+                self._parquet_writer.write_table(table)
             else:
-                error_message = f"{error_message} \nColumn: [{column}] is not in the schema."
-        if len(error_message) > 0:
-            raise Exception(error_message)
-        return dataframe
+                dataframe.to_csv(self.file_path, mode="a" if self._csv_started else "w",
+                                 header=not self._csv_started, index=False)
+                self._csv_started = True
+            measurement.output_bytes = os.path.getsize(self.file_path) - size_before
+        self.rows_written += len(dataframe)
 
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def get_dataset_dtypes(dataset_schema: dict, use_domain_value: bool = True) -> dict:
+    """
+    Returns the pandas dtype of every column of the schema. A category column listed in domain_value
+    has those values as categories, in order, so values outside of them load as missing.
+    Without use_domain_value its categories are the values read, as needed for raw data not yet validated.
+    dataset_schema: dict content of schema.yaml
+    use_domain_value: bool
+    """
+    domain_value = dataset_schema.get(DATASET_SCHEMA_DOMAIN_VALUE_KEY) or {}
+    dtypes = {}
+    for column, dtype in dataset_schema["columns"].items():
+        if dtype == CATEGORY_DTYPE and use_domain_value and column in domain_value:
+            dtype = pd.CategoricalDtype(categories=domain_value[column])
+        dtypes[column] = dtype
+    return dtypes
+
+
+def get_present_dtypes(dataframe: pd.DataFrame, dtypes: dict) -> dict:
+    """
+    Returns the dtypes of the columns of dataframe that do not already have them
+    """
+    return {column: dtype for column, dtype in dtypes.items()
+            if column in dataframe.columns and dataframe[column].dtype != dtype}
+
+
+def get_label_codes(values: pd.Series, labels) -> np.ndarray:
+    """
+    Returns the position of every value in labels, e.g. 0/1 for a binary target.
+    A categorical column is recoded once per category instead of once per row.
+    values: pd.Series
+    labels: sequence of the values in label order
+    """
+    labels = list(labels)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.set_categories(labels).cat.codes.to_numpy()
+    else:
+        # values outside of labels get -1, casting them to a categorical of labels is deprecated in pandas,
+        # codes keep the small integer dtype of categorical codes
+        codes = pd.Index(labels).get_indexer(values).astype(np.min_scalar_type(-len(labels)))
+    if (codes < 0).any():
+        raise Exception(f"Column [{values.name}] has [{int((codes < 0).sum())}] values that are not one of {labels}")
+    return codes
+
+
+def apply_dataset_schema(dataframe: pd.DataFrame, dataset_schema: dict) -> pd.DataFrame:
+    """
+    Normalizes column names, checks every column is declared in the schema and gives it its schema dtype
+    dataframe: pd.DataFrame
+    dataset_schema: dict content of schema.yaml
+    """
+    schema = get_dataset_dtypes(dataset_schema)
+
+    dataframe.columns = dataframe.columns.str.replace(" ", "")
+
+    error_message = ""
+
+    for column in dataframe.columns.str.rstrip():
+        if column in list(schema.keys()):
+            if dataframe[column].dtype != schema[column]:
+                dataframe[column] = dataframe[column].astype(schema[column])
+        else:
+            error_message = f"{error_message} \nColumn: [{column}] is not in the schema."
+    if len(error_message) > 0:
+        raise Exception(error_message)
+    return dataframe
+
+
+def load_data(file_path: str, schema_file_path: str, file_format: str = CSV_FILE_FORMAT) -> pd.DataFrame:
+    try:
+        dataset_schema = read_yaml_file(schema_file_path)
+
+        dataframe = read_data(file_path=file_path, file_format=file_format,
+                              dtype=get_dataset_dtypes(dataset_schema))
+        return apply_dataset_schema(dataframe=dataframe, dataset_schema=dataset_schema)
+
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def iter_data_chunks(file_path: str, file_format: str = CSV_FILE_FORMAT, chunk_size: int = 10000,
+                     dtype: dict = None):
+    """
+    Yields an ingested split as dataframes of at most chunk_size rows
+    file_path: str location of file to read
+    file_format: str one of FILE_FORMAT_EXTENSIONS
+    chunk_size: int
+    dtype: dict optional dtype of columns, csv columns are parsed straight into it
+    """
+    try:
+        if file_format == PARQUET_FILE_FORMAT:
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(file_path, memory_map=True)
+            for record_batch in parquet_file.iter_batches(batch_size=chunk_size):
+                dataframe = record_batch.to_pandas()
+                yield dataframe.astype(get_present_dtypes(dataframe, dtype)) if dtype else dataframe
+        elif file_format == CSV_FILE_FORMAT:
+            yield from pd.read_csv(file_path, chunksize=chunk_size, dtype=dtype)
+        else:
+            raise Exception(f"File format: [{file_format}] is not one of {list(FILE_FORMAT_EXTENSIONS.keys())}")
     except Exception as e:
         raise IMDBException(e, sys) from e
 
 
-def porter(data):
-    ps = PorterStemmer()
-    nltk.download('stopwords')
-    stopword_list = stopwords.words('english')
-    corpus = []
-    for i in range(0, len(data)):
-        review = re.sub('[^a-zA-Z0-9]', ' ', data['review'][i])
-        review = review.lower()
-        review = review.split()
-        review = [ps.stem(word) for word in review if not word in stopword_list]
-        review = ' '.join(review)
-        corpus.append(review)
+def load_data_in_chunks(file_path: str, schema_file_path: str, file_format: str = CSV_FILE_FORMAT,
+                        chunk_size: int = 10000):
+    """
+    Same as load_data, one chunk of at most chunk_size rows at a time
+    """
+    try:
+        dataset_schema = read_yaml_file(schema_file_path)
+        for dataframe in iter_data_chunks(file_path=file_path, file_format=file_format, chunk_size=chunk_size,
+                                          dtype=get_dataset_dtypes(dataset_schema)):
+            yield apply_dataset_schema(dataframe=dataframe, dataset_schema=dataset_schema)
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+
+
+def get_hash_split_mask(dataframe: pd.DataFrame, test_size: float, random_state: int) -> np.array:
+    """
+    Assigns rows to the test split by hashing their content with a seeded key.
+    A row always lands in the same split whatever chunk it is read in, and about
+    test_size of the rows are selected.
+    dataframe: pd.DataFrame rows to assign
+    test_size: float fraction of rows to put in the test split
+    random_state: int seed of the hash
+    return: np.array boolean mask, True for rows of the test split
+    """
+    hash_key = f"{random_state:016d}"[-16:]
+    hashes = pd.util.hash_pandas_object(dataframe, index=False, hash_key=hash_key).to_numpy()
+    return (hashes % HASH_SPLIT_BUCKETS) < int(round(test_size * HASH_SPLIT_BUCKETS))
+
 
-    return corpus
+def porter(data, n_jobs: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE, nltk_data_dir: str = None):
+    """
+    Returns the normalized review text of every row of data, in row order
+    data: pd.DataFrame with a review column
+    n_jobs: int number of worker processes, -1 to use every core
+    chunk_size: int number of reviews sent to a worker at once
+    nltk_data_dir: str optional local directory holding the NLTK stopwords corpus
+    """
+    try:
+        stopword_list = load_stopword_list(language='english', nltk_data_dir=nltk_data_dir)
+    except Exception as e:
+        raise IMDBException(e, sys) from e
+    normalizer = TextNormalizer(stopword_list=stopword_list)
+    with performance_recorder.measure("porter", rows=len(data)):
+        return normalizer.normalize_many(data['review'], n_jobs=n_jobs, chunk_size=chunk_size)
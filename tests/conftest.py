@@ -0,0 +1,95 @@
+from IMDB.entity.config_entity import DataIngestionConfig, DataTransformationConfig
+from IMDB.util.util import save_fitted_object
+import pytest
+import os
+
+ENGLISH_STOPWORDS = ["i", "me", "my", "the", "a", "an", "and", "is", "was", "this", "it", "of",
+                     "to", "in", "not", "but", "with", "for"]
+
+
+@pytest.fixture
+def data_ingestion_config(tmp_path) -> DataIngestionConfig:
+    """
+    DataIngestionConfig of the defaults of config.yaml, every directory under tmp_path and a single job
+    """
+    return DataIngestionConfig(author_username="lakshmi25npathi",
+                               raw_data_dir=os.path.join(tmp_path, "raw_data"),
+                               ingested_train_dir=os.path.join(tmp_path, "ingested_data", "train"),
+                               kaggel_dataset_name="imdb-dataset-of-50k-movie-reviews",
+                               ingested_test_dir=os.path.join(tmp_path, "ingested_data", "test"),
+                               test_size=0.2,
+                               random_state=42,
+                               streaming=False,
+                               chunk_size=10000,
+                               file_format="parquet",
+                               dataset_version=None,
+                               download_cache_dir=os.path.join(tmp_path, "download_cache"),
+                               mirror=None,
+                               deduplicate=True,
+                               drop_near_duplicates=False,
+                               near_duplicate_threshold=0.8,
+                               minhash_num_perm=64,
+                               minhash_bands=16,
+                               shingle_size=3,
+                               n_jobs=1,
+                               schema_file_path=None,
+                               incremental=False,
+                               incremental_dir=os.path.join(tmp_path, "incremental"))
+
+
+@pytest.fixture
+def nltk_data_dir(tmp_path) -> str:
+    """
+    Local NLTK data directory holding a small english stopwords corpus, so no test needs the network
+    """
+    stopwords_dir = os.path.join(tmp_path, "nltk_data", "corpora", "stopwords")
+    os.makedirs(stopwords_dir)
+    with open(os.path.join(stopwords_dir, "english"), "w") as stopword_file:
+        stopword_file.write("\n".join(ENGLISH_STOPWORDS) + "\n")
+    return os.path.join(tmp_path, "nltk_data")
+
+
+@pytest.fixture
+def data_transformation_config(tmp_path, nltk_data_dir) -> DataTransformationConfig:
+    """
+    DataTransformationConfig of the defaults of config.yaml, every directory under tmp_path and a single job
+    """
+    return DataTransformationConfig(transformed_train_dir=os.path.join(tmp_path, "transformed_data", "train"),
+                                    transformed_test_dir=os.path.join(tmp_path, "transformed_data", "test"),
+                                    preprocessed_object_file_path=os.path.join(tmp_path, "preprocessed",
+                                                                               "preprocessed.pkl"),
+                                    sparse_output=True,
+                                    n_jobs=1,
+                                    chunk_size=2000,
+                                    nltk_data_dir=nltk_data_dir,
+                                    featurizer="count",
+                                    max_features=25000,
+                                    ngram_range=[1, 2],
+                                    n_features=2 ** 20,
+                                    out_of_core=False,
+                                    shard_size=50000,
+                                    max_candidate_terms=2000000,
+                                    compress=0,
+                                    token_corpus_dir=os.path.join(tmp_path, "token_corpus"),
+                                    incremental_dir=os.path.join(tmp_path, "incremental"),
+                                    max_vocabulary_drift=0.1,
+                                    feature_selection=None,
+                                    selected_features=5000)
+
+
+@pytest.fixture
+def trained_file_paths(tmp_path) -> tuple:
+    """
+    Preprocessing object and model files of a vectorizer and model fitted on a few normalized reviews
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    corpus = ["great film love", "wonder act great", "bad bore plot", "terribl wast time bad"]
+    vectorizer = CountVectorizer().fit(corpus)
+    model = LogisticRegression().fit(vectorizer.transform(corpus), [1, 1, 0, 0])
+    preprocessed_object_file_path = os.path.join(tmp_path, "preprocessed", "preprocessed.pkl")
+    trained_model_file_path = os.path.join(tmp_path, "trained_model", "model.pkl")
+    save_fitted_object(preprocessed_object_file_path, vectorizer)
+    save_fitted_object(trained_model_file_path, model)
+    return preprocessed_object_file_path, trained_model_file_path
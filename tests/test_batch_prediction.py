@@ -0,0 +1,34 @@
+from IMDB.component.batch_prediction import BatchPrediction
+from IMDB.entity.config_entity import BatchPredictionConfig
+from IMDB.util.imdb_predictor import IMDBPredictor
+import pandas as pd
+import numpy as np
+import pytest
+import os
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_predictions_are_written_in_input_order(tmp_path, trained_file_paths, nltk_data_dir, n_jobs):
+    preprocessed_object_file_path, trained_model_file_path = trained_file_paths
+    rng = np.random.RandomState(0)
+    words = ["great", "film", "love", "bad", "boring", "plot", "wasted", "time", "wonderful", "acting"]
+    reviews = pd.DataFrame({"id": np.arange(150),
+                            "review": [" ".join(rng.choice(words, size=rng.randint(1, 8))) for _ in range(150)]})
+    input_file_path = os.path.join(tmp_path, "reviews.csv")
+    reviews.to_csv(input_file_path, index=False)
+    batch_prediction_config = BatchPredictionConfig(input_file_path=input_file_path, input_file_format="csv",
+                                                    prediction_file_path=os.path.join(tmp_path, "predictions",
+                                                                                      "reviews.parquet"),
+                                                    prediction_file_format="parquet",
+                                                    preprocessed_object_file_path=preprocessed_object_file_path,
+                                                    trained_model_file_path=trained_model_file_path,
+                                                    batch_size=7, n_jobs=n_jobs, nltk_data_dir=nltk_data_dir)
+
+    batch_prediction_artifact = BatchPrediction(batch_prediction_config).initiate_batch_prediction()
+    assert batch_prediction_artifact.n_reviews == len(reviews)
+    predictions = pd.read_parquet(batch_prediction_artifact.prediction_file_path)
+    np.testing.assert_array_equal(predictions["id"], reviews["id"])
+    expected = IMDBPredictor(preprocessed_object_file_path=preprocessed_object_file_path,
+                             trained_model_file_path=trained_model_file_path,
+                             nltk_data_dir=nltk_data_dir).predict_sentiment(reviews["review"])
+    np.testing.assert_array_equal(predictions["predicted_sentiment"], expected)
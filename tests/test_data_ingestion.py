@@ -0,0 +1,208 @@
+from IMDB.component.data_ingestion import DataIngestion
+from IMDB.exception import IMDBException
+from IMDB.util.util import read_yaml_file
+from IMDB.constant import INCREMENTAL_STATE_FILE_NAME
+import pandas as pd
+import numpy as np
+import zipfile
+import pytest
+import os
+
+IMDB_FILE_NAME = "IMDB Dataset.csv"
+IMDB_FILE_CONTENT = 'review,sentiment\n"A fine film, well acted.",positive\n"Dull and far too long.",negative\n'
+
+
+class FakeKaggleApi:
+    """
+    Local stand-in of KaggleApi, writes a small dataset and counts the downloads
+    """
+
+    def __init__(self, content: str = IMDB_FILE_CONTENT):
+        self.content = content
+        self.downloads = []
+
+    def dataset_download_files(self, dataset: str, path: str, unzip: bool = False):
+        self.downloads.append(dataset)
+        with open(os.path.join(path, IMDB_FILE_NAME), "w") as imdb_file:
+            imdb_file.write(self.content)
+
+
+class UnreachableKaggleApi:
+
+    def dataset_download_files(self, dataset: str, path: str, unzip: bool = False):
+        raise AssertionError("Kaggle must not be called")
+
+
+def read_raw_file(data_ingestion_config) -> str:
+    with open(os.path.join(data_ingestion_config.raw_data_dir, IMDB_FILE_NAME)) as imdb_file:
+        return imdb_file.read()
+
+
+def test_download_cache_hit_does_not_download_again(data_ingestion_config, tmp_path):
+    kaggle_api = FakeKaggleApi()
+    DataIngestion(data_ingestion_config, kaggle_api=kaggle_api).download_imdb_data()
+    assert kaggle_api.downloads == ["lakshmi25npathi/imdb-dataset-of-50k-movie-reviews"]
+
+    # another run with its own raw data directory shares the cache
+    next_config = data_ingestion_config._replace(raw_data_dir=os.path.join(tmp_path, "next_raw_data"))
+    DataIngestion(next_config, kaggle_api=kaggle_api).download_imdb_data()
+    assert len(kaggle_api.downloads) == 1
+    assert read_raw_file(next_config) == IMDB_FILE_CONTENT
+
+
+def test_rerun_into_the_same_raw_data_dir(data_ingestion_config):
+    kaggle_api = FakeKaggleApi()
+    DataIngestion(data_ingestion_config, kaggle_api=kaggle_api).download_imdb_data()
+    DataIngestion(data_ingestion_config, kaggle_api=kaggle_api).download_imdb_data()
+    assert len(kaggle_api.downloads) == 1
+    assert read_raw_file(data_ingestion_config) == IMDB_FILE_CONTENT
+
+
+def test_dataset_version_is_part_of_the_download(data_ingestion_config):
+    kaggle_api = FakeKaggleApi()
+    data_ingestion_config = data_ingestion_config._replace(dataset_version=2)
+    data_ingestion = DataIngestion(data_ingestion_config, kaggle_api=kaggle_api)
+    data_ingestion.download_imdb_data()
+    assert kaggle_api.downloads == ["lakshmi25npathi/imdb-dataset-of-50k-movie-reviews/2"]
+    assert data_ingestion.get_download_cache_dir().endswith("version_2")
+
+
+def test_checksum_mismatch_downloads_again(data_ingestion_config, tmp_path):
+    kaggle_api = FakeKaggleApi()
+    data_ingestion = DataIngestion(data_ingestion_config, kaggle_api=kaggle_api)
+    data_ingestion.download_imdb_data()
+    cache_dir = data_ingestion.get_download_cache_dir()
+    assert data_ingestion.is_download_cache_valid(cache_dir)
+
+    # the raw file is a hard link of the cached one, so both are replaced rather than written to
+    cached_file_path = os.path.join(cache_dir, IMDB_FILE_NAME)
+    os.remove(cached_file_path)
+    with open(cached_file_path, "w") as cached_file:
+        cached_file.write("review,sentiment\ntruncated")
+    assert not data_ingestion.is_download_cache_valid(cache_dir)
+
+    next_config = data_ingestion_config._replace(raw_data_dir=os.path.join(tmp_path, "next_raw_data"))
+    DataIngestion(next_config, kaggle_api=kaggle_api).download_imdb_data()
+    assert len(kaggle_api.downloads) == 2
+    assert read_raw_file(next_config) == IMDB_FILE_CONTENT
+
+
+@pytest.mark.parametrize("mirror_kind", ["directory", "zip", "file_url"])
+def test_mirror_is_ingested_without_kaggle(data_ingestion_config, tmp_path, mirror_kind):
+    mirror_dir = os.path.join(tmp_path, "mirror")
+    os.makedirs(mirror_dir)
+    with open(os.path.join(mirror_dir, IMDB_FILE_NAME), "w") as imdb_file:
+        imdb_file.write(IMDB_FILE_CONTENT)
+    mirror = mirror_dir
+    if mirror_kind == "zip":
+        mirror = os.path.join(tmp_path, "mirror.zip")
+        with zipfile.ZipFile(mirror, "w") as zip_file:
+            zip_file.write(os.path.join(mirror_dir, IMDB_FILE_NAME), arcname=IMDB_FILE_NAME)
+    elif mirror_kind == "file_url":
+        mirror = f"file://{mirror_dir}"
+
+    data_ingestion_config = data_ingestion_config._replace(mirror=mirror)
+    DataIngestion(data_ingestion_config, kaggle_api=UnreachableKaggleApi()).download_imdb_data()
+    assert read_raw_file(data_ingestion_config) == IMDB_FILE_CONTENT
+
+
+def test_missing_mirror_raises(data_ingestion_config, tmp_path):
+    data_ingestion_config = data_ingestion_config._replace(mirror=os.path.join(tmp_path, "missing"))
+    with pytest.raises(IMDBException):
+        DataIngestion(data_ingestion_config, kaggle_api=UnreachableKaggleApi()).download_imdb_data()
+
+
+def test_incremental_raw_files_are_new_until_committed(data_ingestion_config, tmp_path):
+    mirror_dir = os.path.join(tmp_path, "mirror")
+    os.makedirs(mirror_dir)
+    with open(os.path.join(mirror_dir, IMDB_FILE_NAME), "w") as imdb_file:
+        imdb_file.write(IMDB_FILE_CONTENT)
+    data_ingestion_config = data_ingestion_config._replace(mirror=mirror_dir, incremental=True)
+
+    # a run failing before its rows are transformed does not commit
+    assert DataIngestion(data_ingestion_config).initiate_data_ingestion().is_ingested
+    data_ingestion = DataIngestion(data_ingestion_config)
+    assert data_ingestion.initiate_data_ingestion().is_ingested
+    data_ingestion.commit_incremental_state()
+
+    data_ingestion_artifact = DataIngestion(data_ingestion_config).initiate_data_ingestion()
+    assert data_ingestion_artifact.is_incremental and not data_ingestion_artifact.is_ingested
+
+
+def test_incremental_download_only_copies_new_mirror_files(data_ingestion_config, tmp_path):
+    mirror_dir = os.path.join(tmp_path, "mirror")
+    os.makedirs(mirror_dir)
+    with open(os.path.join(mirror_dir, "reviews_0.csv"), "w") as imdb_file:
+        imdb_file.write(IMDB_FILE_CONTENT)
+    data_ingestion_config = data_ingestion_config._replace(mirror=mirror_dir, incremental=True)
+    data_ingestion = DataIngestion(data_ingestion_config, kaggle_api=UnreachableKaggleApi())
+    data_ingestion.download_imdb_data()
+    cache_dir = data_ingestion.get_download_cache_dir()
+    cached_inode = os.stat(os.path.join(cache_dir, "reviews_0.csv")).st_ino
+
+    with open(os.path.join(mirror_dir, "reviews_1.csv"), "w") as imdb_file:
+        imdb_file.write('review,sentiment\n"Another review.",positive\n')
+    next_config = data_ingestion_config._replace(raw_data_dir=os.path.join(tmp_path, "next_raw_data"))
+    DataIngestion(next_config, kaggle_api=UnreachableKaggleApi()).download_imdb_data()
+    assert os.stat(os.path.join(cache_dir, "reviews_0.csv")).st_ino == cached_inode
+    assert sorted(os.listdir(next_config.raw_data_dir)) == ["reviews_0.csv", "reviews_1.csv"]
+    assert data_ingestion.is_download_cache_valid(cache_dir)
+
+
+@pytest.mark.parametrize("drop_near_duplicates", [False, True])
+def test_incremental_near_duplicates_follow_the_earlier_split(data_ingestion_config, tmp_path, drop_near_duplicates):
+    rng = np.random.RandomState(0)
+    words = [f"word{index}" for index in range(1000)]
+    originals = [" ".join(rng.choice(words, size=60)) for _ in range(50)]
+    near_duplicates = [f"{review} again" for review in originals]
+    mirror_dir = os.path.join(tmp_path, "mirror")
+    os.makedirs(mirror_dir)
+    data_ingestion_config = data_ingestion_config._replace(mirror=mirror_dir, incremental=True,
+                                                           drop_near_duplicates=drop_near_duplicates)
+
+    splits = []
+    for run, reviews in enumerate([originals, near_duplicates]):
+        pd.DataFrame({"review": reviews, "sentiment": "positive"}).to_csv(
+            os.path.join(mirror_dir, f"reviews_{run}.csv"), index=False)
+        run_config = data_ingestion_config._replace(raw_data_dir=os.path.join(tmp_path, f"raw_data_{run}"),
+                                                    ingested_train_dir=os.path.join(tmp_path, f"train_{run}"),
+                                                    ingested_test_dir=os.path.join(tmp_path, f"test_{run}"))
+        data_ingestion = DataIngestion(run_config)
+        data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+        data_ingestion.commit_incremental_state()
+        splits.append(data_ingestion_artifact)
+
+    state = read_yaml_file(os.path.join(data_ingestion_config.incremental_dir, INCREMENTAL_STATE_FILE_NAME))
+    if drop_near_duplicates:
+        assert state["parts"][1]["train_rows"] + state["parts"][1]["test_rows"] == 0
+        return
+    original_test = set(pd.read_parquet(splits[0].test_file_path)["review"])
+    near_duplicate_test = set(pd.read_parquet(splits[1].test_file_path)["review"])
+    assert 0 < len(original_test) < len(originals)
+    assert near_duplicate_test == {f"{review} again" for review in original_test}
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_near_duplicates_stay_on_one_side_of_the_split(data_ingestion_config, streaming):
+    rng = np.random.RandomState(0)
+    words = [f"word{index}" for index in range(1000)]
+    originals = [list(rng.choice(words, size=60)) for _ in range(100)]
+    # every original is followed, rows later and across chunks, by a copy with one word replaced
+    edited_copies = []
+    for review in originals:
+        edited_copy = list(review)
+        edited_copy[rng.randint(len(edited_copy))] = "edited"
+        edited_copies.append(edited_copy)
+    reviews = [" ".join(review) for review in originals + edited_copies]
+    os.makedirs(data_ingestion_config.raw_data_dir)
+    pd.DataFrame({"review": reviews, "sentiment": "positive"}).to_csv(
+        os.path.join(data_ingestion_config.raw_data_dir, IMDB_FILE_NAME), index=False)
+    data_ingestion_config = data_ingestion_config._replace(streaming=streaming, chunk_size=30)
+
+    data_ingestion_artifact = DataIngestion(data_ingestion_config).split_data_as_train_test()
+    train_reviews = set(pd.read_parquet(data_ingestion_artifact.train_file_path)["review"])
+    test_reviews = set(pd.read_parquet(data_ingestion_artifact.test_file_path)["review"])
+    assert len(train_reviews) + len(test_reviews) == len(reviews)
+    assert 0 < len(test_reviews) < len(reviews)
+    for original, edited_copy in zip(reviews[:len(originals)], reviews[len(originals):]):
+        assert (original in test_reviews) == (edited_copy in test_reviews)
@@ -0,0 +1,97 @@
+from IMDB.component.data_transformation import DataTransformation
+from IMDB.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
+from IMDB.util.util import read_yaml_file, load_sparse_shards, load_sparse_array_data, load_fitted_object, porter
+from sklearn.feature_extraction.text import CountVectorizer
+import pandas as pd
+import numpy as np
+import pytest
+import os
+
+SCHEMA_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "schema.yaml")
+
+
+def get_reviews(n_reviews: int, random_state: int) -> pd.DataFrame:
+    rng = np.random.RandomState(random_state)
+    words = ["film", "movie", "acting", "plot", "great", "bad", "watched", "story", "loved", "boring", "the", "was"]
+    return pd.DataFrame({"review": [" ".join(rng.choice(words, size=rng.randint(1, 20))) for _ in range(n_reviews)],
+                         "sentiment": rng.choice(["negative", "positive"], size=n_reviews)})
+
+
+def get_data_transformation(data_transformation_config, tmp_path, **config) -> DataTransformation:
+    """
+    DataTransformation of small parquet train and test splits, data_transformation_config updated with config
+    """
+    file_paths = []
+    for split, n_reviews in [("train", 230), ("test", 70)]:
+        file_path = os.path.join(tmp_path, "ingested_data", split, "reviews.parquet")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        get_reviews(n_reviews, random_state=len(file_paths)).to_parquet(file_path)
+        file_paths.append(file_path)
+    data_ingestion_artifact = DataIngestionArtifact(train_file_path=file_paths[0], test_file_path=file_paths[1],
+                                                    is_ingested=True, message="", file_format="parquet",
+                                                    is_incremental=False)
+    data_validation_artifact = DataValidationArtifact(schema_file_path=SCHEMA_FILE_PATH, is_validated=True,
+                                                      message="", profile=None)
+    return DataTransformation(data_transformation_config=data_transformation_config._replace(**config),
+                              data_ingestion_artifact=data_ingestion_artifact,
+                              data_validation_artifact=data_validation_artifact)
+
+
+def test_out_of_core_shards_equal_the_in_memory_transformation(data_transformation_config, tmp_path):
+    # max_features and max_candidate_terms are not binding, so both vocabularies hold every n-gram
+    config = dict(max_features=None, shard_size=50)
+    in_memory = get_data_transformation(data_transformation_config._replace(
+        transformed_train_dir=os.path.join(tmp_path, "in_memory", "train"),
+        transformed_test_dir=os.path.join(tmp_path, "in_memory", "test")), tmp_path, **config)
+    in_memory_artifact = in_memory.initiate_data_transformation()
+    out_of_core = get_data_transformation(data_transformation_config, tmp_path, out_of_core=True, **config)
+    out_of_core_artifact = out_of_core.initiate_data_transformation()
+    assert out_of_core_artifact.is_sharded
+
+    for split, file_path in [("train", out_of_core_artifact.transformed_train_file_path),
+                             ("test", out_of_core_artifact.transformed_test_file_path)]:
+        manifest = read_yaml_file(file_path)
+        assert len(manifest["shards"]) > 1
+        assert sum(shard["n_rows"] for shard in manifest["shards"]) == manifest["n_rows"] == \
+            len(pd.read_parquet(getattr(out_of_core.data_ingestion_artifact, f"{split}_file_path")))
+
+        in_memory_file_path = getattr(in_memory_artifact, f"transformed_{split}_file_path")
+        expected_array, expected_target = load_sparse_array_data(in_memory_file_path)
+        array, target = load_sparse_shards(file_path)
+        assert (array != expected_array).nnz == 0
+        np.testing.assert_array_equal(target, expected_target)
+
+
+def test_out_of_core_vocabulary_matches_count_vectorizer(data_transformation_config, tmp_path):
+    data_transformation = get_data_transformation(data_transformation_config, tmp_path, out_of_core=True,
+                                                  max_features=None, shard_size=40)
+    data_transformation_artifact = data_transformation.initiate_out_of_core_data_transformation()
+
+    train = pd.read_parquet(data_transformation.data_ingestion_artifact.train_file_path)
+    vectorizer = CountVectorizer(ngram_range=(1, 2))
+    counts = vectorizer.fit_transform(porter(train, nltk_data_dir=data_transformation_config.nltk_data_dir))
+    preprocessing_obj = load_fitted_object(data_transformation_artifact.preprocessed_object_file_path)
+    assert preprocessing_obj.vocabulary == vectorizer.vocabulary_
+
+    term_statistics = data_transformation.get_term_statistics(
+        data_transformation.iter_normalized_chunks(data_transformation.data_ingestion_artifact.train_file_path))
+    term_statistics = term_statistics.loc[vectorizer.get_feature_names_out()]
+    np.testing.assert_array_equal(term_statistics["term_count"], np.asarray(counts.sum(axis=0)).ravel())
+    np.testing.assert_array_equal(term_statistics["document_frequency"], np.bincount(counts.indices))
+
+
+@pytest.mark.parametrize("max_candidate_terms", [5, 20])
+def test_binding_max_candidate_terms_keeps_frequent_terms(data_transformation_config, tmp_path, max_candidate_terms):
+    data_transformation = get_data_transformation(data_transformation_config, tmp_path, shard_size=40)
+    train_file_path = data_transformation.data_ingestion_artifact.train_file_path
+    exact_statistics = data_transformation.get_term_statistics(data_transformation.iter_normalized_chunks(
+        train_file_path))
+
+    data_transformation.data_transformation_config = data_transformation.data_transformation_config._replace(
+        max_candidate_terms=max_candidate_terms)
+    term_statistics = data_transformation.get_term_statistics(data_transformation.iter_normalized_chunks(
+        train_file_path))
+    assert len(term_statistics) == max_candidate_terms < len(exact_statistics)
+    # terms dropped from the totals are undercounted, never overcounted
+    assert (term_statistics <= exact_statistics.loc[term_statistics.index]).all().all()
+    assert exact_statistics["term_count"].idxmax() in term_statistics.index
@@ -0,0 +1,50 @@
+from IMDB.component.data_validation import DataValidation
+from IMDB.entity.artifact_entity import DataIngestionArtifact
+from IMDB.entity.config_entity import DataValidationConfig
+import pandas as pd
+import pytest
+import os
+
+SCHEMA_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "schema.yaml")
+TRAIN_REVIEWS = pd.DataFrame({"review": ["A fine film, well acted.", "Dull and far too long.", "Dull and far too long."],
+                              "sentiment": ["positive", "negative", "negative"]})
+TEST_REVIEWS = pd.DataFrame({"review": ["A fine film, well acted.", "Loved every minute."],
+                             "sentiment": ["positive", "positive"]})
+
+
+def validate(tmp_path, train_reviews: pd.DataFrame, test_reviews: pd.DataFrame):
+    file_paths = []
+    for split, reviews in [("train", train_reviews), ("test", test_reviews)]:
+        file_path = os.path.join(tmp_path, split, "reviews.csv")
+        os.makedirs(os.path.dirname(file_path))
+        reviews.to_csv(file_path, index=False)
+        file_paths.append(file_path)
+    data_ingestion_artifact = DataIngestionArtifact(train_file_path=file_paths[0], test_file_path=file_paths[1],
+                                                    is_ingested=True, message="", file_format="csv",
+                                                    is_incremental=False)
+    data_validation = DataValidation(DataValidationConfig(schema_file_path=SCHEMA_FILE_PATH, chunk_size=2),
+                                     data_ingestion_artifact=data_ingestion_artifact)
+    return data_validation.initiate_data_validation()
+
+
+def test_clean_splits_are_validated_and_profiled(tmp_path):
+    data_validation_artifact = validate(tmp_path, TRAIN_REVIEWS, TEST_REVIEWS)
+    assert data_validation_artifact.is_validated
+    train_profile = data_validation_artifact.profile["train"]
+    assert train_profile["rows"] == 3
+    assert train_profile["duplicate_reviews"] == 1
+    assert train_profile["value_counts"]["sentiment"] == {"negative": 2, "positive": 1}
+    assert data_validation_artifact.profile["duplicate_reviews_across_splits"] == 1
+
+
+@pytest.mark.parametrize("test_reviews, error", [
+    (pd.DataFrame({"review": ["Loved it.", None], "sentiment": ["positive", "negative"]}),
+     "Test file has [1] null values in column [review]"),
+    (pd.DataFrame({"review": ["Loved it.", "Not sure."], "sentiment": ["positive", "neutral"]}),
+     "Test file has [1] values of column [sentiment] outside of the schema domain_value"),
+    (TEST_REVIEWS.iloc[:0], "Test file is empty"),
+])
+def test_profile_errors_fail_the_validation(tmp_path, test_reviews, error):
+    data_validation_artifact = validate(tmp_path, TRAIN_REVIEWS, test_reviews)
+    assert not data_validation_artifact.is_validated
+    assert error in data_validation_artifact.message
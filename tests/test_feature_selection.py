@@ -0,0 +1,21 @@
+from IMDB.util.feature_selection import get_mutual_info_scores
+from sklearn.feature_selection import mutual_info_classif
+import scipy.sparse
+import numpy as np
+
+
+def test_mutual_info_matches_mutual_info_classif():
+    rng = np.random.RandomState(0)
+    target = rng.randint(0, 2, size=300)
+    counts = rng.poisson(0.3, size=(300, 40))
+    # columns telling a lot, nothing and everything about the target, and a column without any count
+    counts[:, 0] += target * 2
+    counts[:, 1] = 1
+    counts[:, 2] = 0
+    counts[:, 3] = target
+
+    scores = get_mutual_info_scores(scipy.sparse.csr_matrix(counts), target)
+    # occurrence is what get_mutual_info_scores measures, as discrete features sklearn counts it exactly
+    expected = mutual_info_classif(counts > 0, target, discrete_features=True)
+    np.testing.assert_allclose(scores, expected, atol=1e-12)
+    assert scores[3] == scores.max()
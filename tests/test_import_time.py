@@ -0,0 +1,13 @@
+from IMDB.benchmark.import_time import DEFAULT_MODULES, time_import
+import pytest
+
+# below importing pandas alone, far above the tens of milliseconds the modules take
+MAX_IMPORT_SECONDS = 0.5
+
+
+@pytest.mark.parametrize("module", DEFAULT_MODULES)
+def test_import_is_light(module):
+    report = time_import(module, repeat=3)
+    assert report["loaded"] == []
+    assert report["written_files"] == []
+    assert report["seconds"] < MAX_IMPORT_SECONDS
@@ -0,0 +1,78 @@
+from IMDB.component.model_trainer import ModelTrainer, load_shard
+from IMDB.entity.artifact_entity import DataTransformationArtifact
+from IMDB.entity.config_entity import ModelTrainerConfig
+from IMDB.util.util import save_sparse_array_data, save_sparse_shard_manifest
+from IMDB.exception import IMDBException
+import scipy.sparse
+import numpy as np
+import pytest
+import os
+
+
+def save_shards(transformed_dir: str, shard_rows: list, random_state: int = 0) -> str:
+    """
+    Saves separable sparse shards of shard_rows rows each and returns their manifest
+    """
+    rng = np.random.RandomState(random_state)
+    shards = []
+    for shard_number, n_rows in enumerate(shard_rows):
+        target = rng.randint(0, 2, size=n_rows)
+        array = scipy.sparse.csr_matrix(np.column_stack([target, 1 - target, rng.randint(0, 3, size=n_rows)]))
+        shard_file_path = os.path.join(transformed_dir, "shards", f"reviews-{shard_number:05d}.npz")
+        save_sparse_array_data(file_path=shard_file_path, array=array, target=target)
+        shards.append({"file_path": shard_file_path, "n_rows": n_rows, "nnz": array.nnz})
+    manifest_file_path = os.path.join(transformed_dir, "reviews.manifest.yaml")
+    save_sparse_shard_manifest(file_path=manifest_file_path, shards=shards, n_features=3)
+    return manifest_file_path
+
+
+def get_model_trainer(tmp_path, shard_rows: list, **config) -> ModelTrainer:
+    model_trainer_config = ModelTrainerConfig(trained_model_file_path=os.path.join(tmp_path, "model", "model.pkl"),
+                                              model_name="sgd", param_grid={"alpha": [0.0001, 0.001]}, cv=3,
+                                              n_jobs=1, scoring="accuracy", random_state=42, n_epochs=3,
+                                              validation_size=0.2, compress=0)
+    data_transformation_artifact = DataTransformationArtifact(
+        is_transformed=True, message="",
+        transformed_train_file_path=save_shards(os.path.join(tmp_path, "train"), shard_rows),
+        transformed_test_file_path=save_shards(os.path.join(tmp_path, "test"), [20], random_state=1),
+        preprocessed_object_file_path=None, is_sparse=True, is_sharded=True)
+    return ModelTrainer(model_trainer_config=model_trainer_config._replace(**config),
+                        data_transformation_artifact=data_transformation_artifact)
+
+
+def test_validation_split_of_a_single_shard(tmp_path):
+    model_trainer = get_model_trainer(tmp_path, shard_rows=[10])
+    manifest_file_path = model_trainer.data_transformation_artifact.transformed_train_file_path
+    train_shards, validation_shards = model_trainer.get_validation_split(manifest_file_path)
+    assert len(train_shards) == len(validation_shards) == 1
+
+    input_feature, target = load_shard(model_trainer.get_shard_file_paths(manifest_file_path)[0])
+    train_input_feature, train_target = load_shard(train_shards[0])
+    validation_input_feature, validation_target = load_shard(validation_shards[0])
+    assert (train_input_feature.shape[0], validation_input_feature.shape[0]) == (8, 2)
+    # the validation rows are held out of training, together they are the shard
+    np.testing.assert_array_equal(np.concatenate([train_target, validation_target]), target)
+    assert (scipy.sparse.vstack([train_input_feature, validation_input_feature]) != input_feature).nnz == 0
+
+
+def test_validation_split_of_too_few_rows(tmp_path):
+    model_trainer = get_model_trainer(tmp_path, shard_rows=[30, 4])
+    assert model_trainer.get_validation_split(
+        model_trainer.data_transformation_artifact.transformed_train_file_path) == (None, None)
+    # params are then not searched, the first candidate is trained on every shard
+    model_trainer_artifact = model_trainer.initiate_model_trainer()
+    assert model_trainer_artifact.best_params == {"alpha": 0.0001}
+    assert model_trainer_artifact.test_accuracy == 1.0
+
+
+def test_sharded_training_searches_params_on_held_out_rows(tmp_path):
+    model_trainer_artifact = get_model_trainer(tmp_path, shard_rows=[30, 30, 20]).initiate_model_trainer()
+    assert model_trainer_artifact.train_accuracy == model_trainer_artifact.test_accuracy == 1.0
+    assert os.path.exists(model_trainer_artifact.trained_model_file_path)
+
+
+def test_sharded_training_needs_a_partial_fit_model(tmp_path):
+    model_trainer = get_model_trainer(tmp_path, shard_rows=[30], model_name="logistic_regression",
+                                      param_grid={"C": [1.0]})
+    with pytest.raises(IMDBException, match="partial_fit"):
+        model_trainer.initiate_model_trainer()
@@ -0,0 +1,44 @@
+from IMDB.serving.scoring_service import ScoringService
+from IMDB.entity.config_entity import ScoringServiceConfig
+import asyncio
+import json
+import pytest
+
+
+@pytest.fixture
+def scoring_service(trained_file_paths, nltk_data_dir) -> ScoringService:
+    preprocessed_object_file_path, trained_model_file_path = trained_file_paths
+    return ScoringService(ScoringServiceConfig(preprocessed_object_file_path=preprocessed_object_file_path,
+                                               trained_model_file_path=trained_model_file_path,
+                                               nltk_data_dir=nltk_data_dir, host="127.0.0.1", port=0,
+                                               max_batch_size=8, max_wait_ms=1, latency_window=100))
+
+
+def post_predict(scoring_service: ScoringService, body: bytes):
+    async def post():
+        scoring_service.batcher.start()
+        try:
+            return await scoring_service.handle_request("POST", "/predict", body)
+        finally:
+            await scoring_service.batcher.stop()
+
+    return asyncio.run(post())
+
+
+@pytest.mark.parametrize("body", [b"", b"{}", b'{"reviews": "abc"}', b'{"reviews": []}', b'{"reviews": [1, 2]}',
+                                  b'{"review": 1}', b'["great film"]', b"not json"])
+def test_invalid_predict_body_is_rejected(scoring_service, body):
+    status, response = post_predict(scoring_service, body)
+    assert status == 400
+    assert "error" in response
+    assert scoring_service.batcher.review_count == 0
+
+
+def test_predict_returns_one_prediction_per_review(scoring_service):
+    status, response = post_predict(scoring_service, json.dumps({"reviews": ["A great film, I love it.",
+                                                                             "Bad, a boring plot."]}).encode())
+    assert status == 200
+    assert response["predictions"] == ["positive", "negative"]
+    status, response = post_predict(scoring_service, json.dumps({"review": "Terrible waste of time."}).encode())
+    assert status == 200
+    assert response["predictions"] == ["negative"]
@@ -0,0 +1,62 @@
+from IMDB.util.text_normalizer import TextNormalizer, load_stopword_list
+from IMDB.util.util import porter
+from IMDB.exception import IMDBException
+from nltk.stem.porter import PorterStemmer
+import pandas as pd
+import pytest
+import nltk
+import re
+import os
+
+REVIEWS = ["One of the other reviewers has mentioned that after watching just 1 Oz episode you'll be hooked.",
+           "A wonderful little production. <br /><br />The filming technique is very unassuming- very old-time-BBC",
+           "I thought this was a wonderful way to spend time on a too hot summer weekend!!!",
+           "Basically there's a family where a little boy (Jake) thinks there's a zombie in his closet...",
+           "Petter Mattei's \"Love in the Time of Money\" is a visually stunning film to watch. Café scenes, 10/10",
+           "",
+           "THE THE the, it. Is; NOT but"]
+
+
+def legacy_porter(data, stopword_list):
+    """
+    Row by row loop porter ran before TextNormalizer, the reference of its output
+    """
+    ps = PorterStemmer()
+    corpus = []
+    for i in range(0, len(data)):
+        review = re.sub('[^a-zA-Z0-9]', ' ', data['review'][i])
+        review = review.lower()
+        review = review.split()
+        review = [ps.stem(word) for word in review if not word in stopword_list]
+        review = ' '.join(review)
+        corpus.append(review)
+    return corpus
+
+
+def test_porter_matches_the_legacy_loop(nltk_data_dir):
+    data = pd.DataFrame({"review": REVIEWS * 3})
+    stopword_list = list(load_stopword_list('english', nltk_data_dir=nltk_data_dir))
+    expected = legacy_porter(data, stopword_list)
+    assert porter(data, nltk_data_dir=nltk_data_dir) == expected
+    # a small stem cache evicts tokens between reviews without changing the output
+    normalizer = TextNormalizer(stopword_list=stopword_list, stem_cache_size=4)
+    assert normalizer.normalize_many(data["review"]) == expected
+
+
+def test_process_pool_output_equals_serial_in_order(nltk_data_dir):
+    # distinct reviews, so any reordering of chunks changes the output
+    reviews = [f"{review} number {index}" for index, review in enumerate(REVIEWS * 20)]
+    normalizer = TextNormalizer(stopword_list=load_stopword_list('english', nltk_data_dir=nltk_data_dir))
+    serial = normalizer.normalize_many(reviews)
+    assert normalizer.normalize_many(reviews, n_jobs=3, chunk_size=7) == serial
+    assert porter(pd.DataFrame({"review": reviews}), n_jobs=2, chunk_size=11, nltk_data_dir=nltk_data_dir) == serial
+
+
+def test_missing_stopwords_corpus_fails_without_download(tmp_path, monkeypatch):
+    # only the empty directory is searched, whatever corpora this machine has installed
+    monkeypatch.setattr(nltk.data, "path", [])
+    monkeypatch.setattr(nltk, "download", lambda *args, **kwargs: pytest.fail("stopwords must not be downloaded"))
+    empty_nltk_data_dir = os.path.join(tmp_path, "empty_nltk_data")
+    os.makedirs(empty_nltk_data_dir)
+    with pytest.raises(IMDBException, match="corpora/stopwords/english.*was not found"):
+        porter(pd.DataFrame({"review": REVIEWS}), nltk_data_dir=empty_nltk_data_dir)
@@ -0,0 +1,42 @@
+from IMDB.util.token_corpus import TokenCorpus, fit_transform_count_vectorizer, transform_count_vectorizer
+from sklearn.feature_extraction.text import CountVectorizer
+import numpy as np
+import pytest
+
+
+def get_texts(n_texts: int, random_state: int) -> list:
+    """
+    Normalized-like texts over a small vocabulary, so n-gram counts tie, with an empty text
+    and one-letter words the sklearn token pattern skips
+    """
+    rng = np.random.RandomState(random_state)
+    words = ["film", "movi", "act", "plot", "great", "bad", "watch", "stori", "b", "x", "love", "time"]
+    texts = [" ".join(rng.choice(words, size=rng.randint(1, 15))) for _ in range(n_texts)]
+    return texts + [""]
+
+
+@pytest.mark.parametrize("ngram_range", [(1, 1), (1, 2), (2, 3)])
+@pytest.mark.parametrize("max_features", [None, 25])
+def test_fit_transform_matches_count_vectorizer(ngram_range, max_features):
+    texts = get_texts(200, random_state=0)
+    expected_vectorizer = CountVectorizer(ngram_range=ngram_range, max_features=max_features)
+    expected = expected_vectorizer.fit_transform(texts)
+
+    vectorizer = CountVectorizer(ngram_range=ngram_range, max_features=max_features)
+    matrix = fit_transform_count_vectorizer(vectorizer, TokenCorpus.from_texts(texts))
+    assert vectorizer.vocabulary_ == expected_vectorizer.vocabulary_
+    assert (matrix != expected).nnz == 0
+
+
+@pytest.mark.parametrize("ngram_range", [(1, 1), (1, 2)])
+def test_transform_matches_count_vectorizer(ngram_range):
+    vectorizer = CountVectorizer(ngram_range=ngram_range, max_features=30).fit(get_texts(200, random_state=0))
+    # other texts, with a word the vocabulary has never seen
+    texts = get_texts(100, random_state=1) + ["unseen film unseen"]
+    matrix = transform_count_vectorizer(vectorizer, TokenCorpus.from_texts(texts))
+    assert (matrix != vectorizer.transform(texts)).nnz == 0
+
+
+def test_empty_corpus_raises_like_count_vectorizer():
+    with pytest.raises(ValueError):
+        fit_transform_count_vectorizer(CountVectorizer(), TokenCorpus.from_texts(["", "a b"]))
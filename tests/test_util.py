@@ -0,0 +1,70 @@
+from IMDB.util.util import save_fitted_object, load_fitted_object, save_numpy_array_data, load_numpy_array_data, \
+    get_label_codes, apply_dataset_schema
+from IMDB.constant import SENTIMENT_LABELS
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+import pandas as pd
+import numpy as np
+import pytest
+import os
+
+DATASET_SCHEMA = {"columns": {"review": "string[pyarrow]", "sentiment": "category"},
+                  "domain_value": {"sentiment": ["negative", "positive"]}}
+CORPUS = ["great film love", "wonder act great film", "bad bore plot", "terribl wast time bad", "plot time film"]
+
+
+@pytest.mark.parametrize("compress", [0, 3])
+def test_fitted_object_round_trip(tmp_path, compress):
+    vectorizer = CountVectorizer(ngram_range=(1, 2), max_features=8).fit(CORPUS)
+    # set by older scikit-learn releases to the terms cut by max_features
+    vectorizer.stop_words_ = {"plot time"}
+    model = LogisticRegression().fit(vectorizer.transform(CORPUS), [1, 1, 0, 0, 1])
+    vectorizer_file_path = os.path.join(tmp_path, "preprocessed.pkl")
+    model_file_path = os.path.join(tmp_path, "model.pkl")
+    save_fitted_object(vectorizer_file_path, vectorizer, compress=compress)
+    save_fitted_object(model_file_path, model, compress=compress)
+
+    loaded_vectorizer = load_fitted_object(vectorizer_file_path)
+    loaded_model = load_fitted_object(model_file_path)
+    assert loaded_vectorizer.vocabulary_ == vectorizer.vocabulary_
+    # stop_words_ only serves introspection and is not saved, the fitted object is left untouched
+    assert not hasattr(loaded_vectorizer, "stop_words_") and hasattr(vectorizer, "stop_words_")
+    assert (loaded_vectorizer.transform(CORPUS) != vectorizer.transform(CORPUS)).nnz == 0
+    np.testing.assert_array_equal(loaded_model.predict(loaded_vectorizer.transform(CORPUS)),
+                                  model.predict(vectorizer.transform(CORPUS)))
+    # arrays of uncompressed files are memory mapped read only, compressed ones are read into memory
+    assert isinstance(loaded_model.coef_, np.memmap) == (compress == 0)
+    assert isinstance(load_fitted_object(model_file_path, mmap_mode=None).coef_, np.memmap) is False
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_numpy_array_round_trip(tmp_path, compress):
+    array = np.arange(12, dtype=np.float64).reshape(3, 4)
+    file_path = os.path.join(tmp_path, "array.npy")
+    save_numpy_array_data(file_path, array, compress=compress)
+    loaded_array = load_numpy_array_data(file_path, mmap_mode="r")
+    np.testing.assert_array_equal(loaded_array, array)
+    assert isinstance(loaded_array, np.memmap) == (not compress)
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+def test_label_codes(dtype):
+    values = pd.Series(["positive", "negative", "negative", "positive"], name="sentiment", dtype=dtype)
+    np.testing.assert_array_equal(get_label_codes(values, SENTIMENT_LABELS), [1, 0, 0, 1])
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+def test_out_of_domain_label_raises(dtype):
+    values = pd.Series(["positive", "neutral", None], name="sentiment", dtype=dtype)
+    with pytest.raises(Exception, match=r"Column \[sentiment\] has \[2\] values that are not one of"):
+        get_label_codes(values, SENTIMENT_LABELS)
+
+
+def test_apply_dataset_schema():
+    dataframe = apply_dataset_schema(pd.DataFrame({"review ": ["Loved it.", "Dull."],
+                                                   "sentiment": ["positive", "negative"]}), DATASET_SCHEMA)
+    assert list(dataframe.columns) == ["review", "sentiment"]
+    assert dataframe["review"].dtype == "string[pyarrow]"
+    assert isinstance(dataframe["sentiment"].dtype, pd.CategoricalDtype)
+    with pytest.raises(Exception, match=r"Column: \[rating\] is not in the schema"):
+        apply_dataset_schema(pd.DataFrame({"review": ["Loved it."], "rating": [9]}), DATASET_SCHEMA)